@@ -3,7 +3,9 @@ import os
 from pyblish import api as pyblish
 from avalon import api as avalon
 from .lib import filter_pyblish_plugins
-from pypeapp import config, Anatomy
+from .plugin_cache import PyblishDiscoveryCache
+from .presets import get_presets, thaw
+from pypeapp import Anatomy
 
 
 import logging
@@ -26,6 +28,10 @@ LOAD_PATH = os.path.join(PLUGINS_DIR, "global", "load")
 
 _original_discover = avalon.discover
 
+# pyblish discovery is replaced with cached version which skips execution of
+# plugin files when plugins, hosts and presets did not change
+_original_pyblish_discover = pyblish.discover
+
 
 def patched_discover(superclass):
     """
@@ -50,7 +56,7 @@ def patched_discover(superclass):
 
     print(">>> trying to find presets for {}:{} ...".format(host, plugin_type))
     try:
-        config_data = config.get_presets()['plugins'][host][plugin_type]
+        config_data = get_presets()['plugins'][host][plugin_type]
     except KeyError:
         print("*** no presets found.")
     else:
@@ -62,7 +68,7 @@ def patched_discover(superclass):
                         setattr(plugin, "active", False)
                         print("  - is disabled by preset")
                     else:
-                        setattr(plugin, option, value)
+                        setattr(plugin, option, thaw(value))
                         print("  - setting `{}`: `{}`".format(option, value))
     return plugins
 
@@ -105,6 +111,7 @@ def install():
         avalon.register_root(anatomy.roots)
     # apply monkey patched discover to original one
     avalon.discover = patched_discover
+    pyblish.discover = PyblishDiscoveryCache(_original_pyblish_discover)
 
 
 def uninstall():
@@ -116,3 +123,4 @@ def uninstall():
 
     # restore original discover
     avalon.discover = _original_discover
+    pyblish.discover = _original_pyblish_discover
@@ -24,6 +24,7 @@ from .lib import (
     get_project,
     get_hierarchy,
     get_subsets,
+    get_subsets_by_assets,
     get_version_from_path,
     modified_environ,
     add_tool_to_environment
@@ -55,6 +56,7 @@ __all__ = [
     "get_hierarchy",
     "get_asset",
     "get_subsets",
+    "get_subsets_by_assets",
     "get_version_from_path",
     "modified_environ",
     "add_tool_to_environment",
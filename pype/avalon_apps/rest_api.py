@@ -1,9 +1,8 @@
 import os
-import re
 import json
 import bson
-import bson.json_util
 from pype.services.rest_api import RestApi, abort, CallbackResult
+from pype.services.rest_api.lib import RestApiJSONEncoder
 from pype.ftrack.lib.custom_db_connector import DbConnector
 
 
@@ -20,20 +19,23 @@ class AvalonRestApi(RestApi):
     @RestApi.route("/projects/<project_name>", url_prefix="/avalon", methods="GET")
     def get_project(self, request):
         project_name = request.url_data["project_name"]
+        projection = self.query_projection(request.query)
         if not project_name:
             output = {}
             for project_name in self.dbcon.tables():
-                project = self.dbcon[project_name].find_one({
-                    "type": "project"
-                })
+                project = self.dbcon[project_name].find_one(
+                    {"type": "project"}, projection
+                )
                 output[project_name] = project
 
-            return CallbackResult(data=self.result_to_json(output))
+            return CallbackResult(data=output)
 
-        project = self.dbcon[project_name].find_one({"type": "project"})
+        project = self.dbcon[project_name].find_one(
+            {"type": "project"}, projection
+        )
 
         if project:
-            return CallbackResult(data=self.result_to_json(project))
+            return CallbackResult(data=project)
 
         abort(404, "Project \"{}\" was not found in database".format(
             project_name
@@ -41,6 +43,20 @@ class AvalonRestApi(RestApi):
 
     @RestApi.route("/projects/<project_name>/assets/<asset>", url_prefix="/avalon", methods="GET")
     def get_assets(self, request):
+        """Asset documents of project.
+
+        Url query may contain:
+        - "fields" - Comma separated fields which are returned (all if not
+            set), e.g. "?fields=name,data.tasks".
+        - "limit" - Maximum number of returned assets. Next page of assets
+            can be queried with "after" set to value of "next" from response.
+        - "after" - Id of asset after which assets are returned.
+        - "identificator" - Key by which is single asset found (default is
+            `name`).
+
+        Assets are sorted by id and are sent while are read from database
+        when "limit" is not set.
+        """
         _project_name = request.url_data["project_name"]
         _asset = request.url_data["asset"]
 
@@ -49,40 +65,88 @@ class AvalonRestApi(RestApi):
                 _project_name
             ))
 
+        projection = self.query_projection(request.query)
         if not _asset:
-            assets = self.dbcon[_project_name].find({"type": "asset"})
-            output = self.result_to_json(assets)
-            return CallbackResult(data=output)
+            return self.get_assets_page(
+                _project_name, request.query, projection
+            )
 
         # identificator can be specified with url query (default is `name`)
-        identificator = request.query.get("identificator", "name")
-
-        asset = self.dbcon[_project_name].find_one({
-            "type": "asset",
-            identificator: _asset
-        })
+        identificator = self.query_value(
+            request.query, "identificator", "name"
+        )
+
+        asset = self.dbcon[_project_name].find_one(
+            {
+                "type": "asset",
+                identificator: _asset
+            },
+            projection
+        )
         if asset:
-            id = asset["_id"]
-            asset["_id"] = str(id)
             return asset
 
         abort(404, "Asset \"{}\" with {} was not found in project {}".format(
             _asset, identificator, _project_name
         ))
 
+    def get_assets_page(self, project_name, query, projection):
+        limit = self.query_value(query, "limit")
+        if limit is not None:
+            if not limit.isdigit() or int(limit) < 1:
+                abort(400, "Query \"limit\" must be positive integer.")
+            limit = int(limit)
+
+        asset_filter = {"type": "asset"}
+        after = self.query_value(query, "after")
+        if after:
+            try:
+                asset_filter["_id"] = {"$gt": bson.ObjectId(after)}
+            except bson.errors.InvalidId:
+                abort(400, "Query \"after\" is not valid id \"{}\".".format(
+                    after
+                ))
+
+        cursor = self.dbcon[project_name].find(
+            asset_filter, projection
+        ).sort("_id", 1)
+        if limit is None:
+            # Documents are encoded one by one while response is sent
+            return CallbackResult(data=cursor)
+
+        assets = list(cursor.limit(limit))
+        next_id = None
+        if len(assets) == limit:
+            next_id = str(assets[-1]["_id"])
+        return CallbackResult(data=assets, next=next_id)
+
+    @staticmethod
+    def query_value(query, key, default=None):
+        """First value of key in url query."""
+        values = query.get(key)
+        if not values:
+            return default
+        return values[0]
+
+    def query_projection(self, query):
+        """Projection of documents from "fields" in url query."""
+        fields = []
+        for value in query.get("fields") or []:
+            for field in value.split(","):
+                field = field.strip()
+                if field:
+                    fields.append(field)
+
+        if not fields:
+            return None
+        return {field: True for field in fields}
+
     def result_to_json(self, result):
-        """ Converts result of MongoDB query to dict without $oid (ObjectId)
-        keys with help of regex matching.
+        """ Converts result of MongoDB query to json serializable data
+        (ObjectId values are converted to string).
 
         ..note:
-            This will convert object type entries similar to ObjectId.
+            Results of callbacks don't need to be converted, response
+            encoder handles ObjectId values.
         """
-        bson_json = bson.json_util.dumps(result)
-        # Replace "{$oid: "{entity id}"}" with "{entity id}"
-        regex1 = '(?P<id>{\"\$oid\": \"[^\"]+\"})'
-        regex2 = '{\"\$oid\": (?P<id>\"[^\"]+\")}'
-        for value in re.findall(regex1, bson_json):
-            for substr in re.findall(regex2, value):
-                bson_json = bson_json.replace(value, substr)
-
-        return json.loads(bson_json)
+        return json.loads(json.dumps(result, cls=RestApiJSONEncoder))
@@ -0,0 +1,556 @@
+"""Parallel file transfer engine used by publishing and delivery.
+
+Transfers are processed in a bounded thread pool. Each file is streamed
+through a checksum (xxhash when available, sha1 otherwise), written to a
+partial file next to the destination and renamed when complete so an
+interrupted transfer can be resumed on next run. When source and destination
+share a filesystem the file may be reflinked (copy-on-write clone) or
+hardlinked instead of copied.
+"""
+import os
+import sys
+import time
+import errno
+import json
+import hashlib
+import logging
+import threading
+from multiprocessing.pool import ThreadPool
+
+from avalon.vendor import filelink
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+# this is needed until speedcopy for linux is fixed
+if sys.platform == "win32":
+    from speedcopy import copyfile
+else:
+    from shutil import copyfile
+
+log = logging.getLogger(__name__)
+
+# Linux `FICLONE` ioctl request (clone whole file on btrfs/xfs/...)
+_FICLONE = 0x40049409
+
+
+def get_hasher(algorithm):
+    """Return new hash object and it's name for entered algorithm.
+
+    Algorithm "xxhash" fallbacks to "sha1" if `xxhash` module
+    is not available.
+
+    Args:
+        algorithm (str): "xxhash" or any algorithm available in `hashlib`.
+
+    Returns:
+        tuple: Name of used algorithm and hash object.
+    """
+    if algorithm == "xxhash":
+        if xxhash is not None:
+            return "xxh64", xxhash.xxh64()
+        algorithm = "sha1"
+    return algorithm, hashlib.new(algorithm)
+
+
+def file_checksum(path, algorithm="sha1", chunk_size=1024 * 1024):
+    """Calculate checksum of file in form "<algorithm>:<hexdigest>"."""
+    name, hasher = get_hasher(algorithm)
+    with open(path, "rb") as stream:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            hasher.update(chunk)
+    return "{}:{}".format(name, hasher.hexdigest())
+
+
+def _replace(src, dst):
+    """Move `src` to `dst` overriding `dst` if exists (py2 compatible)."""
+    if hasattr(os, "replace"):
+        os.replace(src, dst)
+        return
+
+    if os.path.exists(dst):
+        os.remove(dst)
+    os.rename(src, dst)
+
+
+def _makedirs(dirpath):
+    try:
+        os.makedirs(dirpath)
+    except OSError as exc:
+        if exc.errno != errno.EEXIST:
+            raise
+
+
+def _same_device(src, dst):
+    """Source file and destination directory are on the same device."""
+    try:
+        return os.stat(src).st_dev == os.stat(os.path.dirname(dst)).st_dev
+    except OSError:
+        return False
+
+
+def _reflink(src, dst):
+    """Try to create copy-on-write clone of `src` at `dst`.
+
+    Returns:
+        bool: Clone was created.
+    """
+    if not sys.platform.startswith("linux"):
+        return False
+
+    import fcntl
+
+    try:
+        with open(src, "rb") as src_file, open(dst, "wb") as dst_file:
+            fcntl.ioctl(dst_file.fileno(), _FICLONE, src_file.fileno())
+    except (IOError, OSError):
+        if os.path.exists(dst):
+            os.remove(dst)
+        return False
+    return True
+
+
+class FileTransfer(object):
+    """Single source to destination transfer and it's result."""
+
+    def __init__(self, src, dst):
+        self.src = os.path.normpath(src)
+        self.dst = os.path.normpath(dst)
+        self.size = 0
+        self.checksum = None
+        # One of "copy", "resume", "reflink", "hardlink", "verified"
+        self.method = None
+        self.resumed_bytes = 0
+        self.elapsed = 0.0
+        self.error = None
+
+    def __repr__(self):
+        return "<FileTransfer {} -> {}>".format(self.src, self.dst)
+
+    @property
+    def throughput(self):
+        """Transferred megabytes per second."""
+        if not self.elapsed:
+            return 0.0
+        return (self.size - self.resumed_bytes) / 1048576.0 / self.elapsed
+
+
+class TransferEngine(object):
+    """Copy files in a thread pool with checksums and resume support.
+
+    Example:
+        >>> engine = TransferEngine(workers=4)
+        >>> engine.add("/staging/a.exr", "/publish/a.exr")
+        >>> transfers = engine.process()
+        >>> transfers[0].checksum
+        'xxh64:...'
+
+    Args:
+        workers (int): Maximum number of parallel transfers.
+        checksum (str): Checksum algorithm ("xxhash", "sha1", ...). Checksums
+            are not calculated when set to `None`.
+        allow_reflink (bool): Try copy-on-write clone on same filesystem.
+        allow_hardlink (bool): Hardlink files on same filesystem. Published
+            and source file share content after hardlinking so should be
+            used only when source is not modified afterwards.
+        skip_identical (bool): Do not rewrite destination which already
+            exists with same size and checksum.
+        chunk_size (int): Size of chunks read from source file.
+        log (logging.Logger): Logger used for messages.
+        progress_callback (callable): Called after each processed transfer
+            with the transfer, count of processed and count of all transfers.
+            Callback is called from worker threads but never concurrently.
+    """
+
+    partial_suffix = ".part"
+
+    def __init__(
+        self, workers=8, checksum="xxhash", allow_reflink=True,
+        allow_hardlink=False, skip_identical=True, chunk_size=4194304,
+        log=None, progress_callback=None
+    ):
+        self.workers = max(1, int(workers or 1))
+        self.checksum = checksum
+        self.allow_reflink = allow_reflink
+        self.allow_hardlink = allow_hardlink
+        self.skip_identical = skip_identical
+        self.chunk_size = chunk_size
+        self.log = log or logging.getLogger(__name__)
+        self.progress_callback = progress_callback
+
+        self.transfers = []
+        self._transfers_by_dst = {}
+        self.elapsed = 0.0
+
+        self._progress_lock = threading.Lock()
+        self._processed_count = 0
+
+    def add(self, src, dst):
+        """Register transfer, duplicated destinations are ignored."""
+        transfer = FileTransfer(src, dst)
+        _transfer = self._transfers_by_dst.get(transfer.dst)
+        if _transfer is not None:
+            if _transfer.src != transfer.src:
+                raise ValueError((
+                    "Destination \"{}\" is used by multiple sources."
+                ).format(transfer.dst))
+            return _transfer
+
+        self._transfers_by_dst[transfer.dst] = transfer
+        self.transfers.append(transfer)
+        return transfer
+
+    def process(self):
+        """Process all registered transfers.
+
+        Returns:
+            list: Processed `FileTransfer` objects.
+
+        Raises:
+            RuntimeError: When any of transfers failed. All transfers are
+                processed before the error is raised.
+        """
+        start = time.time()
+        transfers = [
+            transfer for transfer in self.transfers
+            if transfer.method is None
+        ]
+        self._processed_count = len(self.transfers) - len(transfers)
+        if len(transfers) == 1 or self.workers == 1:
+            for transfer in transfers:
+                self._process_transfer(transfer)
+        elif transfers:
+            pool = ThreadPool(min(self.workers, len(transfers)))
+            try:
+                pool.map(self._process_transfer, transfers)
+            finally:
+                pool.close()
+                pool.join()
+        self.elapsed = time.time() - start
+
+        failed = [
+            transfer for transfer in self.transfers if transfer.error
+        ]
+        if failed:
+            raise RuntimeError("Failed to transfer {} file(s):\n{}".format(
+                len(failed),
+                "\n".join(
+                    "{} -> {}: {}".format(
+                        transfer.src, transfer.dst, transfer.error
+                    )
+                    for transfer in failed
+                )
+            ))
+        return list(self.transfers)
+
+    def report(self):
+        """Human readable summary of processed transfers."""
+        lines = []
+        total_size = 0
+        for transfer in self.transfers:
+            total_size += transfer.size - transfer.resumed_bytes
+            lines.append((
+                "{method:>8} {size:>10.2f} MB {elapsed:>7.2f}s"
+                " {throughput:>8.2f} MB/s {dst}"
+            ).format(
+                method=transfer.method or "-",
+                size=transfer.size / 1048576.0,
+                elapsed=transfer.elapsed,
+                throughput=transfer.throughput,
+                dst=transfer.dst
+            ))
+
+        throughput = 0.0
+        if self.elapsed:
+            throughput = total_size / 1048576.0 / self.elapsed
+        lines.append((
+            "Transferred {} file(s), {:.2f} MB in {:.2f}s ({:.2f} MB/s)"
+            " using {} worker(s)."
+        ).format(
+            len(self.transfers), total_size / 1048576.0, self.elapsed,
+            throughput, self.workers
+        ))
+        return "\n".join(lines)
+
+    def _process_transfer(self, transfer):
+        start = time.time()
+        try:
+            transfer.size = os.path.getsize(transfer.src)
+            _makedirs(os.path.dirname(transfer.dst))
+            if not self._skip_identical(transfer):
+                if not self._link(transfer):
+                    self._copy(transfer)
+
+            dst_size = os.path.getsize(transfer.dst)
+            if dst_size != transfer.size:
+                raise IOError((
+                    "Size of destination ({}) does not match source ({})."
+                ).format(dst_size, transfer.size))
+
+        except Exception as exc:
+            self.log.error(
+                "Cannot transfer {} to {}".format(transfer.src, transfer.dst),
+                exc_info=True
+            )
+            transfer.error = exc
+
+        transfer.elapsed = time.time() - start
+        self.log.debug("{} {} -> {} ({:.2f} MB/s)".format(
+            transfer.method, transfer.src, transfer.dst, transfer.throughput
+        ))
+        self._report_progress(transfer)
+        return transfer
+
+    def _report_progress(self, transfer):
+        with self._progress_lock:
+            self._processed_count += 1
+            if self.progress_callback is None:
+                return
+
+            try:
+                self.progress_callback(
+                    transfer, self._processed_count, len(self.transfers)
+                )
+            except Exception:
+                self.log.warning(
+                    "Transfer progress callback failed.", exc_info=True
+                )
+
+    def _skip_identical(self, transfer):
+        if (
+            not self.skip_identical
+            or not self.checksum
+            or not os.path.exists(transfer.dst)
+            or os.path.getsize(transfer.dst) != transfer.size
+        ):
+            return False
+
+        src_checksum = file_checksum(
+            transfer.src, self.checksum, self.chunk_size
+        )
+        if src_checksum != file_checksum(
+            transfer.dst, self.checksum, self.chunk_size
+        ):
+            return False
+
+        transfer.checksum = src_checksum
+        transfer.method = "verified"
+        transfer.resumed_bytes = transfer.size
+        return True
+
+    def _link(self, transfer):
+        if not self.allow_hardlink and not self.allow_reflink:
+            return False
+
+        if not _same_device(transfer.src, transfer.dst):
+            return False
+
+        # Use different path than partial copy so it can be still resumed
+        part_path = transfer.dst + ".link" + self.partial_suffix
+        if os.path.exists(part_path):
+            os.remove(part_path)
+
+        method = None
+        if self.allow_hardlink:
+            try:
+                filelink.create(transfer.src, part_path, filelink.HARDLINK)
+                method = "hardlink"
+            except OSError:
+                self.log.debug("Hardlink failed for {}".format(transfer.src))
+
+        if method is None and self.allow_reflink:
+            if _reflink(transfer.src, part_path):
+                method = "reflink"
+
+        if method is None:
+            return False
+
+        _replace(part_path, transfer.dst)
+        transfer.method = method
+        if self.checksum:
+            transfer.checksum = file_checksum(
+                transfer.src, self.checksum, self.chunk_size
+            )
+        return True
+
+    def _copy(self, transfer):
+        part_path = transfer.dst + self.partial_suffix
+        resume = os.path.exists(part_path)
+        if not resume and not self.checksum:
+            copyfile(transfer.src, part_path)
+            _replace(part_path, transfer.dst)
+            transfer.method = "copy"
+            return
+
+        hasher = None
+        if self.checksum:
+            algorithm, hasher = get_hasher(self.checksum)
+
+        mode = "r+b" if resume else "wb"
+        with open(transfer.src, "rb") as src_file:
+            with open(part_path, mode) as dst_file:
+                offset = 0
+                if resume:
+                    offset = self._verify_partial(
+                        transfer, src_file, dst_file, hasher
+                    )
+                    src_file.seek(offset)
+                    dst_file.seek(offset)
+                    dst_file.truncate()
+
+                while True:
+                    chunk = src_file.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    if hasher is not None:
+                        hasher.update(chunk)
+                    dst_file.write(chunk)
+
+        _replace(part_path, transfer.dst)
+        transfer.resumed_bytes = offset
+        transfer.method = "resume" if offset else "copy"
+        if hasher is not None:
+            transfer.checksum = "{}:{}".format(algorithm, hasher.hexdigest())
+
+    def _verify_partial(self, transfer, src_file, dst_file, hasher):
+        """Return offset until which partial file matches the source."""
+        part_size = os.fstat(dst_file.fileno()).st_size
+        if part_size > transfer.size:
+            return 0
+
+        offset = 0
+        while offset < part_size:
+            to_read = min(self.chunk_size, part_size - offset)
+            src_chunk = src_file.read(to_read)
+            if src_chunk != dst_file.read(to_read):
+                break
+            if hasher is not None:
+                hasher.update(src_chunk)
+            offset += len(src_chunk)
+
+        if offset:
+            self.log.debug("Resuming {} from {} bytes".format(
+                transfer.dst, offset
+            ))
+        return offset
+
+
+class TransferManifest(object):
+    """Json manifest of transferred files stored in destination directory.
+
+    Manifest keeps size, modification times and checksum of each transferred
+    file so repeated or interrupted transfer to the same directory can skip
+    files which were already transferred and were not changed since.
+
+    Args:
+        root (str): Directory where manifest is stored. Paths of files in
+            manifest are relative to this directory.
+        filename (str): Name of manifest file.
+        verify_checksums (bool): Compare checksum of destination file with
+            checksum in manifest before it is skipped. Otherwise only size
+            and modification times are compared.
+    """
+
+    default_filename = ".transfer_manifest.json"
+
+    def __init__(self, root, filename=None, verify_checksums=False):
+        self.root = os.path.normpath(root)
+        self.path = os.path.join(self.root, filename or self.default_filename)
+        self.verify_checksums = verify_checksums
+
+        self._lock = threading.Lock()
+        self.files = {}
+        self.load()
+
+    def load(self):
+        """Load entries of existing manifest file."""
+        if not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path, "r") as stream:
+                data = json.load(stream)
+            self.files = data.get("files") or {}
+
+        except Exception:
+            log.warning(
+                "Manifest \"{}\" can't be read.".format(self.path),
+                exc_info=True
+            )
+
+    def save(self):
+        """Write manifest file (replaced at once so it's never partial)."""
+        with self._lock:
+            data = {"version": 1, "files": dict(self.files)}
+
+        _makedirs(self.root)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as stream:
+            json.dump(data, stream, indent=4, sort_keys=True)
+        _replace(tmp_path, self.path)
+
+    def key(self, path):
+        return os.path.relpath(os.path.normpath(path), self.root).replace(
+            "\\", "/"
+        )
+
+    def add(self, transfer):
+        """Store entry of successfully processed transfer."""
+        if transfer.error or transfer.method is None:
+            return
+
+        src_stat = os.stat(transfer.src)
+        dst_stat = os.stat(transfer.dst)
+        with self._lock:
+            self.files[self.key(transfer.dst)] = {
+                "source": transfer.src,
+                "size": dst_stat.st_size,
+                "source_mtime": src_stat.st_mtime,
+                "mtime": dst_stat.st_mtime,
+                "checksum": transfer.checksum,
+                "method": transfer.method
+            }
+
+    def is_verified(self, transfer):
+        """Destination of transfer matches manifest and it's source.
+
+        Checksum and size of verified transfer are filled from manifest.
+        """
+        with self._lock:
+            entry = self.files.get(self.key(transfer.dst))
+
+        if not entry or entry.get("source") != transfer.src:
+            return False
+
+        try:
+            src_stat = os.stat(transfer.src)
+            dst_stat = os.stat(transfer.dst)
+        except OSError:
+            return False
+
+        if (
+            src_stat.st_size != entry["size"]
+            or dst_stat.st_size != entry["size"]
+            or src_stat.st_mtime != entry["source_mtime"]
+            or dst_stat.st_mtime != entry["mtime"]
+        ):
+            return False
+
+        checksum = entry.get("checksum")
+        if self.verify_checksums and checksum:
+            algorithm = checksum.split(":", 1)[0]
+            if algorithm == "xxh64":
+                algorithm = "xxhash"
+            if file_checksum(transfer.dst, algorithm) != checksum:
+                return False
+
+        transfer.size = entry["size"]
+        transfer.checksum = checksum
+        transfer.resumed_bytes = transfer.size
+        transfer.method = "verified"
+        return True
@@ -1,17 +1,21 @@
 import os
+import sys
 import copy
-import shutil
+import json
+import time
 import collections
 
+import six
+
 import clique
 from bson.objectid import ObjectId
 
 from avalon import pipeline
-from avalon.vendor import filelink
 from avalon.tools.libraryloader.io_nonsingleton import DbConnector
 
 from pypeapp import Anatomy
 from pype.ftrack import BaseAction
+from pype.file_transfer import TransferEngine, TransferManifest
 from pype.ftrack.lib.avalon_sync import CustAttrIdKey
 
 
@@ -27,6 +31,19 @@ class Delivery(BaseAction):
 
     db_con = DbConnector()
 
+    # Maximum number of files copied at once
+    transfer_workers = 8
+    # Checksum algorithm of files stored to delivery manifest
+    checksum_algorithm = "xxhash"
+    # Hardlink files when delivered to the same disk as published files
+    transfer_hardlink = True
+    # Read delivered files again to compare checksums when delivery is resumed
+    verify_checksums = False
+    # Name of manifest file stored to root folder of delivery
+    manifest_filename = ".delivery_manifest.json"
+    # Minimum seconds between updates of progress in ftrack job
+    progress_interval = 5
+
     def discover(self, session, entities, event):
         for entity in entities:
             if entity.entity_type.lower() == "assetversion":
@@ -294,6 +311,7 @@ class Delivery(BaseAction):
                 repre = repres_by_name.get(comp_name)
                 repres_to_deliver.append(repre)
 
+        transfers = []
         anatomy = Anatomy(project_name)
         for repre in repres_to_deliver:
             # Get destination repre path
@@ -342,17 +360,19 @@ class Delivery(BaseAction):
             # TODO add backup solution where root of path from component
             # is repalced with root
             if not frame:
-                self.process_single_file(
+                transfers.extend(self.process_single_file(
                     repre_path, anatomy, anatomy_name, anatomy_data
-                )
+                ))
 
             else:
-                self.process_sequence(
+                transfers.extend(self.process_sequence(
                     repre_path, anatomy, anatomy_name, anatomy_data
-                )
+                ))
 
         self.db_con.uninstall()
 
+        self.deliver_files(session, transfers)
+
         return self.report()
 
     def process_single_file(
@@ -364,7 +384,7 @@ class Delivery(BaseAction):
         if not os.path.exists(delivery_folder):
             os.makedirs(delivery_folder)
 
-        self.copy_file(repre_path, delivery_path)
+        return [(repre_path, delivery_path)]
 
     def process_sequence(
         self, repre_path, anatomy, anatomy_name, anatomy_data
@@ -383,7 +403,7 @@ class Delivery(BaseAction):
             msg = "Source file was not found"
             self.report_items[msg].append(repre_path)
             self.log.warning("{} <{}>".format(msg, repre_path))
-            return
+            return []
 
         src_collections, remainder = clique.assemble(os.listdir(dir_path))
         src_collection = None
@@ -403,7 +423,7 @@ class Delivery(BaseAction):
             msg = "Source collection of files was not found"
             self.report_items[msg].append(repre_path)
             self.log.warning("{} <{}>".format(msg, repre_path))
-            return
+            return []
 
         frame_indicator = "@####@"
 
@@ -411,7 +431,6 @@ class Delivery(BaseAction):
         anatomy_filled = anatomy.format(anatomy_data)
 
         delivery_path = anatomy_filled["delivery"][anatomy_name]
-        print(delivery_path)
         delivery_folder = os.path.dirname(delivery_path)
         dst_head, dst_tail = delivery_path.split(frame_indicator)
         dst_padding = src_collection.padding
@@ -424,6 +443,7 @@ class Delivery(BaseAction):
         if not os.path.exists(delivery_folder):
             os.makedirs(delivery_folder)
 
+        transfers = []
         src_head = src_collection.head
         src_tail = src_collection.tail
         for index in src_collection.indexes:
@@ -436,7 +456,9 @@ class Delivery(BaseAction):
             dst_padding = dst_collection.format("{padding}") % index
             dst = "{}{}{}".format(dst_head, dst_padding, dst_tail)
 
-            self.copy_file(src, dst)
+            transfers.append((src, dst))
+
+        return transfers
 
     def path_from_represenation(self, representation, anatomy):
         try:
@@ -458,17 +480,154 @@ class Delivery(BaseAction):
 
         return os.path.normpath(path)
 
-    def copy_file(self, src_path, dst_path):
-        if os.path.exists(dst_path):
+    def deliver_files(self, session, transfers):
+        """Transfer files in parallel and report progress to ftrack job.
+
+        Transferred files are stored to manifest in root folder of delivery.
+        Files which are already in manifest and were not changed since are
+        skipped so interrupted delivery can be launched again.
+        """
+        if not transfers:
             return
-        try:
-            filelink.create(
-                src_path,
-                dst_path,
-                filelink.HARDLINK
+
+        engine = TransferEngine(
+            workers=self.transfer_workers,
+            checksum=self.checksum_algorithm,
+            allow_hardlink=self.transfer_hardlink,
+            log=self.log
+        )
+        for src, dst in transfers:
+            if os.path.normpath(src) != os.path.normpath(dst):
+                engine.add(src, dst)
+
+        common_root = self.manifest_root([
+            transfer.dst for transfer in engine.transfers
+        ])
+        manifests = {}
+        manifest_by_dst = {}
+        for transfer in engine.transfers:
+            root = common_root or os.path.dirname(transfer.dst)
+            manifest = manifests.get(root)
+            if manifest is None:
+                manifest = TransferManifest(
+                    root, self.manifest_filename, self.verify_checksums
+                )
+                manifests[root] = manifest
+            manifest_by_dst[transfer.dst] = manifest
+            manifest.is_verified(transfer)
+
+        total = len(engine.transfers)
+        skipped = len([
+            transfer for transfer in engine.transfers
+            if transfer.method == "verified"
+        ])
+        if skipped:
+            self.log.info(
+                "Skipping {} of {} already delivered file(s).".format(
+                    skipped, total
+                )
             )
-        except OSError:
-            shutil.copyfile(src_path, dst_path)
+
+        job = self.create_job(session, "Delivery: Preparing {} file(s)".format(
+            total
+        ))
+        last_update = {"time": time.time()}
+
+        def progress_callback(transfer, processed, total):
+            manifest_by_dst[transfer.dst].add(transfer)
+            now = time.time()
+            if (
+                processed != total
+                and now - last_update["time"] < self.progress_interval
+            ):
+                return
+
+            last_update["time"] = now
+            for manifest in manifests.values():
+                manifest.save()
+            self.update_job(
+                session,
+                job,
+                "Delivery: {}/{} file(s) ({:.0f}%)".format(
+                    processed, total, processed * 100.0 / total
+                )
+            )
+
+        engine.progress_callback = progress_callback
+
+        status = "done"
+        try:
+            engine.process()
+
+        except RuntimeError:
+            status = "failed"
+            msg = "Failed to deliver files"
+            for transfer in engine.transfers:
+                if transfer.error:
+                    self.report_items[msg].append("{} ({})".format(
+                        transfer.dst, str(transfer.error)
+                    ))
+
+        except Exception:
+            self.update_job(session, job, "Delivery: Crashed", "failed")
+            raise
+
+        finally:
+            for manifest in manifests.values():
+                manifest.save()
+
+        self.log.info("Delivered files:\n{}".format(engine.report()))
+        self.update_job(
+            session,
+            job,
+            "Delivery: Finished {} file(s)".format(total),
+            status
+        )
+
+    def manifest_root(self, dst_paths):
+        """Common folder of delivered files where manifest is stored.
+
+        Returns `None` when files don't have common folder (e.g. are on
+        different drives), manifest is stored next to each file then.
+        """
+        try:
+            root = os.path.normpath(os.path.commonpath(dst_paths))
+        except ValueError:
+            return None
+
+        if root in dst_paths:
+            root = os.path.dirname(root)
+        return root
+
+    def create_job(self, session, description):
+        user = session.query(
+            "User where username is \"{}\"".format(session.api_user)
+        ).one()
+        job = session.create("Job", {
+            "user": user,
+            "status": "running",
+            "data": json.dumps({"description": description})
+        })
+        self.commit(session)
+        return job
+
+    def update_job(self, session, job, description, status=None):
+        job["data"] = json.dumps({"description": description})
+        if status:
+            job["status"] = status
+
+        try:
+            self.commit(session)
+        except Exception:
+            self.log.warning("Job progress update failed.", exc_info=True)
+
+    def commit(self, session):
+        try:
+            session.commit()
+        except Exception:
+            tp, value, tb = sys.exc_info()
+            session.rollback()
+            six.reraise(tp, value, tb)
 
     def report(self):
         items = []
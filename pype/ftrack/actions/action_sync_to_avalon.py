@@ -47,6 +47,10 @@ class SyncToAvalonLocal(BaseAction):
         os.environ.get('PYPE_STATICS_SERVER', '')
     )
 
+    #: Synchronize only entities changed since last synchronization
+    #: (falls back to full synchronization when not possible)
+    incremental_sync = True
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.entities_factory = SyncEntitiesFactory(self.log, self.session)
@@ -70,7 +74,9 @@ class SyncToAvalonLocal(BaseAction):
             ft_project_name = in_entities[0]["project"]["full_name"]
 
         try:
-            output = self.entities_factory.launch_setup(ft_project_name)
+            output = self.entities_factory.launch_setup(
+                ft_project_name, incremental=self.incremental_sync
+            )
             if output is not None:
                 return output
 
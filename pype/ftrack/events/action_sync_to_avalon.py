@@ -50,6 +50,10 @@ class SyncToAvalonServer(BaseAction):
         )
     )
 
+    #: Synchronize only entities changed since last synchronization
+    #: (falls back to full synchronization when not possible)
+    incremental_sync = True
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.entities_factory = SyncEntitiesFactory(self.log, self.session)
@@ -105,7 +109,9 @@ class SyncToAvalonServer(BaseAction):
             ft_project_name = in_entities[0]["project"]["full_name"]
 
         try:
-            output = self.entities_factory.launch_setup(ft_project_name)
+            output = self.entities_factory.launch_setup(
+                ft_project_name, incremental=self.incremental_sync
+            )
             if output is not None:
                 return output
 
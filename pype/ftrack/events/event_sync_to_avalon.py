@@ -20,6 +20,7 @@ import ftrack_api
 from pype.ftrack import BaseEvent
 
 from pype.ftrack.lib.io_nonsingleton import DbConnector
+from pype.ftrack.lib.ftrack_cache import shared_cache
 
 
 class SyncToAvalonEvent(BaseEvent):
@@ -386,6 +387,7 @@ class SyncToAvalonEvent(BaseEvent):
 
         self._avalon_custom_attributes = None
         self._ent_types_by_name = None
+        self._hier_values_by_id = {}
 
         self.ftrack_ents_by_id = {}
         self.obj_id_ent_type_map = {}
@@ -422,7 +424,8 @@ class SyncToAvalonEvent(BaseEvent):
             server_url=session.server_url,
             api_key=session.api_key,
             api_user=session.api_user,
-            auto_connect_event_hub=True
+            auto_connect_event_hub=True,
+            **shared_cache.session_kwargs()
         )
         atexit.register(lambda: self.process_session.close())
 
@@ -1240,16 +1243,41 @@ class SyncToAvalonEvent(BaseEvent):
             hier_keys.append(key)
             defaults[key] = attr["default"]
 
-        hier_values = avalon_sync.get_hierarchical_attributes(
-            self.process_session, entity, hier_keys, defaults
-        )
+        hier_values = self._hier_values_by_id.get(entity["id"])
+        if hier_values is None:
+            hier_values = avalon_sync.get_hierarchical_attributes(
+                self.process_session, entity, hier_keys, defaults
+            )
         for key, val in hier_values.items():
+            if keys and key not in keys:
+                continue
             if key == CustAttrIdKey:
                 continue
             output[key] = val
 
         return output
 
+    def prefetch_hier_values(self, ftrack_ids):
+        """Resolve hierarchical attributes of multiple entities at once.
+
+        Values are used by `get_cust_attr_values` instead of querying each
+        entity separately.
+        """
+        ftrack_ids = [
+            ftrack_id for ftrack_id in ftrack_ids
+            if ftrack_id not in self._hier_values_by_id
+        ]
+        if not ftrack_ids:
+            return
+
+        _, hier_attrs = self.avalon_custom_attributes
+        defaults = {attr["key"]: attr["default"] for attr in hier_attrs}
+        self._hier_values_by_id.update(
+            avalon_sync.get_hierarchical_attributes_bulk(
+                self.process_session, ftrack_ids, defaults.keys(), defaults
+            )
+        )
+
     def process_renamed(self):
         ent_infos = self.ftrack_renamed
         if not ent_infos:
@@ -1612,6 +1640,8 @@ class SyncToAvalonEvent(BaseEvent):
             ft_id = ent_info["entityId"]
             to_sync_by_id[ft_id] = self.ftrack_ents_by_id[ft_id]
 
+        self.prefetch_hier_values(to_sync_by_id.keys())
+
         # cache regex success (for tasks)
         for ftrack_id, entity in to_sync_by_id.items():
             if entity.entity_type.lower() == "project":
@@ -177,7 +177,7 @@ def legacy_server(ftrack_url):
         time.sleep(1)
 
 
-def main_loop(ftrack_url):
+def main_loop(ftrack_url, processor_workers=1):
     """ This is main loop of event handling.
 
     Loop is handling threads which handles subprocesses of event storer and
@@ -186,7 +186,11 @@ def main_loop(ftrack_url):
     server is not accessible. When threads are started it is checked for socket
     signals as heartbeat. Heartbeat must become at least once per 30sec
     otherwise thread will be killed.
+
+    With multiple processor workers is each worker processing events of
+    different projects (events are sharded by project id).
     """
+    processor_workers = max(1, int(processor_workers))
 
     os.environ["FTRACK_EVENT_SUB_ID"] = str(uuid.uuid1())
     # Get mongo hostname and port for testing mongo connection
@@ -212,9 +216,9 @@ def main_loop(ftrack_url):
     processor_name = "ProcessorThread"
     processor_port = 10011
     processor_path = "{}/sub_event_processor.py".format(file_path)
-    processor_thread = None
-    processor_last_failed = datetime.datetime.now()
-    processor_failed_count = 0
+    processor_threads = [None] * processor_workers
+    processor_last_failed = [datetime.datetime.now()] * processor_workers
+    processor_failed_count = [0] * processor_workers
 
     statuser_name = "StorerThread"
     statuser_port = 10021
@@ -231,11 +235,11 @@ def main_loop(ftrack_url):
 
     # stop threads on exit
     # TODO check if works and args have thread objects!
-    def on_exit(processor_thread, storer_thread, statuser_thread):
-        if processor_thread is not None:
-            processor_thread.stop()
-            processor_thread.join()
-            processor_thread = None
+    def on_exit(processor_threads, storer_thread, statuser_thread):
+        for processor_thread in processor_threads:
+            if processor_thread is not None:
+                processor_thread.stop()
+                processor_thread.join()
 
         if storer_thread is not None:
             storer_thread.stop()
@@ -249,7 +253,7 @@ def main_loop(ftrack_url):
 
     atexit.register(
         on_exit,
-        processor_thread=processor_thread,
+        processor_threads=processor_threads,
         storer_thread=storer_thread,
         statuser_thread=statuser_thread
     )
@@ -286,10 +290,11 @@ def main_loop(ftrack_url):
                 storer_thread.join()
                 storer_thread = None
 
-            if processor_thread is not None:
-                processor_thread.stop()
-                processor_thread.join()
-                processor_thread = None
+            for idx, processor_thread in enumerate(processor_threads):
+                if processor_thread is not None:
+                    processor_thread.stop()
+                    processor_thread.join()
+                    processor_threads[idx] = None
 
             printed_ftrack_error = True
             printed_mongo_error = True
@@ -341,7 +346,7 @@ def main_loop(ftrack_url):
 
         elif statuser_thread.stop_subprocess:
             print("Main process was stopped by action")
-            on_exit(processor_thread, storer_thread, statuser_thread)
+            on_exit(processor_threads, storer_thread, statuser_thread)
             os.kill(os.getpid(), signal.SIGTERM)
             return 1
 
@@ -381,51 +386,61 @@ def main_loop(ftrack_url):
                 storer_failed_count = 0
             storer_last_failed = _storer_last_failed
 
-        # ====== PROCESSOR =======
-        if processor_thread is None:
-            if processor_failed_count < max_fail_count:
-                processor_thread = socket_thread.SocketThread(
-                    processor_name, processor_port, processor_path
-                )
-                processor_thread.start()
-
-            elif processor_failed_count == max_fail_count:
-                print((
-                    "Processor failed {}times in row"
-                    " I'll try to run again {}s later"
-                ).format(str(max_fail_count), str(wait_time_after_max_fail)))
-                processor_failed_count += 1
-
-            elif ((
-                datetime.datetime.now() - processor_last_failed
-            ).seconds > wait_time_after_max_fail):
-                processor_failed_count = 0
-
-        # If thread failed test Ftrack and Mongo connection
-        elif not processor_thread.isAlive():
-            if processor_thread.mongo_error:
-                raise Exception(
-                    "Exiting because have issue with acces to MongoDB"
-                )
-            processor_thread.join()
-            processor_thread = None
-            ftrack_accessible = False
-            mongo_accessible = False
+        # ====== PROCESSORS =======
+        for idx in range(processor_workers):
+            processor_thread = processor_threads[idx]
+            if processor_thread is None:
+                if processor_failed_count[idx] < max_fail_count:
+                    processor_thread = socket_thread.SocketThread(
+                        "{}{}".format(processor_name, idx or ""),
+                        processor_port,
+                        processor_path,
+                        [str(idx), str(processor_workers)]
+                    )
+                    processor_thread.start()
+                    processor_threads[idx] = processor_thread
+
+                elif processor_failed_count[idx] == max_fail_count:
+                    print((
+                        "Processor failed {}times in row"
+                        " I'll try to run again {}s later"
+                    ).format(
+                        str(max_fail_count), str(wait_time_after_max_fail)
+                    ))
+                    processor_failed_count[idx] += 1
+
+                elif ((
+                    datetime.datetime.now() - processor_last_failed[idx]
+                ).seconds > wait_time_after_max_fail):
+                    processor_failed_count[idx] = 0
+
+            # If thread failed test Ftrack and Mongo connection
+            elif not processor_thread.isAlive():
+                if processor_thread.mongo_error:
+                    raise Exception(
+                        "Exiting because have issue with acces to MongoDB"
+                    )
+                processor_thread.join()
+                processor_threads[idx] = None
+                ftrack_accessible = False
+                mongo_accessible = False
 
-            _processor_last_failed = datetime.datetime.now()
-            delta_time = (
-                _processor_last_failed - processor_last_failed
-            ).seconds
+                _processor_last_failed = datetime.datetime.now()
+                delta_time = (
+                    _processor_last_failed - processor_last_failed[idx]
+                ).seconds
 
-            if delta_time < min_fail_seconds:
-                processor_failed_count += 1
-            else:
-                processor_failed_count = 0
-            processor_last_failed = _processor_last_failed
+                if delta_time < min_fail_seconds:
+                    processor_failed_count[idx] += 1
+                else:
+                    processor_failed_count[idx] = 0
+                processor_last_failed[idx] = _processor_last_failed
 
         if statuser_thread is not None:
             statuser_thread.set_process("storer", storer_thread)
-            statuser_thread.set_process("processor", processor_thread)
+            statuser_thread.set_process(
+                "processor", tuple(processor_threads)
+            )
 
         time.sleep(1)
 
@@ -523,13 +538,26 @@ def main(argv):
         help="Load creadentials from apps dir",
         action="store_true"
     )
+    parser.add_argument(
+        "-processorworkers", type=int,
+        help=(
+            "Number of event processor subprocesses. Events are sharded"
+            " between processors by project."
+            " (default from environment: $FTRACK_EVENT_PROCESSOR_WORKERS"
+            " or 1)"
+        )
+    )
     ftrack_url = os.environ.get('FTRACK_SERVER')
     username = os.environ.get('FTRACK_API_USER')
     api_key = os.environ.get('FTRACK_API_KEY')
     event_paths = os.environ.get('FTRACK_EVENTS_PATH')
+    processor_workers = os.environ.get("FTRACK_EVENT_PROCESSOR_WORKERS") or 1
 
     kwargs, args = parser.parse_known_args(argv)
 
+    if kwargs.processorworkers:
+        processor_workers = kwargs.processorworkers
+
     if kwargs.ftrackurl:
         ftrack_url = kwargs.ftrackurl
 
@@ -584,7 +612,7 @@ def main(argv):
     if legacy:
         return legacy_server(ftrack_url)
 
-    return main_loop(ftrack_url)
+    return main_loop(ftrack_url, processor_workers)
 
 
 if __name__ == "__main__":
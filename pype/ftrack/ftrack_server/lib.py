@@ -1,5 +1,6 @@
 import os
 import sys
+import zlib
 import logging
 import getpass
 import atexit
@@ -97,6 +98,34 @@ def get_ftrack_event_mongo_info():
     return url, database, collection
 
 
+def get_event_project_id(event_data):
+    """Find id of ftrack project which event is related to.
+
+    Returns:
+        str: Project id or `None` if event is not related to a project.
+    """
+    entities = (event_data.get("data") or {}).get("entities") or []
+    for ent_info in entities:
+        if ent_info.get("entityType") == "show":
+            return ent_info.get("entityId")
+
+        for parent in ent_info.get("parents") or []:
+            if parent.get("entityType") == "show":
+                return parent.get("entityId")
+    return None
+
+
+def get_event_shard_key(event_data):
+    """Number used to split events between processors by project.
+
+    Events which are not related to any project have key `0`.
+    """
+    project_id = get_event_project_id(event_data)
+    if not project_id:
+        return 0
+    return zlib.crc32(project_id.encode("utf-8")) & 0xffffffff
+
+
 def check_ftrack_url(url, log_errors=True):
     """Checks if Ftrack server is responding"""
     if not url:
@@ -203,12 +232,37 @@ class ProcessEventHub(SocketBaseEventHub):
     is_table_created = False
     pypelog = Logger().get_logger("Session Processor")
 
+    # Watch inserted events with change stream (requires replica set)
+    # - polling is used when change streams are not available
+    use_change_stream = True
+    # Seconds between polls of not processed events
+    poll_interval = 0.5
+    # Processed events are removed by TTL index after this time
+    processed_events_ttl = 3 * 24 * 60 * 60
+    # Processed flags are stored in batches
+    processed_batch_size = 100
+    processed_batch_interval = 1.0
+
+    # Index of processor and count of all processors. Each processor claims
+    # only events of it's shard (events of same project are in same shard).
+    worker_index = 0
+    worker_count = 1
+    # Maximum number of events claimed at once
+    claim_batch_size = 20
+
     def __init__(self, *args, **kwargs):
         self.dbcon = DbConnector(
             mongo_url=self.url,
             database_name=self.database,
             table_name=self.table_name
         )
+        self._change_stream = None
+        self._processed_ids = []
+        self._last_processed_flush = time.time()
+        # Ids of events in queue or handled but not flushed yet
+        self._pending_ids = set()
+        self._last_cleanup = 0
+        self._ttl_index_created = False
         super(ProcessEventHub, self).__init__(*args, **kwargs)
 
     def prepare_dbcon(self):
@@ -232,27 +286,184 @@ class ProcessEventHub(SocketBaseEventHub):
             self.sock.sendall(b"MongoError")
             sys.exit(0)
 
+        self.prepare_indexes()
+        if self.worker_count > 1:
+            self.release_claimed()
+
+    @property
+    def worker_id(self):
+        return "{}/{}".format(self.worker_index, self.worker_count)
+
+    def shard_filter(self):
+        """Mongo filter of events which belong to this processor."""
+        shard_filter = {
+            "pype_data.shard_key": {
+                "$mod": [self.worker_count, self.worker_index]
+            }
+        }
+        # Events stored without shard key are processed by first processor
+        if self.worker_index == 0:
+            shard_filter = {"$or": [
+                shard_filter,
+                {"pype_data.shard_key": {"$exists": False}}
+            ]}
+        return shard_filter
+
+    def release_claimed(self):
+        """Release events claimed by previous run of this processor.
+
+        Previous run crashed or was killed before events were processed.
+        """
+        self.dbcon.update_many(
+            {
+                "pype_data.is_processed": False,
+                "pype_data.claimed_by": self.worker_id
+            },
+            {"$unset": {"pype_data.claimed_by": True}}
+        )
+
+    def claim_events(self):
+        """Atomically claim not processed events of processor's shard.
+
+        Events are claimed one by one in order they were stored so events
+        of one project are processed in right order.
+
+        Returns:
+            bool: Any event was claimed.
+        """
+        query = {
+            "$and": [
+                {"pype_data.is_processed": False},
+                {"pype_data.claimed_by": None},
+                self.shard_filter()
+            ]
+        }
+        found = False
+        for _ in range(self.claim_batch_size):
+            event_data = self.dbcon.find_one_and_update(
+                query,
+                {"$set": {
+                    "pype_data.claimed_by": self.worker_id,
+                    "pype_data.claimed_at": datetime.datetime.utcnow()
+                }},
+                sort=[("pype_data.stored", pymongo.ASCENDING)],
+                return_document=pymongo.ReturnDocument.AFTER
+            )
+            if event_data is None:
+                break
+
+            if self.queue_event_data(event_data):
+                found = True
+
+        return found
+
+    def prepare_indexes(self):
+        """Create indexes for loading and cleanup of processed events.
+
+        Processed events are removed by TTL index. Cleanup is done
+        periodically in `load_events` when index can't be created.
+        """
+        try:
+            self.dbcon.create_index(
+                [
+                    ("pype_data.is_processed", pymongo.ASCENDING),
+                    ("pype_data.stored", pymongo.ASCENDING)
+                ],
+                name="pype_not_processed"
+            )
+            self.dbcon.create_index(
+                [("pype_data.stored", pymongo.ASCENDING)],
+                name="pype_processed_ttl",
+                expireAfterSeconds=self.processed_events_ttl,
+                partialFilterExpression={"pype_data.is_processed": True}
+            )
+            if self.worker_count > 1:
+                self.dbcon.create_index(
+                    [
+                        ("pype_data.is_processed", pymongo.ASCENDING),
+                        ("pype_data.claimed_by", pymongo.ASCENDING),
+                        ("pype_data.shard_key", pymongo.ASCENDING)
+                    ],
+                    name="pype_claim"
+                )
+            self._ttl_index_created = True
+
+        except pymongo.errors.PyMongoError:
+            self.pypelog.warning(
+                "Indexes of events collection can't be created.",
+                exc_info=True
+            )
+
+    def open_change_stream(self):
+        """Open change stream of inserted events.
+
+        Returns:
+            bool: Change stream is opened.
+        """
+        if not self.use_change_stream:
+            return False
+
+        try:
+            pipeline = [{
+                "$match": {"operationType": {"$in": ["insert", "replace"]}}
+            }]
+            self._change_stream = self.dbcon.watch(
+                pipeline,
+                full_document="updateLookup",
+                max_await_time_ms=int(self.poll_interval * 1000)
+            )
+        except pymongo.errors.PyMongoError:
+            self.pypelog.info((
+                "Change streams are not available (standalone Mongo?)."
+                " Using polling of events."
+            ), exc_info=True)
+            self._change_stream = None
+            return False
+        return True
+
+    def close_change_stream(self):
+        if self._change_stream is None:
+            return
+        try:
+            self._change_stream.close()
+        except pymongo.errors.PyMongoError:
+            pass
+        self._change_stream = None
+
     def wait(self, duration=None):
         """Overriden wait
 
-        Event are loaded from Mongo DB when queue is empty. Handled event is
-        set as processed in Mongo DB.
+        Event are loaded from Mongo DB when queue is empty. Inserted events
+        are received from change stream if available, otherwise Mongo DB is
+        polled. Handled events are set as processed in Mongo DB in batches.
         """
         started = time.time()
         self.prepare_dbcon()
+        # Open stream before loading so no event is missed
+        self.open_change_stream()
+        self.load_events()
         while True:
             try:
                 event = self._event_queue.get(timeout=0.1)
             except queue.Empty:
-                if not self.load_events():
-                    time.sleep(0.5)
+                self.flush_processed()
+                if self._change_stream is not None:
+                    self.load_stream_events()
+                elif not self.load_events():
+                    time.sleep(self.poll_interval)
             else:
                 try:
                     self._handle(event)
-                    self.dbcon.update_one(
-                        {"id": event["id"]},
-                        {"$set": {"pype_data.is_processed": True}}
-                    )
+                    self._processed_ids.append(event["id"])
+                    if (
+                        len(self._processed_ids) >= self.processed_batch_size
+                        or (
+                            time.time() - self._last_processed_flush
+                            >= self.processed_batch_interval
+                        )
+                    ):
+                        self.flush_processed()
+
                 except pymongo.errors.AutoReconnect:
                     self.pypelog.error((
                         "Mongo server \"{}\" is not responding, exiting."
@@ -260,20 +471,100 @@ class ProcessEventHub(SocketBaseEventHub):
                     sys.exit(0)
                 # Additional special processing of events.
                 if event['topic'] == 'ftrack.meta.disconnected':
+                    self.flush_processed()
                     break
 
             if duration is not None:
                 if (time.time() - started) > duration:
+                    self.flush_processed()
                     break
 
-    def load_events(self):
-        """Load not processed events sorted by stored date"""
-        ago_date = datetime.datetime.now() - datetime.timedelta(days=3)
-        result = self.dbcon.delete_many({
+    def flush_processed(self):
+        """Set handled events as processed in Mongo DB with one update."""
+        self._last_processed_flush = time.time()
+        if not self._processed_ids:
+            return
+
+        processed_ids = self._processed_ids
+        self._processed_ids = []
+        try:
+            self.dbcon.update_many(
+                {"id": {"$in": processed_ids}},
+                {"$set": {"pype_data.is_processed": True}}
+            )
+        except pymongo.errors.AutoReconnect:
+            self.pypelog.error((
+                "Mongo server \"{}\" is not responding, exiting."
+            ).format(os.environ["AVALON_MONGO"]))
+            sys.exit(0)
+
+        for event_id in processed_ids:
+            self._pending_ids.discard(event_id)
+
+    def load_stream_events(self):
+        """Load events inserted to Mongo DB from change stream.
+
+        Polling is used if change stream fails.
+        """
+        found = False
+        try:
+            while True:
+                change = self._change_stream.try_next()
+                if change is None:
+                    break
+                event_data = change.get("fullDocument")
+                if not event_data:
+                    continue
+
+                # Events must be claimed when multiple processors run
+                if self.worker_count > 1:
+                    shard_key = (
+                        event_data.get("pype_data") or {}
+                    ).get("shard_key", 0)
+                    if (
+                        shard_key % self.worker_count == self.worker_index
+                        and self.claim_events()
+                    ):
+                        found = True
+
+                elif self.queue_event_data(event_data):
+                    found = True
+
+        except pymongo.errors.PyMongoError:
+            self.pypelog.warning(
+                "Change stream failed. Using polling of events.",
+                exc_info=True
+            )
+            self.close_change_stream()
+            found = self.load_events()
+
+        return found
+
+    def cleanup_processed(self):
+        """Remove old processed events if TTL index is not available."""
+        if self._ttl_index_created:
+            return
+
+        # Cleanup once per hour is enough
+        if time.time() - self._last_cleanup < 60 * 60:
+            return
+        self._last_cleanup = time.time()
+
+        ago_date = datetime.datetime.now() - datetime.timedelta(
+            seconds=self.processed_events_ttl
+        )
+        self.dbcon.delete_many({
             "pype_data.stored": {"$lte": ago_date},
             "pype_data.is_processed": True
         })
 
+    def load_events(self):
+        """Load not processed events sorted by stored date"""
+        self.cleanup_processed()
+
+        if self.worker_count > 1:
+            return self.claim_events()
+
         not_processed_events = self.dbcon.find(
             {"pype_data.is_processed": False}
         ).sort(
@@ -282,23 +573,40 @@ class ProcessEventHub(SocketBaseEventHub):
 
         found = False
         for event_data in not_processed_events:
-            new_event_data = {
-                k: v for k, v in event_data.items()
-                if k not in ["_id", "pype_data"]
-            }
-            try:
-                event = ftrack_api.event.base.Event(**new_event_data)
-            except Exception:
-                self.logger.exception(L(
-                    'Failed to convert payload into event: {0}',
-                    event_data
-                ))
-                continue
-            found = True
-            self._event_queue.put(event)
+            if self.queue_event_data(event_data):
+                found = True
 
         return found
 
+    def queue_event_data(self, event_data):
+        """Convert stored event data to event and add it to queue.
+
+        Returns:
+            bool: Event was added to queue.
+        """
+        if (event_data.get("pype_data") or {}).get("is_processed"):
+            return False
+
+        if event_data.get("id") in self._pending_ids:
+            return False
+
+        new_event_data = {
+            k: v for k, v in event_data.items()
+            if k not in ["_id", "pype_data"]
+        }
+        try:
+            event = ftrack_api.event.base.Event(**new_event_data)
+        except Exception:
+            self.logger.exception(L(
+                'Failed to convert payload into event: {0}',
+                event_data
+            ))
+            return False
+
+        self._pending_ids.add(event["id"])
+        self._event_queue.put(event)
+        return True
+
     def _handle_packet(self, code, packet_identifier, path, data):
         """Override `_handle_packet` which skip events and extend heartbeat"""
         code_name = self._code_name_mapping[code]
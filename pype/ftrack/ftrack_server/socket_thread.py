@@ -182,6 +182,11 @@ class StatusSocketThread(SocketThread):
                 self.stop_subprocess = True
             else:
                 subp = self.process_threads.get(process_name)
-                if subp:
+                # Multiple processes may run with same name (e.g. processors)
+                if isinstance(subp, (tuple, list)):
+                    for _subp in subp:
+                        if _subp:
+                            _subp.stop()
+                elif subp:
                     subp.stop()
         connection.sendall(data)
@@ -8,6 +8,7 @@ from ftrack_server import FtrackServer
 from pype.ftrack.ftrack_server.lib import (
     SocketSession, ProcessEventHub, TOPIC_STATUS_SERVER
 )
+from pype.ftrack.lib.ftrack_cache import shared_cache
 import ftrack_api
 from pypeapp import Logger
 
@@ -57,6 +58,10 @@ def register(session):
 
 def main(args):
     port = int(args[-1])
+    # Worker index and count are passed when multiple processors run
+    if len(args) >= 4:
+        ProcessEventHub.worker_index = int(args[-3])
+        ProcessEventHub.worker_count = int(args[-2])
     # Create a TCP/IP socket
     sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 
@@ -68,7 +73,10 @@ def main(args):
     sock.sendall(b"CreatedProcess")
     try:
         session = SocketSession(
-            auto_connect_event_hub=True, sock=sock, Eventhub=ProcessEventHub
+            auto_connect_event_hub=True,
+            sock=sock,
+            Eventhub=ProcessEventHub,
+            **shared_cache.session_kwargs()
         )
         register(session)
         SessionFactory.session = session
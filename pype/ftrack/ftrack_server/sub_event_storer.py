@@ -1,15 +1,21 @@
 import os
 import sys
+import time
+import queue
+import atexit
 import datetime
+import tempfile
+import threading
 import signal
 import socket
 import pymongo
+import bson.json_util
 
 import ftrack_api
 from ftrack_server import FtrackServer
 from pype.ftrack.ftrack_server.lib import (
     SocketSession, StorerEventHub,
-    get_ftrack_event_mongo_info,
+    get_ftrack_event_mongo_info, get_event_shard_key,
     TOPIC_STATUS_SERVER, TOPIC_STATUS_SERVER_RESULT
 )
 from pype.ftrack.lib.custom_db_connector import DbConnector
@@ -34,6 +40,209 @@ dbcon = DbConnector(
 ignore_topics = []
 
 
+class EventWriteBuffer:
+    """Write-behind buffer storing events to Mongo in batches.
+
+    Events are written in background thread with `bulk_write` when batch is
+    full or flush interval passed so event hub does not wait for Mongo.
+    When Mongo is not available events are appended to local journal file
+    which is replayed when connection is back.
+    """
+
+    batch_size = 200
+    flush_interval = 0.5
+    # Seconds between attempts to reconnect when Mongo is not available
+    retry_interval = 5
+
+    def __init__(self, dbcon, journal_path):
+        self.dbcon = dbcon
+        self.journal_path = journal_path
+        self._queue = queue.Queue()
+        self._stop_event = threading.Event()
+        self._thread = None
+        # Time when writing to Mongo failed (None if Mongo is available)
+        self._offline_since = None
+        self._last_retry = 0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop writing thread and write all buffered events."""
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+
+    def add(self, event_data):
+        self._queue.put(event_data)
+
+    def _run(self):
+        try:
+            self.replay_journal()
+        except Exception:
+            log.error("Failed to replay events journal", exc_info=True)
+
+        while True:
+            # Unexpected error of one batch must not stop storing of events
+            try:
+                self._process_next()
+            except Exception:
+                log.error("Failed to store events", exc_info=True)
+
+            if self._stop_event.is_set() and self._queue.empty():
+                break
+
+    def _process_next(self):
+        batch = self._collect_batch()
+        if batch:
+            self.write(batch)
+
+        if (
+            self._offline_since is not None
+            and time.time() - self._last_retry > self.retry_interval
+        ):
+            self.replay_journal()
+
+    def _collect_batch(self):
+        batch = []
+        timeout_at = time.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = timeout_at - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def write(self, batch, replay=False):
+        """Write events to Mongo or to journal when Mongo is not available.
+
+        Batch which can't be stored for other reason than connection failure
+        is written event by event so only invalid events are dropped.
+
+        Returns:
+            bool: Events were written to Mongo (or dropped as invalid).
+        """
+        if self._offline_since is not None and not replay:
+            self.write_journal(batch)
+            return False
+
+        try:
+            if replay:
+                # Don't override events which were already stored (and maybe
+                # processed) before connection failed
+                requests = [
+                    pymongo.UpdateOne(
+                        {"id": event_data["id"]},
+                        {"$setOnInsert": event_data},
+                        upsert=True
+                    )
+                    for event_data in batch
+                ]
+            else:
+                requests = [
+                    pymongo.ReplaceOne(
+                        {"id": event_data["id"]}, event_data, upsert=True
+                    )
+                    for event_data in batch
+                ]
+
+            self.dbcon.bulk_write(requests, ordered=False)
+
+        except pymongo.errors.BulkWriteError as exc:
+            log.error("Some of {} events failed to store: {}".format(
+                len(batch), exc.details.get("writeErrors")
+            ))
+
+        except pymongo.errors.ConnectionFailure:
+            if self._offline_since is None:
+                log.warning((
+                    "Mongo server \"{}\" is not responding."
+                    " Storing events to journal \"{}\"."
+                ).format(os.environ["AVALON_MONGO"], self.journal_path))
+                self._offline_since = time.time()
+            self._last_retry = time.time()
+            if not replay:
+                self.write_journal(batch)
+            return False
+
+        except Exception:
+            if len(batch) == 1:
+                log.error(
+                    "Dropping event \"{}\" which can't be stored".format(
+                        batch[0].get("id")
+                    ),
+                    exc_info=True
+                )
+                return True
+
+            log.warning((
+                "Failed to store {} events at once. Storing one by one."
+            ).format(len(batch)), exc_info=True)
+            stored = True
+            for event_data in batch:
+                if not self.write([event_data], replay):
+                    stored = False
+                    if replay:
+                        break
+            return stored
+
+        log.debug("Stored {} event(s)".format(len(batch)))
+        return True
+
+    def write_journal(self, batch):
+        with open(self.journal_path, "a") as stream:
+            for event_data in batch:
+                stream.write(bson.json_util.dumps(event_data) + "\n")
+
+    def replay_journal(self):
+        """Write events from journal to Mongo and remove the journal."""
+        self._last_retry = time.time()
+        if not os.path.exists(self.journal_path):
+            self._offline_since = None
+            return
+
+        batch = []
+        with open(self.journal_path, "r") as stream:
+            for line in stream:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    batch.append(bson.json_util.loads(line))
+                except ValueError:
+                    log.warning("Skipping invalid journal line: {}".format(
+                        line
+                    ))
+
+        for idx in range(0, len(batch), self.batch_size):
+            if not self.write(batch[idx:idx + self.batch_size], replay=True):
+                # Keep journal for next attempt (replay is idempotent)
+                return
+
+        os.remove(self.journal_path)
+        if batch:
+            log.info("Replayed {} event(s) from journal.".format(len(batch)))
+        self._offline_since = None
+
+
+event_buffer = EventWriteBuffer(
+    dbcon,
+    os.path.join(
+        tempfile.gettempdir(),
+        "pype_ftrack_event_journal_{}.jsonl".format(table_name)
+    )
+)
+
+
 def install_db():
     try:
         dbcon.install()
@@ -54,25 +263,13 @@ def launch(event):
 
     event_data["pype_data"] = {
         "stored": datetime.datetime.utcnow(),
-        "is_processed": False
+        "is_processed": False,
+        "shard_key": get_event_shard_key(event_data)
     }
 
-    try:
-        # dbcon.insert_one(event_data)
-        dbcon.replace_one({"id": event_id}, event_data, upsert=True)
-        log.debug("Event: {} stored".format(event_id))
-
-    except pymongo.errors.AutoReconnect:
-        log.error("Mongo server \"{}\" is not responding, exiting.".format(
-            os.environ["AVALON_MONGO"]
-        ))
-        sys.exit(0)
-
-    except Exception as exc:
-        log.error(
-            "Event: {} failed to store".format(event_id),
-            exc_info=True
-        )
+    # Event is stored in background thread
+    event_buffer.add(event_data)
+    log.debug("Event: {} buffered".format(event_id))
 
 
 def trigger_sync(event):
@@ -170,6 +367,8 @@ def send_status(event):
 def register(session):
     '''Registers the event, subscribing the discover and launch topics.'''
     install_db()
+    event_buffer.start()
+    atexit.register(event_buffer.stop)
     session.event_hub.subscribe("topic=*", launch)
     session.event_hub.subscribe("topic=pype.storer.started", trigger_sync)
     session.event_hub.subscribe(
@@ -6,6 +6,7 @@ import traceback
 
 from ftrack_server import FtrackServer
 from pype.ftrack.ftrack_server.lib import SocketSession, SocketBaseEventHub
+from pype.ftrack.lib.ftrack_cache import shared_cache
 
 from pypeapp import Logger
 
@@ -28,7 +29,10 @@ def main(args):
 
     try:
         session = SocketSession(
-            auto_connect_event_hub=True, sock=sock, Eventhub=SocketBaseEventHub
+            auto_connect_event_hub=True,
+            sock=sock,
+            Eventhub=SocketBaseEventHub,
+            **shared_cache.session_kwargs()
         )
         server = FtrackServer("action")
         log.debug("Launched User Ftrack Server")
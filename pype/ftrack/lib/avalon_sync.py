@@ -1,10 +1,14 @@
 import os
 import re
+import json
 import queue
+import hashlib
+import datetime
 import collections
 import copy
 
 from pype.ftrack.lib.io_nonsingleton import DbConnector
+from pype.ftrack.lib.ftrack_cache import shared_cache
 
 import avalon
 import avalon.api
@@ -147,81 +151,152 @@ def get_project_apps(in_app_list):
     return apps, warnings
 
 
-def get_hierarchical_attributes(session, entity, attr_names, attr_defaults={}):
-    entity_ids = []
-    if entity.entity_type.lower() == "project":
-        entity_ids.append(entity["id"])
-    else:
-        typed_context = session.query((
-            "select ancestors.id, project from TypedContext where id is \"{}\""
-        ).format(entity["id"])).one()
-        entity_ids.append(typed_context["id"])
-        entity_ids.extend(
-            [ent["id"] for ent in reversed(typed_context["ancestors"])]
-        )
-        entity_ids.append(typed_context["project"]["id"])
+def _session_call(session, queries):
+    if hasattr(session, "call"):
+        return session.call(queries)
+    return session._call(queries)
 
-    missing_defaults = []
-    for attr_name in attr_names:
-        if attr_name not in attr_defaults:
-            missing_defaults.append(attr_name)
 
-    join_ent_ids = ", ".join(
-        ["\"{}\"".format(entity_id) for entity_id in entity_ids]
-    )
-    join_attribute_names = ", ".join(
-        ["\"{}\"".format(key) for key in attr_names]
-    )
+def _query_by_ids(session, expression, ids, batch_size=200):
+    """Query entities by ids in batches sent with one `session.call`.
+
+    Args:
+        session (ftrack_api.Session): Ftrack session.
+        expression (str): Query expression with "{}" where joined ids are
+            filled.
+        ids (iterable): Ids to query.
+        batch_size (int): Maximum number of ids in one query expression.
+
+    Returns:
+        list: Data of all queried entities.
+    """
+    ids = list(ids)
     queries = []
-    queries.append({
-        "action": "query",
-        "expression": (
-            "select value, entity_id from CustomAttributeValue "
-            "where entity_id in ({}) and configuration.key in ({})"
-        ).format(join_ent_ids, join_attribute_names)
-    })
-
-    if not missing_defaults:
-        if hasattr(session, "call"):
-            [values] = session.call(queries)
-        else:
-            [values] = session._call(queries)
-    else:
-        join_missing_names = ", ".join(
-            ["\"{}\"".format(key) for key in missing_defaults]
+    for idx in range(0, len(ids), batch_size):
+        joined_ids = ", ".join(
+            "\"{}\"".format(_id) for _id in ids[idx:idx + batch_size]
         )
         queries.append({
             "action": "query",
-            "expression": (
-                "select default from CustomAttributeConfiguration "
-                "where key in ({})"
-            ).format(join_missing_names)
+            "expression": expression.format(joined_ids)
         })
 
-        [values, default_values] = session.call(queries)
-        for default_value in default_values:
-            key = default_value["data"][0]["key"]
-            attr_defaults[key] = default_value["data"][0]["default"]
+    output = []
+    if queries:
+        for result in _session_call(session, queries):
+            output.extend(result["data"])
+    return output
+
+
+def get_hierarchical_attributes_bulk(
+    session, entity_ids, attr_names, attr_defaults=None
+):
+    """Resolve hierarchical custom attribute values of multiple entities.
+
+    Ancestors of all entities are queried at once and values of all entities
+    and ancestors are queried with batched calls. Inherited values are
+    resolved with one walk through hierarchy ordered by depth so each
+    ancestor is resolved only once.
 
-    hier_values = {}
-    for key, val in attr_defaults.items():
-        hier_values[key] = val
+    Args:
+        session (ftrack_api.Session): Ftrack session.
+        entity_ids (iterable): Ids of TypedContext entities or project.
+        attr_names (list): Keys of hierarchical custom attributes.
+        attr_defaults (dict): Default values by attribute key. Defaults of
+            missing keys are queried from attribute configuration.
 
-    if not values["data"]:
-        return hier_values
+    Returns:
+        dict: Values of attributes by attribute key by entity id.
+    """
+    entity_ids = set(entity_ids)
+    attr_names = list(attr_names)
+    attr_defaults = dict(attr_defaults or {})
+    if not entity_ids or not attr_names:
+        return {entity_id: {} for entity_id in entity_ids}
+
+    joined_attr_names = ", ".join(
+        "\"{}\"".format(key) for key in attr_names
+    )
+    queries = [
+        {
+            "action": "query",
+            "expression": (
+                "select id, key, default from CustomAttributeConfiguration"
+                " where key in ({}) and is_hierarchical is true"
+            ).format(joined_attr_names)
+        }
+    ]
+    attr_configs = _session_call(session, queries)[0]["data"]
+    attr_key_by_id = {}
+    for attr_config in attr_configs:
+        key = attr_config["key"]
+        attr_key_by_id[attr_config["id"]] = key
+        if key not in attr_defaults:
+            attr_defaults[key] = attr_config["default"]
+
+    # Chain of ancestors by entity id (project is first)
+    links = _query_by_ids(
+        session,
+        "select id, link from TypedContext where id in ({})",
+        entity_ids
+    )
+    parent_by_id = {}
+    depth_by_id = {}
+    for item in links:
+        link_ids = [link_item["id"] for link_item in item["link"]]
+        for depth, link_id in enumerate(link_ids):
+            depth_by_id[link_id] = depth
+            parent_by_id[link_id] = link_ids[depth - 1] if depth else None
+
+    # Entities which were not found as TypedContext are projects
+    for entity_id in entity_ids:
+        if entity_id not in depth_by_id:
+            depth_by_id[entity_id] = 0
+            parent_by_id[entity_id] = None
+
+    values = []
+    if attr_key_by_id:
+        joined_attr_ids = ", ".join(
+            "\"{}\"".format(attr_id) for attr_id in attr_key_by_id
+        )
+        values = _query_by_ids(
+            session,
+            (
+                "select value, entity_id, configuration_id"
+                " from CustomAttributeValue"
+                " where entity_id in ({{}}) and configuration_id in ({})"
+            ).format(joined_attr_ids),
+            depth_by_id.keys()
+        )
+
+    values_by_entity_id = collections.defaultdict(dict)
+    for item in values:
+        value = item["value"]
+        # Unset values are inherited from parent
+        if value is None or (isinstance(value, (tuple, list)) and not value):
+            continue
+        key = attr_key_by_id.get(item["configuration_id"])
+        if key is not None:
+            values_by_entity_id[item["entity_id"]][key] = value
+
+    # Walk hierarchy from top so parent is always resolved before children
+    resolved = {}
+    for _id in sorted(depth_by_id, key=lambda _id: depth_by_id[_id]):
+        parent_id = parent_by_id[_id]
+        if parent_id is None:
+            _values = {key: attr_defaults.get(key) for key in attr_names}
+        else:
+            _values = dict(resolved[parent_id])
+        _values.update(values_by_entity_id.get(_id) or {})
+        resolved[_id] = _values
 
-    _hier_values = collections.defaultdict(list)
-    for value in values["data"]:
-        key = value["configuration"]["key"]
-        _hier_values[key].append(value)
+    return {entity_id: resolved[entity_id] for entity_id in entity_ids}
 
-    for key, values in _hier_values.items():
-        value = sorted(
-            values, key=lambda value: entity_ids.index(value["entity_id"])
-        )[0]
-        hier_values[key] = value["value"]
 
-    return hier_values
+def get_hierarchical_attributes(session, entity, attr_names, attr_defaults={}):
+    return get_hierarchical_attributes_bulk(
+        session, [entity["id"]], attr_names, attr_defaults
+    )[entity["id"]]
 
 
 class SyncEntitiesFactory:
@@ -239,6 +314,12 @@ class SyncEntitiesFactory:
     ignore_custom_attr_key = "avalon_ignore_sync"
     ignore_entity_types = ["milestone"]
 
+    # Collection in avalon database where state of last synchronization
+    # of each project is stored (used by incremental synchronization)
+    sync_state_collection = "ftrack_sync_state"
+    # Full synchronization is used when more entities changed
+    incremental_max_changes = 1000
+
     report_splitter = {"type": "label", "value": "---"}
 
     def __init__(self, log_obj, session):
@@ -247,7 +328,20 @@ class SyncEntitiesFactory:
         self._api_key = session.api_key
         self._api_user = session.api_user
 
-    def launch_setup(self, project_full_name):
+    def launch_setup(self, project_full_name, incremental=False):
+        """Prepare ftrack entities of project for synchronization.
+
+        Args:
+            project_full_name (str): Full name of ftrack project.
+            incremental (bool): Query only entities changed since last
+                synchronization (with their ancestors and descendants).
+                Changes are found in ftrack events stored by event server.
+                Full synchronization is used if previous synchronization
+                state is not available, configuration has changed, stored
+                events do not cover whole time range or changes can't be
+                resolved without whole hierarchy (e.g. project changes,
+                removed or moved entities).
+        """
         try:
             self.session.close()
         except Exception:
@@ -257,7 +351,8 @@ class SyncEntitiesFactory:
             server_url=self._server_url,
             api_key=self._api_key,
             api_user=self._api_user,
-            auto_connect_event_hub=True
+            auto_connect_event_hub=True,
+            **shared_cache.session_kwargs()
         )
 
         self.duplicates = {}
@@ -302,6 +397,12 @@ class SyncEntitiesFactory:
         self.update_ftrack_ids = None
         self.deleted_entities = None
 
+        self.incremental = False
+        self.sync_started = datetime.datetime.utcnow()
+        self.sync_state = None
+        self.config_hash = None
+        self._entity_hashes = {}
+
         # Get Ftrack project
         ft_project = self.session.query(
             self.project_query.format(project_full_name)
@@ -348,10 +449,23 @@ class SyncEntitiesFactory:
                 "message": "Synchronization failed"
             }
 
-        # Find all entities in project
-        all_project_entities = self.session.query(
-            self.entities_query.format(ft_project_id)
-        ).all()
+        self.config_hash = self.get_config_hash(ft_project)
+
+        all_project_entities = None
+        if incremental:
+            all_project_entities = self.query_changed_entities(ft_project)
+
+        if all_project_entities is not None:
+            self.incremental = True
+            self.log.debug((
+                "Incremental synchronization of {} entities."
+            ).format(len(all_project_entities)))
+
+        else:
+            # Find all entities in project
+            all_project_entities = self.session.query(
+                self.entities_query.format(ft_project_id)
+            ).all()
 
         # Store entities by `id` and `parent_id`
         entities_dict = collections.defaultdict(lambda: {
@@ -399,6 +513,263 @@ class SyncEntitiesFactory:
         self.ft_project_id = ft_project_id
         self.entities_dict = entities_dict
 
+    def get_config_hash(self, ft_project):
+        """Hash of configuration which affects synchronized data.
+
+        Incremental synchronization can't be used when it changes.
+        """
+        cust_attrs = get_avalon_attr(self.session, split_hierarchical=False)
+        config_data = {
+            "schemas": EntitySchemas,
+            "ignore_entity_types": self.ignore_entity_types,
+            "task_types": sorted(
+                task_type["name"]
+                for task_type in (
+                    ft_project["project_schema"]["_task_type_schema"]["types"]
+                )
+            ),
+            "custom_attributes": sorted(
+                [
+                    cust_attr["id"],
+                    cust_attr["key"],
+                    cust_attr["entity_type"],
+                    cust_attr["object_type_id"],
+                    cust_attr["is_hierarchical"],
+                    cust_attr["default"]
+                ]
+                for cust_attr in cust_attrs
+            )
+        }
+        return hashlib.md5(
+            json.dumps(config_data, sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+    def load_sync_state(self, project_name):
+        self.dbcon.install()
+        return self.dbcon[self.sync_state_collection].find_one(
+            {"_id": project_name}
+        )
+
+    def store_sync_state(self):
+        """Store time and snapshot of synchronized entities.
+
+        Snapshot contain hash of synchronized data and avalon id by ftrack
+        id so unchanged entities can be skipped by incremental sync.
+        """
+        project_name = self.entities_dict[self.ft_project_id]["name"]
+        snapshot = {}
+        if self.incremental and self.sync_state:
+            snapshot = self.sync_state.get("snapshot") or {}
+
+        for ftrack_id, entity_hash in self._entity_hashes.items():
+            mongo_id = self.ftrack_avalon_mapper.get(ftrack_id)
+            if mongo_id:
+                snapshot[ftrack_id] = "{}:{}".format(mongo_id, entity_hash)
+
+        self.dbcon[self.sync_state_collection].replace_one(
+            {"_id": project_name},
+            {
+                "_id": project_name,
+                "last_sync": self.sync_started,
+                "config_hash": self.config_hash,
+                "snapshot": snapshot
+            },
+            upsert=True
+        )
+
+    def query_changed_entities(self, ft_project):
+        """Query entities changed since last synchronization.
+
+        Returns:
+            list: Changed entities with their ancestors, tasks of ancestors
+                and descendants. `None` is returned when full
+                synchronization is required.
+        """
+        project_name = ft_project["full_name"]
+        self.sync_state = self.load_sync_state(project_name)
+        if not self.sync_state:
+            self.log.info("Project was not synchronized yet.")
+            return None
+
+        if self.sync_state.get("config_hash") != self.config_hash:
+            self.log.info("Synchronization configuration has changed.")
+            return None
+
+        changed_ids = self.changed_ftrack_ids(
+            ft_project["id"], self.sync_state["last_sync"]
+        )
+        if changed_ids is None:
+            return None
+
+        if len(changed_ids) > self.incremental_max_changes:
+            self.log.info("Too many changes ({}) for incremental sync.".format(
+                len(changed_ids)
+            ))
+            return None
+
+        if not changed_ids:
+            return []
+
+        changed_ids_joined = self.join_query_keys(changed_ids)
+        entities = self.session.query((
+            self.entities_query + (
+                " and (id in ({0}) or ancestors any (id in ({0})))"
+            )
+        ).format(ft_project["id"], changed_ids_joined)).all()
+
+        entity_ids = set(entity["id"] for entity in entities)
+        ancestor_ids = set()
+        for entity in entities:
+            for link in entity["link"][1:-1]:
+                if link["id"] not in entity_ids:
+                    ancestor_ids.add(link["id"])
+
+        if ancestor_ids:
+            ancestor_ids_joined = self.join_query_keys(ancestor_ids)
+            entities.extend(self.session.query((
+                "select id, name, parent_id, link"
+                " from TypedContext where id in ({})"
+            ).format(ancestor_ids_joined)).all())
+
+            # All tasks are required to not lose tasks of ancestors
+            entities.extend(self.session.query((
+                "select id, name, parent_id, link"
+                " from Task where parent_id in ({})"
+            ).format(ancestor_ids_joined)).all())
+
+        return entities
+
+    def changed_ftrack_ids(self, ft_project_id, last_sync):
+        """Ids of project entities changed since `last_sync`.
+
+        Changes are found in ftrack events stored to mongo by event server.
+
+        Returns:
+            set: Ftrack ids of changed entities. Ids of tasks are replaced
+                with id of their parent. `None` is returned when changes
+                can't be resolved.
+        """
+        from pype.ftrack.ftrack_server.lib import get_ftrack_event_mongo_info
+        from pype.ftrack.lib.custom_db_connector import (
+            DbConnector as CustomDbConnector
+        )
+
+        changed_ids = set()
+        events_dbcon = None
+        try:
+            url, database, table_name = get_ftrack_event_mongo_info()
+            events_dbcon = CustomDbConnector(
+                mongo_url=url,
+                database_name=database,
+                table_name=table_name
+            )
+            events_dbcon.install()
+            # Stored events must cover whole time since last sync
+            oldest_event = events_dbcon.find_one(
+                {}, sort=[("pype_data.stored", 1)]
+            )
+            if (
+                not oldest_event
+                or oldest_event["pype_data"]["stored"] > last_sync
+            ):
+                self.log.info(
+                    "Stored ftrack events don't cover time of last sync."
+                )
+                return None
+
+            events = events_dbcon.find(
+                {
+                    "topic": "ftrack.update",
+                    "pype_data.stored": {"$gt": last_sync}
+                },
+                projection={"data.entities": True}
+            )
+            for event in events:
+                ent_infos = (event.get("data") or {}).get("entities") or []
+                for ent_info in ent_infos:
+                    changed_id = self._changed_id_from_ent_info(
+                        ft_project_id, ent_info
+                    )
+                    if changed_id is False:
+                        return None
+
+                    if changed_id:
+                        changed_ids.add(changed_id)
+
+        except Exception:
+            self.log.warning(
+                "Changes since last sync can't be resolved.", exc_info=True
+            )
+            return None
+
+        finally:
+            if events_dbcon is not None:
+                events_dbcon.uninstall()
+
+        return changed_ids
+
+    def _changed_id_from_ent_info(self, ft_project_id, ent_info):
+        """Changed entity id from entity information of ftrack event.
+
+        Returns:
+            str, None, bool: Id of changed entity, `None` if change is not
+                related to project's hierarchy or `False` if full
+                synchronization is required.
+        """
+        entity_type = ent_info.get("entityType")
+        if entity_type == "show":
+            if ent_info.get("entityId") == ft_project_id:
+                return False
+            return None
+
+        if entity_type != "task":
+            return None
+
+        project_ids = [
+            parent.get("entityId")
+            for parent in ent_info.get("parents") or []
+            if parent.get("entityType") == "show"
+        ]
+        if ft_project_id not in project_ids:
+            return None
+
+        if ent_info.get("entity_type") == "Task":
+            parent_id = ent_info.get("parentId")
+            # Tasks under project are not synchronized
+            if parent_id == ft_project_id:
+                return None
+            return parent_id
+
+        # Structural changes may affect entities out of scope
+        action = ent_info.get("action")
+        keys = ent_info.get("keys") or []
+        if action != "update" or "name" in keys or "parent_id" in keys:
+            return False
+        return ent_info.get("entityId")
+
+    @staticmethod
+    def join_query_keys(keys):
+        return ", ".join(["\"{}\"".format(key) for key in keys])
+
+    def skip_unchanged_entities(self):
+        """Skip update of entities which match last synchronized snapshot."""
+        snapshot = (self.sync_state or {}).get("snapshot") or {}
+        skipped_ids = []
+        for ftrack_id in tuple(self.update_ftrack_ids):
+            if ftrack_id == self.ft_project_id:
+                continue
+            entity_hash = self._entity_hashes.get(ftrack_id)
+            mongo_id = self.ftrack_avalon_mapper.get(ftrack_id)
+            synced_value = "{}:{}".format(mongo_id, entity_hash)
+            if snapshot.get(ftrack_id) == synced_value:
+                self.update_ftrack_ids.remove(ftrack_id)
+                skipped_ids.append(ftrack_id)
+
+        if skipped_ids:
+            self.log.debug("Skipped {} unchanged entities.".format(
+                len(skipped_ids)
+            ))
+
     @property
     def avalon_ents_by_id(self):
         if self._avalon_ents_by_id is None:
@@ -1168,6 +1539,10 @@ class SyncEntitiesFactory:
         for mongo_id in self.avalon_ents_by_id:
             if mongo_id in avalon_ftrack_mapper:
                 continue
+
+            # Entities out of incremental scope are not touched
+            if self.incremental:
+                continue
             deleted_entities.append(mongo_id)
 
             av_ent = self.avalon_ents_by_id[mongo_id]
@@ -1548,6 +1923,18 @@ class SyncEntitiesFactory:
             elif ftrack_id in self.update_ftrack_ids:
                 self.update_ftrack_ids.remove(ftrack_id)
 
+        # Hash prepared data before they're modified during synchronization
+        for ftrack_id, entity_dict in self.entities_dict.items():
+            final_entity = entity_dict.get("final_entity")
+            if final_entity is None:
+                continue
+            self._entity_hashes[ftrack_id] = hashlib.md5(json.dumps(
+                final_entity, sort_keys=True, default=str
+            ).encode()).hexdigest()
+
+        if self.incremental:
+            self.skip_unchanged_entities()
+
         self.log.debug("* Processing entities for archivation")
         self.delete_entities()
 
@@ -1570,6 +1957,8 @@ class SyncEntitiesFactory:
         self.update_entities()
         self.session.commit()
 
+        self.store_sync_state()
+
     def create_avalon_entity(self, ftrack_id):
         if ftrack_id == self.ft_project_id:
             self.create_avalon_project()
@@ -3,6 +3,7 @@ import time
 from pypeapp import Logger
 import ftrack_api
 from pype.ftrack.ftrack_server.lib import SocketSession
+from .ftrack_cache import shared_cache
 
 
 class MissingPermision(Exception):
@@ -53,6 +54,8 @@ class BaseHandler(object):
             ))
 
         self._session = session
+        # Persistent cache of schemas and rarely changed entities
+        shared_cache.install(session)
 
         # Using decorator
         self.register = self.register_decorator(self.register)
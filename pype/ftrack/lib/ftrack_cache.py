@@ -0,0 +1,392 @@
+"""Persistent cache of ftrack schemas and rarely changed entities.
+
+Ftrack sessions created by actions, event handlers and synchronization load
+schemas and query projects, object types, statuses or custom attribute
+configurations again in each process. `SharedFtrackCache` adds persistent
+layer to cache of session (`ftrack_api.cache.LayeredCache`) which stores
+these entities to files shared by all processes of the same user and server.
+
+Entities are stored with TTL and are removed from the cache when their
+change is received in "ftrack.update" event. Schemas are stored with
+builtin schema cache of session which is validated by schema hash of server.
+"""
+import os
+import re
+import time
+import uuid
+import hashlib
+import logging
+import threading
+import collections
+
+import appdirs
+import ftrack_api
+import ftrack_api.cache
+
+log = logging.getLogger(__name__)
+
+
+class KeyFilesCache(ftrack_api.cache.Cache):
+    """Cache storing each key to separate file in directory.
+
+    Cache is shared by multiple processes. `ftrack_api.cache.FileCache` is
+    not used because it's `dbm` database (`dbm.dumb` on Windows) has no
+    locking between processes and concurrent writes can corrupt it. Files
+    are written to temporary file and moved to place at once so readers
+    never see partially written value.
+
+    Each file contains key on first line and value on the rest.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if not os.path.exists(path):
+            os.makedirs(path)
+        super(KeyFilesCache, self).__init__()
+
+    def key_path(self, key):
+        filename = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.path, filename)
+
+    def _read(self, path):
+        with open(path, "r", encoding="utf-8") as stream:
+            key = stream.readline()[:-1]
+            return key, stream.read()
+
+    def _read_key(self, path):
+        with open(path, "r", encoding="utf-8") as stream:
+            return stream.readline()[:-1]
+
+    def get(self, key):
+        try:
+            stored_key, value = self._read(self.key_path(key))
+        except (IOError, OSError, UnicodeDecodeError):
+            raise KeyError(key)
+
+        # Hash collision or broken file
+        if stored_key != key:
+            raise KeyError(key)
+        return value
+
+    def set(self, key, value):
+        path = self.key_path(key)
+        tmp_path = "{}.{}.tmp".format(path, uuid.uuid4().hex)
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as stream:
+                stream.write(key + "\n")
+                stream.write(value)
+            os.replace(tmp_path, path)
+
+        except (IOError, OSError):
+            # File may be opened by other process (on Windows)
+            log.debug("Cache file is not accessible.", exc_info=True)
+            if os.path.exists(tmp_path):
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+    def remove(self, key):
+        try:
+            os.remove(self.key_path(key))
+        except (IOError, OSError):
+            raise KeyError(key)
+
+    def keys(self):
+        keys = []
+        try:
+            filenames = os.listdir(self.path)
+        except OSError:
+            return keys
+
+        for filename in filenames:
+            if filename.endswith(".tmp"):
+                continue
+            try:
+                key = self._read_key(os.path.join(self.path, filename))
+            except (IOError, OSError, UnicodeDecodeError):
+                continue
+            keys.append(key)
+        return keys
+
+
+class ExpiringCache(ftrack_api.cache.ProxyCache):
+    """Proxied cache of serialised values which expire after `ttl` seconds.
+
+    Time of storing is prepended to stored value.
+    """
+
+    def __init__(self, proxied, ttl):
+        self.ttl = ttl
+        super(ExpiringCache, self).__init__(proxied)
+
+    def get(self, key):
+        value = super(ExpiringCache, self).get(key)
+        if isinstance(value, bytes):
+            value = value.decode("utf-8")
+
+        stored, _, value = value.partition("\n")
+        try:
+            expired = time.time() - float(stored) > self.ttl
+        except ValueError:
+            expired = True
+
+        if expired:
+            try:
+                self.remove(key)
+            except KeyError:
+                pass
+            raise KeyError(key)
+        return value
+
+    def set(self, key, value):
+        super(ExpiringCache, self).set(
+            key, "{:f}\n{}".format(time.time(), value)
+        )
+
+
+class EntityTypesCache(ftrack_api.cache.ProxyCache):
+    """Proxied cache storing only entities of specific entity types.
+
+    Other keys are ignored without accessing proxied cache.
+    """
+
+    key_regex = re.compile(r"^\(u?['\"](?P<entity_type>[^'\"]+)['\"]")
+
+    def __init__(self, proxied, entity_types):
+        self.entity_types = set(entity_types)
+        super(EntityTypesCache, self).__init__(proxied)
+
+    def key_entity_type(self, key):
+        found = self.key_regex.match(key)
+        if found:
+            return found.group("entity_type")
+        return None
+
+    def get(self, key):
+        if self.key_entity_type(key) not in self.entity_types:
+            raise KeyError(key)
+        return super(EntityTypesCache, self).get(key)
+
+    def set(self, key, value):
+        if getattr(value, "entity_type", None) in self.entity_types:
+            super(EntityTypesCache, self).set(key, value)
+
+    def remove(self, key):
+        if self.key_entity_type(key) not in self.entity_types:
+            raise KeyError(key)
+        super(EntityTypesCache, self).remove(key)
+
+
+class SharedFtrackCache(object):
+    """Persistent cache shared by ftrack sessions of all processes.
+
+    Object can be passed as `cache` argument of `ftrack_api.Session` or can
+    be installed to already created session with `install`.
+
+    Args:
+        cache_dir (str): Directory where cache files are stored. Value of
+            `PYPE_FTRACK_CACHE_DIR` environment variable or user data
+            directory is used if not entered.
+        ttl (float): Seconds after which cached entity expires. Value of
+            `PYPE_FTRACK_CACHE_TTL` environment variable or `default_ttl`
+            is used if not entered.
+    """
+
+    # Entity types which are stored to persistent cache
+    entity_types = (
+        "Project",
+        "ProjectSchema",
+        "ObjectType",
+        "Type",
+        "Status",
+        "Priority",
+        "CustomAttributeConfiguration",
+        "CustomAttributeGroup",
+        "CustomAttributeType"
+    )
+    # Types of entities in "ftrack.update" events which invalidate all
+    # cached entities (changes of configuration are not always sent with
+    # ids of all affected entities)
+    invalidating_event_types = (
+        "objecttype",
+        "status",
+        "type",
+        "priority",
+        "customattributeconfiguration",
+        "customattributegroup",
+        "projectschema",
+        "schema"
+    )
+    # Cached entity types by entity types in "ftrack.update" events which
+    # invalidate only changed entities (changes of other types can't
+    # affect the cache)
+    event_entity_types = {
+        "show": "Project"
+    }
+    default_ttl = 24 * 60 * 60
+
+    def __init__(self, cache_dir=None, ttl=None):
+        if cache_dir is None:
+            cache_dir = os.environ.get("PYPE_FTRACK_CACHE_DIR")
+
+        if not cache_dir:
+            cache_dir = os.path.join(
+                appdirs.user_data_dir("pype-app", "pype"), "ftrack_cache"
+            )
+
+        if ttl is None:
+            ttl = float(
+                os.environ.get("PYPE_FTRACK_CACHE_TTL") or self.default_ttl
+            )
+
+        self.cache_dir = os.path.normpath(cache_dir)
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        # Storage caches by path of cache directory
+        self._file_caches = {}
+        # Key makers of sessions using storage cache by path
+        self._key_makers = {}
+        # Ids of sessions which already use the cache
+        self._installed = set()
+
+    def __call__(self, session):
+        """Persistent cache layer for session (`cache` argument factory)."""
+        file_cache = self.file_cache(session)
+        if file_cache is None:
+            return None
+
+        return EntityTypesCache(
+            ftrack_api.cache.SerialisedCache(
+                ExpiringCache(file_cache, self.ttl),
+                encode=session.encode,
+                decode=session.decode
+            ),
+            self.entity_types
+        )
+
+    def session_kwargs(self):
+        """Keyword arguments for `ftrack_api.Session` using shared cache."""
+        self.ensure_cache_dir()
+        return {
+            "cache": self,
+            "schema_cache_path": self.cache_dir
+        }
+
+    def ensure_cache_dir(self):
+        if not os.path.exists(self.cache_dir):
+            try:
+                os.makedirs(self.cache_dir)
+            except OSError:
+                # Directory may be created by other process meanwhile
+                if not os.path.isdir(self.cache_dir):
+                    raise
+
+    def cache_path(self, session):
+        """Path to cache directory of server and user of session."""
+        scope = "{}|{}".format(session.server_url, session.api_user)
+        dirname = hashlib.sha1(scope.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, "entities", dirname)
+
+    def file_cache(self, session):
+        path = self.cache_path(session)
+        with self._lock:
+            file_cache = self._file_caches.get(path)
+            if file_cache is not None:
+                return file_cache
+
+            try:
+                self.ensure_cache_dir()
+                file_cache = KeyFilesCache(path)
+
+            except Exception:
+                log.warning(
+                    "Ftrack cache \"{}\" can't be created.".format(path),
+                    exc_info=True
+                )
+                return None
+
+            self._file_caches[path] = file_cache
+            self._key_makers[path] = session.cache_key_maker
+        return file_cache
+
+    def install(self, session):
+        """Add persistent layer to cache of already created session.
+
+        Changes of cached entities are listened through event hub of
+        session. Calling it multiple times with same session has no effect.
+        """
+        with self._lock:
+            if id(session) in self._installed:
+                return
+            self._installed.add(id(session))
+
+        caches = getattr(session.cache, "caches", None)
+        if caches is None:
+            return
+
+        # Session may be created with the cache already
+        if not any(isinstance(cache, EntityTypesCache) for cache in caches):
+            layer = self(session)
+            if layer is None:
+                return
+            caches.append(layer)
+
+        try:
+            session.event_hub.subscribe(
+                "topic=ftrack.update", self.on_update
+            )
+        except Exception:
+            log.debug(
+                "Can't subscribe to ftrack update events.", exc_info=True
+            )
+
+    def on_update(self, event):
+        """Remove entities changed by "ftrack.update" event from cache."""
+        entity_ids = collections.defaultdict(set)
+        for ent_info in event["data"].get("entities") or []:
+            event_entity_type = (ent_info.get("entityType") or "").lower()
+            if event_entity_type in self.invalidating_event_types:
+                self.clear()
+                return
+
+            entity_type = self.event_entity_types.get(event_entity_type)
+            if entity_type is None:
+                continue
+
+            entity_id = ent_info.get("entityId")
+            if isinstance(entity_id, (list, tuple)):
+                entity_ids[entity_type].update(entity_id)
+            elif entity_id:
+                entity_ids[entity_type].add(entity_id)
+
+        for entity_type, _entity_ids in entity_ids.items():
+            self.invalidate(entity_type, _entity_ids)
+
+    def invalidate(self, entity_type, entity_ids):
+        """Remove entities of entity type with entered ids from all caches.
+
+        Cached files are found by cache key of entity identity so cache
+        directory is not listed.
+        """
+        for path, file_cache in tuple(self._file_caches.items()):
+            key_maker = self._key_makers[path]
+            for entity_id in entity_ids:
+                key = key_maker.key((str(entity_type), [str(entity_id)]))
+                try:
+                    file_cache.remove(key)
+                except KeyError:
+                    pass
+
+    def clear(self):
+        """Remove all cached entities."""
+        for file_cache in self._file_caches.values():
+            for key in file_cache.keys():
+                try:
+                    file_cache.remove(key)
+                except KeyError:
+                    pass
+
+
+shared_cache = SharedFtrackCache()
@@ -1,5 +1,6 @@
 import os
 import sys
+import time
 import types
 import re
 import uuid
@@ -9,14 +10,20 @@ import logging
 import itertools
 import contextlib
 import subprocess
+import threading
+import multiprocessing
 import inspect
 from abc import ABCMeta, abstractmethod
+from multiprocessing.pool import ThreadPool
 
 from avalon import io, pipeline
+from pymongo import InsertOne, UpdateOne, UpdateMany, DeleteMany
 import six
 import avalon.api
 from pypeapp import config
 
+from .presets import get_presets, thaw
+
 log = logging.getLogger(__name__)
 
 
@@ -113,6 +120,164 @@ def _subprocess(*args, **kwargs):
     return output
 
 
+class SubprocessJob(object):
+    """Command processed by `SubprocessScheduler`.
+
+    Args:
+        args (str, list): Command arguments passed to `subprocess.Popen`.
+        name (str): Label of job used in logs.
+        threads (int): Number of CPU threads used by the command.
+        kwargs: Other keyword arguments passed to `subprocess.Popen`.
+    """
+
+    def __init__(self, args, name=None, threads=1, **kwargs):
+        if name is None:
+            name = args
+            if not isinstance(args, six.string_types):
+                name = " ".join(args)
+
+        self.args = args
+        self.name = name
+        self.threads = max(1, int(threads))
+        self.kwargs = kwargs
+
+        self.returncode = None
+        self.output = None
+        self.elapsed = 0.0
+        self.error = None
+
+    def __repr__(self):
+        return "<SubprocessJob {}>".format(self.name)
+
+    @property
+    def succeeded(self):
+        return self.returncode == 0
+
+
+class SubprocessScheduler(object):
+    """Run independent subprocess jobs concurrently with CPU thread budget.
+
+    Job is started only when sum of threads of running jobs and threads of
+    the job does not exceed the budget (at least one job always runs).
+
+    Example:
+        >>> scheduler = SubprocessScheduler(max_jobs=4)
+        >>> scheduler.add_job("ffmpeg -i input.mov output.mp4", threads=2)
+        >>> scheduler.run()
+
+    Args:
+        max_jobs (int): Maximum number of jobs running at the same time.
+            Thread budget is used when not set.
+        thread_budget (int): Number of CPU threads jobs can use together.
+            Count of CPUs is used when not set.
+        log (logging.Logger): Logger used for messages.
+    """
+
+    def __init__(self, max_jobs=None, thread_budget=None, log=None):
+        self.thread_budget = thread_budget or multiprocessing.cpu_count()
+        self.max_jobs = max_jobs or self.thread_budget
+        self.log = log or logging.getLogger(__name__)
+        self.jobs = []
+
+        self._used_threads = 0
+        self._condition = threading.Condition()
+
+    def add_job(self, args, name=None, threads=1, **kwargs):
+        job = SubprocessJob(args, name, threads, **kwargs)
+        self.jobs.append(job)
+        return job
+
+    def threads_per_job(self, jobs_count=None):
+        """Threads available for each job when max jobs are running."""
+        if jobs_count is None:
+            jobs_count = len(self.jobs)
+        concurrent_jobs = max(1, min(self.max_jobs, jobs_count))
+        return max(1, self.thread_budget // concurrent_jobs)
+
+    def run(self, raise_on_error=True):
+        """Run all added jobs and wait until they are finished.
+
+        Args:
+            raise_on_error (bool): Raise `ValueError` when any of jobs failed.
+
+        Returns:
+            list: Processed `SubprocessJob` objects.
+        """
+        jobs = [job for job in self.jobs if job.returncode is None]
+        if len(jobs) > 1 and self.max_jobs > 1:
+            pool = ThreadPool(min(self.max_jobs, len(jobs)))
+            try:
+                pool.map(self._run_job, jobs)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            for job in jobs:
+                self._run_job(job)
+
+        for job in self.jobs:
+            self.log.debug("{} ({:.2f}s, exit code {}) {}".format(
+                "Finished" if job.succeeded else "Failed",
+                job.elapsed, job.returncode, job.name
+            ))
+
+        failed_jobs = [job for job in self.jobs if not job.succeeded]
+        if failed_jobs and raise_on_error:
+            raise ValueError("{} of {} job(s) were not successful:\n{}".format(
+                len(failed_jobs), len(self.jobs),
+                "\n".join(
+                    "\"{}\" ({}): {}".format(
+                        job.name, job.returncode, job.error or job.output
+                    )
+                    for job in failed_jobs
+                )
+            ))
+        return list(self.jobs)
+
+    def _acquire_threads(self, threads):
+        # Job which requires more threads than budget can run only alone
+        threads = min(threads, self.thread_budget)
+        with self._condition:
+            while (
+                self._used_threads
+                and self._used_threads + threads > self.thread_budget
+            ):
+                self._condition.wait()
+            self._used_threads += threads
+        return threads
+
+    def _release_threads(self, threads):
+        with self._condition:
+            self._used_threads -= threads
+            self._condition.notify_all()
+
+    def _run_job(self, job):
+        kwargs = dict(job.kwargs)
+        env = kwargs.get("env") or os.environ
+        kwargs["env"] = {k: str(v) for k, v in env.items()}
+        kwargs["stdout"] = kwargs.get("stdout", subprocess.PIPE)
+        kwargs["stderr"] = kwargs.get("stderr", subprocess.STDOUT)
+        kwargs["stdin"] = kwargs.get("stdin", subprocess.PIPE)
+
+        threads = self._acquire_threads(job.threads)
+        start = time.time()
+        try:
+            self.log.debug("Executing: {}".format(job.name))
+            proc = subprocess.Popen(job.args, **kwargs)
+            output, _ = proc.communicate()
+            job.output = (output or b"").decode("utf-8")
+            job.returncode = proc.returncode
+
+        except Exception as exc:
+            job.error = exc
+            job.returncode = -1
+
+        finally:
+            job.elapsed = time.time() - start
+            self._release_threads(threads)
+        return job
+
+
 def get_hierarchy(asset_name=None):
     """
     Obtain asset hierarchy path string from mongo db
@@ -225,6 +390,237 @@ def grouper(iterable, n, fillvalue=None):
     return itertools.izip_longest(fillvalue=fillvalue, *args)
 
 
+def get_project_collection(project_name=None):
+    """Return pymongo collection of project.
+
+    Avalon's `io` does not expose whole pymongo collection api (e.g.
+    `aggregate` or `bulk_write`) so collection is taken from it's database.
+
+    Args:
+        project_name (str): Name of project. Project from `io.Session` is used
+            if not entered.
+    """
+    project_name = project_name or io.Session["AVALON_PROJECT"]
+    return io._database[project_name]
+
+
+def get_last_version_names(subset_ids, project_name=None):
+    """Highest version name of each subset queried with single aggregation.
+
+    Args:
+        subset_ids (list): Ids of subsets.
+        project_name (str): Name of project. Project from `io.Session` is used
+            if not entered.
+
+    Returns:
+        dict: Highest version name (int) by subset id. Subsets without
+            versions are not in the output.
+    """
+    subset_ids = list(set(subset_ids))
+    if not subset_ids:
+        return {}
+
+    pipeline = [
+        {"$match": {"type": "version", "parent": {"$in": subset_ids}}},
+        {"$group": {"_id": "$parent", "name": {"$max": "$name"}}}
+    ]
+    collection = get_project_collection(project_name)
+    return {
+        doc["_id"]: doc["name"]
+        for doc in collection.aggregate(pipeline)
+    }
+
+
+def get_last_versions(subset_ids, project_name=None, fields=None):
+    """Last version document of each subset queried with single aggregation.
+
+    Versions are sorted and grouped by database so only last version of each
+    subset is transferred.
+
+    Args:
+        subset_ids (list): Ids of subsets.
+        project_name (str): Name of project. Project from `io.Session` is used
+            if not entered.
+        fields (list): Fields of version documents which are returned (all
+            fields if not entered).
+
+    Returns:
+        dict: Last version document by subset id. Subsets without versions
+            are not in the output.
+    """
+    subset_ids = list(set(subset_ids))
+    if not subset_ids:
+        return {}
+
+    pipeline = [
+        {"$match": {"type": "version", "parent": {"$in": subset_ids}}}
+    ]
+    if fields:
+        projection = {field: True for field in fields}
+        projection.update({"parent": True, "name": True})
+        pipeline.append({"$project": projection})
+
+    pipeline.extend([
+        {"$sort": {"parent": 1, "name": -1}},
+        {"$group": {"_id": "$parent", "version": {"$first": "$$ROOT"}}}
+    ])
+    collection = get_project_collection(project_name)
+    return {
+        doc["_id"]: doc["version"]
+        for doc in collection.aggregate(pipeline)
+    }
+
+
+def get_last_version_representations(subset_ids, project_name=None):
+    """Last version and it's representations of each subset.
+
+    Last versions are queried with single aggregation and representations
+    of all of them with single query.
+
+    Args:
+        subset_ids (list): Ids of subsets.
+        project_name (str): Name of project. Project from `io.Session` is used
+            if not entered.
+
+    Returns:
+        dict: Last version document and list of it's representations by
+            subset id, e.g. `{subset_id: (version, [repre, ...])}`. Subsets
+            without versions are not in the output.
+    """
+    last_versions = get_last_versions(subset_ids, project_name)
+    if not last_versions:
+        return {}
+
+    subset_id_by_version_id = {
+        version["_id"]: subset_id
+        for subset_id, version in last_versions.items()
+    }
+    output = {
+        subset_id: (version, [])
+        for subset_id, version in last_versions.items()
+    }
+    collection = get_project_collection(project_name)
+    repres = collection.find({
+        "type": "representation",
+        "parent": {"$in": list(subset_id_by_version_id.keys())}
+    })
+    for repre in repres:
+        subset_id = subset_id_by_version_id[repre["parent"]]
+        output[subset_id][1].append(repre)
+    return output
+
+
+def get_representations_status(representation_ids):
+    """Check if representations are from latest versions in batch.
+
+    Database is queried three times no matter how many representations
+    are checked (representations, versions and aggregation of last
+    versions).
+
+    Args:
+        representation_ids (list): Ids of representations (str or ObjectId).
+
+    Returns:
+        dict: Status by representation id as entered (str or ObjectId)
+            with keys "valid", "latest", "version" and "last_version".
+            Representations missing in database have "valid" set to `False`.
+            Representations of master version are always latest.
+    """
+    ids_mapping = {}
+    for repre_id in representation_ids:
+        ids_mapping[repre_id] = io.ObjectId(repre_id)
+
+    output = {}
+    for repre_id in ids_mapping:
+        output[repre_id] = {
+            "valid": False,
+            "latest": False,
+            "version": None,
+            "last_version": None
+        }
+
+    if not ids_mapping:
+        return output
+
+    repre_docs = io.find(
+        {
+            "_id": {"$in": list(set(ids_mapping.values()))},
+            "type": "representation"
+        },
+        projection={"parent": True}
+    )
+    version_id_by_repre_id = {
+        repre_doc["_id"]: repre_doc["parent"]
+        for repre_doc in repre_docs
+    }
+
+    version_docs = io.find(
+        {"_id": {"$in": list(set(version_id_by_repre_id.values()))}},
+        projection={"name": True, "parent": True, "type": True}
+    )
+    version_docs_by_id = {
+        version_doc["_id"]: version_doc
+        for version_doc in version_docs
+    }
+
+    subset_ids = [
+        version_doc["parent"]
+        for version_doc in version_docs_by_id.values()
+        if version_doc["type"] == "version"
+    ]
+    last_version_by_subset_id = get_last_version_names(subset_ids)
+
+    for repre_id, repre_object_id in ids_mapping.items():
+        version_id = version_id_by_repre_id.get(repre_object_id)
+        version_doc = version_docs_by_id.get(version_id)
+        if version_doc is None:
+            continue
+
+        status = output[repre_id]
+        status["valid"] = True
+        if version_doc["type"] == "master_version":
+            status["latest"] = True
+            continue
+
+        last_version = last_version_by_subset_id.get(version_doc["parent"])
+        status["version"] = version_doc["name"]
+        status["last_version"] = last_version
+        status["latest"] = version_doc["name"] == last_version
+
+    return output
+
+
+def get_containers_status(containers=None):
+    """Return whether containers are loaded from latest versions.
+
+    Result can be shared by all tools checking outdated content in scene
+    (e.g. callback on scene open and validation of containers) so database
+    is not queried for each container separately.
+
+    Args:
+        containers (list): Containers to check. Containers of registered
+            host are used if not entered.
+
+    Returns:
+        dict: Status by container "objectName". Status is same as in
+            `get_representations_status` with added "representation" key.
+    """
+    if containers is None:
+        host = avalon.api.registered_host()
+        containers = list(host.ls())
+
+    repre_status = get_representations_status(set(
+        container["representation"] for container in containers
+    ))
+
+    output = {}
+    for container in containers:
+        status = dict(repre_status[container["representation"]])
+        status["representation"] = container["representation"]
+        output[container["objectName"]] = status
+    return output
+
+
 def is_latest(representation):
     """Return whether the representation is from latest version
 
@@ -240,44 +636,31 @@ def is_latest(representation):
     if version["type"] == "master_version":
         return True
 
-    # Get highest version under the parent
-    highest_version = io.find_one({
-        "type": "version",
-        "parent": version["parent"]
-    }, sort=[("name", -1)], projection={"name": True})
-
-    if version['name'] == highest_version['name']:
-        return True
-    else:
-        return False
+    last_versions = get_last_version_names([version["parent"]])
+    return version["name"] == last_versions.get(version["parent"])
 
 
-def any_outdated():
-    """Return whether the current scene has any outdated content"""
+def any_outdated(containers_status=None):
+    """Return whether the current scene has any outdated content
 
-    checked = set()
-    host = avalon.api.registered_host()
-    for container in host.ls():
-        representation = container['representation']
-        if representation in checked:
-            continue
+    Args:
+        containers_status (dict): Output of `get_containers_status`. Status
+            of containers in current scene is queried if not entered.
+    """
+    if containers_status is None:
+        containers_status = get_containers_status()
 
-        representation_doc = io.find_one(
-            {
-                "_id": io.ObjectId(representation),
-                "type": "representation"
-            },
-            projection={"parent": True}
-        )
-        if representation_doc and not is_latest(representation_doc):
-            return True
-        elif not representation_doc:
-            log.debug("Container '{objectName}' has an invalid "
-                      "representation, it is missing in the "
-                      "database".format(**container))
+    outdated = False
+    for object_name, status in containers_status.items():
+        if not status["valid"]:
+            log.debug((
+                "Container '{}' has an invalid representation,"
+                " it is missing in the database"
+            ).format(object_name))
 
-        checked.add(representation)
-    return False
+        elif not status["latest"]:
+            outdated = True
+    return outdated
 
 
 def _rreplace(s, a, b, n=1):
@@ -490,6 +873,189 @@ def get_all_avalon_projects():
     return projects
 
 
+class UnitOfWork(object):
+    """Collect database writes and flush them in one ordered bulk write.
+
+    Operations are stored in order of registration and are written with
+    single `bulk_write` call on `flush`. Nothing is written to database
+    when `rollback` is called before flush, so collected writes can depend
+    on success of other actions (e.g. file transfers).
+
+    Inserted documents which are not written yet can be found with
+    `find_one` and `find_pending` so multiple instances of one publishing
+    context share new subsets and versions.
+
+    Files created for the unit of work can be registered with `add_file`,
+    they are removed on `rollback`. Files which existed before (overwritten
+    files) can't be restored.
+
+    Example:
+        >>> uow = UnitOfWork()
+        >>> uow.insert_one({"_id": io.ObjectId(), "type": "version"})
+        >>> uow.update_one({"_id": subset_id}, {"$set": {"data.a": 1}})
+        >>> uow.flush()
+
+    Args:
+        project_name (str): Name of project collection. Project from
+            `io.Session` is used if not entered.
+    """
+
+    def __init__(self, project_name=None):
+        self.project_name = project_name
+        self.operations = []
+        self.rolled_back = False
+        self.files = []
+
+        # Inserted documents which are not written to database yet
+        self._pending_by_id = {}
+        # (type, parent, name) -> inserted document
+        self._pending_by_key = {}
+
+    def __len__(self):
+        return len(self.operations)
+
+    @staticmethod
+    def _document_key(document):
+        return (
+            document.get("type"), document.get("parent"), document.get("name")
+        )
+
+    def insert_one(self, document):
+        if "_id" not in document:
+            document["_id"] = io.ObjectId()
+        self.operations.append(InsertOne(document))
+        self._pending_by_id[document["_id"]] = document
+        self._pending_by_key[self._document_key(document)] = document
+        return document["_id"]
+
+    def insert_many(self, documents):
+        return [self.insert_one(document) for document in documents]
+
+    def update_one(self, filter, update):
+        self.operations.append(UpdateOne(filter, update))
+
+    def update_many(self, filter, update):
+        self.operations.append(UpdateMany(filter, update))
+
+    def delete_many(self, filter):
+        self.operations.append(DeleteMany(filter))
+
+        # Deleted inserts are not pending anymore
+        ids = filter.get("_id")
+        if isinstance(ids, dict):
+            ids = ids.get("$in") or []
+        else:
+            ids = [ids]
+
+        for _id in ids:
+            document = self._pending_by_id.pop(_id, None)
+            if document is None:
+                continue
+            key = self._document_key(document)
+            if self._pending_by_key.get(key) is document:
+                self._pending_by_key.pop(key)
+
+    def find_pending(self, doc_type, parent):
+        """Inserted documents of type and parent not written yet."""
+        return [
+            document
+            for document in self._pending_by_id.values()
+            if document.get("type") == doc_type
+            and document.get("parent") == parent
+        ]
+
+    def find_one(self, filter):
+        """Find document by "type", "parent" and "name" in filter.
+
+        Inserted documents which are not written yet are checked before
+        database is queried.
+        """
+        document = self._pending_by_key.get(self._document_key(filter))
+        if document is not None:
+            return document
+        return io.find_one(filter)
+
+    def add_file(self, path):
+        """Register file created by unit of work, removed on rollback."""
+        self.files.append(path)
+
+    def rollback(self):
+        """Discard all collected operations and remove registered files."""
+        log.debug("Discarding {} database operations.".format(
+            len(self.operations)
+        ))
+        self.operations = []
+        self.rolled_back = True
+        self._pending_by_id = {}
+        self._pending_by_key = {}
+
+        for path in reversed(self.files):
+            if not os.path.exists(path):
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                log.warning(
+                    "Can't remove file \"{}\".".format(path), exc_info=True
+                )
+        self.files = []
+
+    def flush(self):
+        """Write collected operations to database.
+
+        Returns:
+            BulkWriteResult: Result of bulk write or `None` if there was
+                nothing to write.
+        """
+        if self.rolled_back:
+            raise RuntimeError(
+                "Can't flush operations of rolled back unit of work."
+            )
+
+        if not self.operations:
+            return None
+
+        operations = self.operations
+        self.operations = []
+        collection = get_project_collection(self.project_name)
+        result = collection.bulk_write(operations, ordered=True)
+        self._pending_by_id = {}
+        self._pending_by_key = {}
+        self.files = []
+        return result
+
+
+def get_plugin_preset(plugin, presets, host):
+    """Return preset data of pyblish plugin.
+
+    Presets are looked up under current host first and then under host and
+    plugin kind determined from plugin's file path.
+
+    Args:
+        plugin (pyblish.api.Plugin): Discovered plugin.
+        presets (dict): Plugin presets (`get_presets()["plugins"]`).
+        host (str): Name of current host.
+
+    Returns:
+        dict: Preset data or `None` if plugin has no presets.
+    """
+    file = os.path.normpath(inspect.getsourcefile(plugin))
+
+    # host determined from path
+    host_from_file = file.split(os.path.sep)[-3:-2][0]
+    plugin_kind = file.split(os.path.sep)[-2:-1][0]
+
+    try:
+        return presets[host]["publish"][plugin.__name__]
+    except KeyError:
+        pass
+
+    try:
+        return presets[host_from_file][plugin_kind][plugin.__name__]
+    except KeyError:
+        return None
+
+
 def filter_pyblish_plugins(plugins):
     """
     This servers as plugin filter / modifier for pyblish. It will load plugin
@@ -503,7 +1069,7 @@ def filter_pyblish_plugins(plugins):
 
     host = api.current_host()
 
-    presets = config.get_presets().get('plugins', {})
+    presets = get_presets().get('plugins', {})
 
     # iterate over plugins
     for plugin in plugins[:]:
@@ -511,20 +1077,9 @@ def filter_pyblish_plugins(plugins):
         if not presets:
             continue
 
-        file = os.path.normpath(inspect.getsourcefile(plugin))
-        file = os.path.normpath(file)
-
-        # host determined from path
-        host_from_file = file.split(os.path.sep)[-3:-2][0]
-        plugin_kind = file.split(os.path.sep)[-2:-1][0]
-
-        try:
-            config_data = presets[host]["publish"][plugin.__name__]
-        except KeyError:
-            try:
-                config_data = presets[host_from_file][plugin_kind][plugin.__name__]  # noqa: E501
-            except KeyError:
-                continue
+        config_data = get_plugin_preset(plugin, presets, host)
+        if config_data is None:
+            continue
 
         for option, value in config_data.items():
             if option == "enabled" and value is False:
@@ -534,7 +1089,119 @@ def filter_pyblish_plugins(plugins):
                 log.info('setting {}:{} on plugin {}'.format(
                     option, value, plugin.__name__))
 
-                setattr(plugin, option, value)
+                setattr(plugin, option, thaw(value))
+
+
+def get_subsets_by_assets(asset_names,
+                          regex_filter=None,
+                          version=None,
+                          representations=["exr", "dpx"]):
+    """Query subsets of multiple assets with single aggregation.
+
+    Subsets, their selected version and filtered representations of all
+    entered assets are collected with one aggregation pipeline. Versions
+    and representations are joined with sub-pipelines which keep only the
+    selected version of each subset so other versions are never collected
+    to intermediate documents.
+
+    Arguments:
+        asset_names (list): names of assets (shots)
+        regex_filter (raw): raw string with filter pattern
+        version (int): number of version, last version is used if not set
+        representations (list): names of representations, all
+            representations are returned if set to `None`
+
+    Returns:
+        dict: output of `get_subsets` by asset name
+    """
+    if version:
+        assert isinstance(version, int), "version needs to be `int` type"
+
+    asset_names = list(set(asset_names))
+    asset_docs = list(io.find(
+        {"type": "asset", "name": {"$in": asset_names}},
+        projection={"name": True}
+    ))
+    asset_names_by_id = {
+        asset_doc["_id"]: asset_doc["name"]
+        for asset_doc in asset_docs
+    }
+
+    missing_assets = set(asset_names) - set(asset_names_by_id.values())
+    assert not missing_assets, (
+        "Asset not existing. Check correct name: `{}`"
+    ).format(", ".join(sorted(missing_assets)))
+
+    version_conditions = [
+        {"$eq": ["$parent", "$$subset_id"]},
+        {"$eq": ["$type", "version"]}
+    ]
+    if version:
+        version_conditions.append({"$eq": ["$name", int(version)]})
+
+    repre_conditions = [
+        {"$eq": ["$parent", "$$version_id"]},
+        {"$eq": ["$type", "representation"]}
+    ]
+    if representations is not None:
+        repre_conditions.append({"$in": ["$name", list(representations)]})
+
+    collection = get_project_collection()
+    pipeline = [
+        {"$match": {
+            "type": "subset",
+            "parent": {"$in": list(asset_names_by_id.keys())},
+            "name": {"$regex": r"{}".format(regex_filter or r".*")}
+        }},
+        {"$project": {"name": True, "parent": True}},
+        # Only version with highest name (or selected version) of subset
+        # is joined so other versions are never collected on server
+        {"$lookup": {
+            "from": collection.name,
+            "let": {"subset_id": "$_id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$and": version_conditions}}},
+                {"$sort": {"name": -1}},
+                {"$limit": 1},
+                {"$project": {
+                    "schema": True,
+                    "type": True,
+                    "parent": True,
+                    "name": True,
+                    "data": True
+                }}
+            ],
+            "as": "versions"
+        }},
+        {"$unwind": "$versions"},
+        {"$lookup": {
+            "from": collection.name,
+            "let": {"version_id": "$versions._id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$and": repre_conditions}}}
+            ],
+            "as": "representations"
+        }},
+        {"$project": {
+            "name": True,
+            "parent": True,
+            "version": "$versions",
+            "representations": True
+        }}
+    ]
+
+    output = {asset_name: {} for asset_name in asset_names}
+    for subset in collection.aggregate(pipeline):
+        if not subset["representations"]:
+            continue
+
+        asset_name = asset_names_by_id[subset["parent"]]
+        output[asset_name][subset["name"]] = {
+            "version": subset["version"],
+            "representaions": subset["representations"]
+        }
+
+    return output
 
 
 def get_subsets(asset_name,
@@ -557,60 +1224,28 @@ def get_subsets(asset_name,
     Returns:
         dict: subsets with version and representaions in keys
     """
-
-    # query asset from db
-    asset_io = io.find_one({"type": "asset", "name": asset_name})
-
-    # check if anything returned
-    assert asset_io, (
-        "Asset not existing. Check correct name: `{}`").format(asset_name)
-
-    # create subsets query filter
-    filter_query = {"type": "subset", "parent": asset_io["_id"]}
-
-    # add reggex filter string into query filter
-    if regex_filter:
-        filter_query.update({"name": {"$regex": r"{}".format(regex_filter)}})
-    else:
-        filter_query.update({"name": {"$regex": r'.*'}})
-
-    # query all assets
-    subsets = [s for s in io.find(filter_query)]
-
-    assert subsets, ("No subsets found. Check correct filter. "
-                     "Try this for start `r'.*'`: "
-                     "asset: `{}`").format(asset_name)
-
-    output_dict = {}
-    # Process subsets
-    for subset in subsets:
-        if not version:
-            version_sel = io.find_one(
-                {
-                    "type": "version",
-                    "parent": subset["_id"]
-                },
-                sort=[("name", -1)]
-            )
-        else:
-            assert isinstance(version, int), "version needs to be `int` type"
-            version_sel = io.find_one({
-                "type": "version",
-                "parent": subset["_id"],
-                "name": int(version)
-            })
-
-        find_dict = {"type": "representation",
-                     "parent": version_sel["_id"]}
-
-        filter_repr = {"name": {"$in": representations}}
-
-        find_dict.update(filter_repr)
-        repres_out = [i for i in io.find(find_dict)]
-
-        if len(repres_out) > 0:
-            output_dict[subset["name"]] = {"version": version_sel,
-                                           "representaions": repres_out}
+    output_dict = get_subsets_by_assets(
+        [asset_name],
+        regex_filter=regex_filter,
+        version=version,
+        representations=representations
+    )[asset_name]
+
+    if not output_dict:
+        asset_doc = io.find_one(
+            {"type": "asset", "name": asset_name}, projection={"_id": True}
+        )
+        subset_doc = io.find_one(
+            {
+                "type": "subset",
+                "parent": asset_doc["_id"],
+                "name": {"$regex": r"{}".format(regex_filter or r".*")}
+            },
+            projection={"_id": True}
+        )
+        assert subset_doc, ("No subsets found. Check correct filter. "
+                            "Try this for start `r'.*'`: "
+                            "asset: `{}`").format(asset_name)
 
     return output_dict
 
@@ -1273,35 +1908,20 @@ class BuildWorkfile:
 
         subsets = list(io.find({
             "type": "subset",
-            "parent": {"$in": asset_entity_by_ids.keys()}
+            "parent": {"$in": list(asset_entity_by_ids.keys())}
         }))
         subset_entity_by_ids = {subset["_id"]: subset for subset in subsets}
 
-        sorted_versions = list(io.find({
-            "type": "version",
-            "parent": {"$in": subset_entity_by_ids.keys()}
-        }).sort("name", -1))
-
-        subset_id_with_latest_version = []
-        last_versions_by_id = {}
-        for version in sorted_versions:
-            subset_id = version["parent"]
-            if subset_id in subset_id_with_latest_version:
-                continue
-            subset_id_with_latest_version.append(subset_id)
-            last_versions_by_id[version["_id"]] = version
-
-        repres = io.find({
-            "type": "representation",
-            "parent": {"$in": last_versions_by_id.keys()}
-        })
+        # Only last version of each subset is queried for all assets at once
+        last_version_repres = get_last_version_representations(
+            list(subset_entity_by_ids.keys())
+        )
 
         output = {}
-        for repre in repres:
-            version_id = repre["parent"]
-            version = last_versions_by_id[version_id]
+        for subset_id, (version, repres) in last_version_repres.items():
+            if not repres:
+                continue
 
-            subset_id = version["parent"]
             subset = subset_entity_by_ids[subset_id]
 
             asset_id = subset["parent"]
@@ -1313,39 +1933,198 @@ class BuildWorkfile:
                     "subsets": {}
                 }
 
-            if subset_id not in output[asset_id]["subsets"]:
-                output[asset_id]["subsets"][subset_id] = {
-                    "subset_entity": subset,
-                    "version": {
-                        "version_entity": version,
-                        "repres": []
-                    }
+            output[asset_id]["subsets"][subset_id] = {
+                "subset_entity": subset,
+                "version": {
+                    "version_entity": version,
+                    "repres": repres
                 }
+            }
+
+        return output
+
+
+class FFprobeCache(object):
+    """Process wide cache of ffprobe results.
+
+    Results are stored by normalized path and invalidated when modification
+    time or size of the file changes. Optionally are results stored to json
+    file in entered directory (e.g. staging dir) so other processes (burnin
+    script, repeated publish) don't have to probe the same files again.
 
-            output[asset_id]["subsets"][subset_id]["version"]["repres"].append(
-                repre
+    Example:
+        >>> cache = FFprobeCache()
+        >>> cache.probe_many(["/staging/a.mov", "/staging/b.mov"])
+        >>> cache.streams("/staging/a.mov")[0]["width"]
+        1920
+    """
+
+    store_filename = ".ffprobe_cache.json"
+
+    def __init__(self, workers=4):
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._cache = {}
+        # Loaded stores by directory path
+        self._stores = {}
+
+    @staticmethod
+    def _file_key(path):
+        """Modification time and size of file or `None` if does not exist.
+
+        Path may not exist when contains sequence pattern (e.g. "%04d").
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime, stat.st_size
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._stores.clear()
+
+    def probe(self, path, store_dir=None):
+        """Ffprobe data of file with "streams" and "format" keys."""
+        path = os.path.normpath(path)
+        file_key = self._file_key(path)
+        if file_key is None:
+            return self._run_ffprobe(path)
+
+        with self._lock:
+            cached = self._cached(path, file_key, store_dir)
+        if cached is not None:
+            return cached
+
+        data = self._run_ffprobe(path)
+        with self._lock:
+            self._cache[path] = (file_key, data)
+            if store_dir:
+                self._store_item(store_dir, path, file_key, data)
+        return data
+
+    def probe_many(self, paths, store_dir=None, workers=None):
+        """Probe multiple files in parallel.
+
+        Returns:
+            dict: Ffprobe data by entered paths.
+        """
+        paths = list(collections.OrderedDict.fromkeys(paths))
+        if not paths:
+            return {}
+
+        workers = min(workers or self.workers, len(paths))
+        if workers < 2:
+            results = [self.probe(path, store_dir) for path in paths]
+        else:
+            pool = ThreadPool(workers)
+            try:
+                results = pool.map(
+                    lambda path: self.probe(path, store_dir), paths
+                )
+            finally:
+                pool.close()
+                pool.join()
+        return dict(zip(paths, results))
+
+    def streams(self, path, store_dir=None):
+        return self.probe(path, store_dir)["streams"]
+
+    def _cached(self, path, file_key, store_dir):
+        cached = self._cache.get(path)
+        if cached is None and store_dir:
+            cached = self._load_store(store_dir).get(path)
+            if cached is not None:
+                cached = (tuple(cached[0]), cached[1])
+                self._cache[path] = cached
+
+        if cached is not None and tuple(cached[0]) == file_key:
+            return cached[1]
+        return None
+
+    def _store_path(self, store_dir):
+        return os.path.join(store_dir, self.store_filename)
+
+    def _load_store(self, store_dir):
+        store_dir = os.path.normpath(store_dir)
+        if store_dir in self._stores:
+            return self._stores[store_dir]
+
+        store = {}
+        store_path = self._store_path(store_dir)
+        if os.path.exists(store_path):
+            try:
+                with open(store_path, "r") as stream:
+                    store = json.load(stream)
+            except Exception:
+                log.warning(
+                    "Ffprobe cache \"{}\" is not valid.".format(store_path),
+                    exc_info=True
+                )
+        self._stores[store_dir] = store
+        return store
+
+    def _store_item(self, store_dir, path, file_key, data):
+        store = self._load_store(store_dir)
+        store[path] = [list(file_key), data]
+        store_path = self._store_path(os.path.normpath(store_dir))
+        tmp_path = "{}.{}.tmp".format(store_path, uuid.uuid4().hex)
+        try:
+            with open(tmp_path, "w") as stream:
+                json.dump(store, stream)
+            # Store is replaced at once so other processes never see it
+            #   missing or partially written
+            if hasattr(os, "replace"):
+                os.replace(tmp_path, store_path)
+            else:
+                # Python 2 (rename can't override existing file on Windows)
+                if os.name == "nt" and os.path.exists(store_path):
+                    os.remove(store_path)
+                os.rename(tmp_path, store_path)
+        except (IOError, OSError):
+            log.warning(
+                "Ffprobe cache \"{}\" can't be stored.".format(store_path),
+                exc_info=True
             )
+            if os.path.exists(tmp_path):
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
 
-        return output
+    def _run_ffprobe(self, path):
+        log.info("Getting information about input \"{}\".".format(path))
+        args = [
+            get_ffmpeg_tool_path("ffprobe"),
+            "-v", "quiet",
+            "-print_format", "json",
+            "-show_format",
+            "-show_streams",
+            path
+        ]
+        log.debug("FFprobe command: \"{}\"".format(" ".join(args)))
+        popen = subprocess.Popen(args, stdout=subprocess.PIPE)
 
+        popen_output = popen.communicate()[0]
+        log.debug("FFprobe output: {}".format(popen_output))
+        if popen.returncode != 0:
+            raise RuntimeError("Failed to run ffprobe on \"{}\"".format(path))
+        return json.loads(popen_output)
+
+
+ffprobe_cache = FFprobeCache()
 
-def ffprobe_streams(path_to_file):
-    """Load streams from entered filepath via ffprobe."""
-    log.info(
-        "Getting information about input \"{}\".".format(path_to_file)
-    )
-    args = [
-        get_ffmpeg_tool_path("ffprobe"),
-        "-v quiet",
-        "-print_format json",
-        "-show_format",
-        "-show_streams",
-        "\"{}\"".format(path_to_file)
-    ]
-    command = " ".join(args)
-    log.debug("FFprobe command: \"{}\"".format(command))
-    popen = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE)
 
-    popen_output = popen.communicate()[0]
-    log.debug("FFprobe output: {}".format(popen_output))
-    return json.loads(popen_output)["streams"]
+def ffprobe_streams(path_to_file, store_dir=None):
+    """Load streams from entered filepath via ffprobe.
+
+    Results are cached for the process by path, modification time and size
+    of the file.
+
+    Args:
+        path_to_file (str): Path to probed file.
+        store_dir (str): Directory where results are stored to json file
+            for other processes. Results are kept only in memory if not set.
+    """
+    return ffprobe_cache.streams(path_to_file, store_dir)
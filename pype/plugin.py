@@ -2,9 +2,10 @@ import tempfile
 import os
 import pyblish.api
 
-from pypeapp import config
 import inspect
 
+from .presets import get_presets, thaw
+
 ValidatePipelineOrder = pyblish.api.ValidatorOrder + 0.05
 ValidateContentsOrder = pyblish.api.ValidatorOrder + 0.1
 ValidateSceneOrder = pyblish.api.ValidatorOrder + 0.2
@@ -24,7 +25,7 @@ def imprint_attributes(plugin):
     plugin_host = file.split(os.path.sep)[-3:-2][0]
     plugin_name = type(plugin).__name__
     try:
-        config_data = config.get_presets()['plugins'][plugin_host][plugin_kind][plugin_name]  # noqa: E501
+        config_data = get_presets()['plugins'][plugin_host][plugin_kind][plugin_name]  # noqa: E501
     except KeyError:
         print("preset not found")
         return
@@ -33,7 +34,7 @@ def imprint_attributes(plugin):
         if option == "enabled" and value is False:
             setattr(plugin, "active", False)
         else:
-            setattr(plugin, option, value)
+            setattr(plugin, option, thaw(value))
             print("setting {}: {} on {}".format(option, value, plugin_name))
 
 
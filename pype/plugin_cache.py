@@ -0,0 +1,292 @@
+"""Persistent cache of pyblish plugin discovery.
+
+Discovery of pyblish plugins executes every python file in registered plugin
+paths and then applies presets to found plugins. Result of discovery is
+stored to json file keyed by plugin files (paths, modification times and
+sizes), registered hosts and hash of plugin presets. When nothing changed
+on next launch only files which contain resulting plugins are executed, so
+files with plugins of other hosts, plugins disabled by presets or helper
+modules are skipped and presets are applied from cache without lookups.
+"""
+import os
+import sys
+import json
+import types
+import hashlib
+import logging
+
+import six
+import appdirs
+import pyblish.api
+import pyblish.plugin
+from .presets import get_presets
+from .lib import filter_pyblish_plugins, get_plugin_preset
+
+log = logging.getLogger(__name__)
+
+
+class PyblishDiscoveryCache(object):
+    """Cached replacement of `pyblish.api.discover`.
+
+    Discovery with arguments (e.g. explicit `paths`) is not cached and
+    original discover function is used.
+
+    Args:
+        discover_func (callable): Original pyblish discover function.
+        cache_dir (str): Directory where cache files are stored. Value of
+            `PYPE_PLUGIN_CACHE_DIR` environment variable or user data
+            directory is used if not entered.
+    """
+
+    cache_version = 1
+
+    def __init__(self, discover_func, cache_dir=None):
+        if cache_dir is None:
+            cache_dir = os.environ.get("PYPE_PLUGIN_CACHE_DIR")
+
+        if not cache_dir:
+            cache_dir = os.path.join(
+                appdirs.user_data_dir("pype-app", "pype"), "plugin_cache"
+            )
+
+        self.discover_func = discover_func
+        self.cache_dir = os.path.normpath(cache_dir)
+
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, type=None, regex=None, paths=None):
+        if type is not None or regex is not None or paths is not None:
+            return self.discover_func(type=type, regex=regex, paths=paths)
+        return self.discover()
+
+    def discover(self):
+        """Discover pyblish plugins using cache when possible."""
+        plugin_paths = [
+            os.path.normpath(path)
+            for path in pyblish.plugin.plugin_paths()
+        ]
+        files = self.get_plugin_files(plugin_paths)
+        presets = get_presets().get("plugins", {})
+        key = self.cache_key(files, presets)
+        cache_path = self.cache_path(plugin_paths)
+
+        cache_data = self.load_cache(cache_path)
+        if cache_data and cache_data.get("key") == key:
+            plugins = self.plugins_from_cache(cache_data["files"])
+            if plugins is not None:
+                self.hits += 1
+                return plugins
+            log.debug("Plugin cache is not valid, discovering plugins.")
+
+        self.misses += 1
+        plugins = self.discover_func()
+        self.store_cache(cache_path, {
+            "key": key,
+            "files": self.cache_files_data(plugins, files, presets)
+        })
+        return plugins
+
+    def get_plugin_files(self, plugin_paths):
+        """Files which would be executed by pyblish discover in it's order.
+
+        Returns:
+            list: Tuples with path, modification time and size of file.
+        """
+        files = []
+        for path in plugin_paths:
+            if not os.path.isdir(path):
+                continue
+
+            for fname in os.listdir(path):
+                if fname.startswith("_"):
+                    continue
+
+                if os.path.splitext(fname)[1] != ".py":
+                    continue
+
+                abspath = os.path.join(path, fname)
+                try:
+                    stat = os.stat(abspath)
+                except OSError:
+                    continue
+
+                if os.path.isdir(abspath):
+                    continue
+                files.append((abspath, stat.st_mtime, stat.st_size))
+        return files
+
+    def cache_key(self, files, presets):
+        """Hash of everything what may change result of discovery."""
+        key_data = {
+            "version": self.cache_version,
+            "python": list(sys.version_info[:2]),
+            "pyblish": pyblish.__version__,
+            "hosts": pyblish.api.registered_hosts(),
+            "current_host": pyblish.api.current_host(),
+            "files": files,
+            "presets": presets
+        }
+        return hashlib.sha1(
+            json.dumps(key_data, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+
+    def cache_path(self, plugin_paths):
+        """Path to cache file of registered plugin paths and hosts."""
+        scope = json.dumps([
+            plugin_paths,
+            sorted(pyblish.api.registered_hosts()),
+            list(sys.version_info[:2])
+        ])
+        filename = hashlib.sha1(scope.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, filename + ".json")
+
+    def load_cache(self, cache_path):
+        if not os.path.exists(cache_path):
+            return None
+
+        try:
+            with open(cache_path, "r") as stream:
+                return json.load(stream)
+        except Exception:
+            log.debug(
+                "Plugin cache \"{}\" can't be read.".format(cache_path),
+                exc_info=True
+            )
+        return None
+
+    def store_cache(self, cache_path, cache_data):
+        tmp_path = "{}.{}.tmp".format(cache_path, os.getpid())
+        try:
+            if not os.path.exists(self.cache_dir):
+                os.makedirs(self.cache_dir)
+
+            with open(tmp_path, "w") as stream:
+                json.dump(cache_data, stream)
+
+            if os.path.exists(cache_path):
+                os.remove(cache_path)
+            os.rename(tmp_path, cache_path)
+
+        except Exception:
+            log.warning(
+                "Plugin cache \"{}\" can't be stored.".format(cache_path),
+                exc_info=True
+            )
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def cache_files_data(self, plugins, files, presets):
+        """Files with resulting plugins and their presets.
+
+        Args:
+            plugins (list): Result of original discover.
+            files (list): Output of `get_plugin_files`.
+            presets (dict): Plugin presets.
+
+        Returns:
+            list: Files in discovery order with names and presets
+                of their plugins.
+        """
+        host = pyblish.api.current_host()
+        file_indexes = {
+            path: idx
+            for idx, (path, _, _) in enumerate(files)
+        }
+        files_data = {}
+        for plugin in plugins:
+            # Directly registered plugins are not discovered from files
+            path = plugin.__module__
+            if path not in file_indexes:
+                continue
+
+            options = None
+            if presets:
+                options = get_plugin_preset(plugin, presets, host)
+
+            if path not in files_data:
+                files_data[path] = {
+                    "path": path,
+                    "index": file_indexes[path],
+                    "plugins": []
+                }
+
+            files_data[path]["plugins"].append({
+                "name": plugin.__name__,
+                "options": options or {}
+            })
+
+        return sorted(files_data.values(), key=lambda item: item["index"])
+
+    def load_module(self, path):
+        """Execute plugin file same way as pyblish discover does."""
+        mod_name = os.path.splitext(os.path.basename(path))[0]
+        module = types.ModuleType(mod_name)
+        module.__file__ = path
+        with open(path, "rb") as stream:
+            six.exec_(stream.read(), module.__dict__)
+
+        # Keep reference to module so it's globals are not garbage collected
+        sys.modules[path] = module
+        return module
+
+    def plugins_from_cache(self, files_data):
+        """Load plugins stored in cache.
+
+        Returns:
+            list: Plugins with presets applied or `None` when cached plugin
+                can't be loaded.
+        """
+        plugins = {}
+        plugin_names = []
+        plugin_options = []
+        for file_data in files_data:
+            try:
+                module = self.load_module(file_data["path"])
+            except Exception:
+                log.debug(
+                    "Skipped: \"{}\"".format(file_data["path"]),
+                    exc_info=True
+                )
+                return None
+
+            for plugin_data in file_data["plugins"]:
+                plugin = getattr(module, plugin_data["name"], None)
+                if plugin is None:
+                    return None
+
+                plugin.__module__ = module.__file__
+                key = "{0}.{1}".format(plugin.__module__, plugin.__name__)
+                plugins[key] = plugin
+                plugin_names.append(plugin.__name__)
+                plugin_options.append((plugin, plugin_data["options"]))
+
+        # Directly registered plugins are not in cache so presets must be
+        # applied to them with discovery filter
+        registered_plugins = list(pyblish.api.registered_plugins())
+        filter_pyblish_plugins(registered_plugins)
+        for plugin in registered_plugins:
+            if (
+                not pyblish.plugin.ALLOW_DUPLICATES
+                and plugin.__name__ in plugin_names
+            ):
+                log.debug("Duplicate plug-in found: {}".format(plugin))
+                continue
+
+            plugin_names.append(plugin.__name__)
+            plugins[plugin.__name__] = plugin
+
+        plugins = list(plugins.values())
+        pyblish.plugin.sort(plugins)
+
+        # Presets are applied after sorting same as by discovery filter
+        for plugin, options in plugin_options:
+            for option, value in options.items():
+                setattr(plugin, option, value)
+
+        for filter_ in pyblish.api.registered_discovery_filters():
+            if filter_ is filter_pyblish_plugins:
+                continue
+            filter_(plugins)
+
+        return plugins
@@ -1,12 +1,23 @@
 import os
 import sys
+import time
+import collections
 import six
 import pyblish.api
 import clique
 
 
 class IntegrateFtrackApi(pyblish.api.InstancePlugin):
-    """ Commit components to server. """
+    """ Commit components to server.
+
+    Entities of all components are processed in batches to reduce number of
+    requests to ftrack server:
+    - existing entities are queried with one call
+    - missing AssetTypes, Assets and AssetVersions are created with one commit
+    - new components are registered to their locations with batched calls
+    - metadata, comments, custom attributes and thumbnails are set with one
+        commit
+    """
 
     order = pyblish.api.IntegratorOrder+0.499
     label = "Integrate Ftrack Api"
@@ -16,44 +27,44 @@ class IntegrateFtrackApi(pyblish.api.InstancePlugin):
         """ Generate a query expression from data supplied.
 
         If a value is not a string, we'll add the id of the entity to the
-        query.
+        query. Value may be also dictionary with data of entity which does
+        not have to exist yet, then query is filtered by it's data.
 
         Args:
             entitytype (str): The type of entity to query.
             data (dict): The data to identify the entity.
-            exclusions (list): All keys to exclude from the query.
 
         Returns:
             str: String query to use with "session.query"
         """
-        queries = []
-        if sys.version_info[0] < 3:
-            for key, value in data.iteritems():
-                if not isinstance(value, (basestring, int)):
-                    self.log.info("value: {}".format(value))
-                    if "id" in value.keys():
-                        queries.append(
-                            "{0}.id is \"{1}\"".format(key, value["id"])
-                        )
-                else:
-                    queries.append("{0} is \"{1}\"".format(key, value))
-        else:
-            for key, value in data.items():
-                if not isinstance(value, (str, int)):
-                    self.log.info("value: {}".format(value))
-                    if "id" in value.keys():
-                        queries.append(
-                            "{0}.id is \"{1}\"".format(key, value["id"])
-                        )
-                else:
-                    queries.append("{0} is \"{1}\"".format(key, value))
-
         query = (
-            "select id from " + entitytype + " where " + " and ".join(queries)
+            "select id from " + entitytype + " where "
+            + " and ".join(self.query_conditions(data))
         )
         self.log.debug(query)
         return query
 
+    def query_conditions(self, data, prefix=""):
+        """Conditions of query expression for entity data."""
+        queries = []
+        for key, value in data.items():
+            if isinstance(value, dict):
+                queries.extend(self.query_conditions(
+                    value, "{}{}.".format(prefix, key)
+                ))
+
+            elif not isinstance(value, (six.string_types, int)):
+                self.log.info("value: {}".format(value))
+                if "id" in value.keys():
+                    queries.append(
+                        "{0}{1}.id is \"{2}\"".format(prefix, key, value["id"])
+                    )
+            else:
+                queries.append(
+                    "{0}{1} is \"{2}\"".format(prefix, key, value)
+                )
+        return queries
+
     def process(self, instance):
 
         session = instance.context.data["ftrackSession"]
@@ -74,327 +85,556 @@ class IntegrateFtrackApi(pyblish.api.InstancePlugin):
             name = instance.context.data.get("ftrackEntity")['name']
             parent = instance.context.data.get("ftrackEntity")
 
-        info_msg = "Created new {entity_type} with data: {data}"
-        info_msg += ", metadata: {metadata}."
+        timings = collections.OrderedDict()
+        start = time.time()
+
+        items = [
+            self.prepare_item(data, name, parent)
+            for data in instance.data.get("ftrackComponentsList", [])
+        ]
+        entities = self.query_existing_entities(session, items)
+        timings["query"] = time.time()
+
+        self.create_entities(session, items, entities, task)
+        timings["entities"] = time.time()
+
+        self.integrate_components(session, items, entities)
+        timings["components"] = time.time()
+
+        self.update_entities(session, items)
+        timings["update"] = time.time()
+
+        phases = []
+        last_time = start
+        for phase, phase_time in timings.items():
+            phases.append("{}: {:.3f}s".format(phase, phase_time - last_time))
+            last_time = phase_time
+        self.log.info("Integrated {} components in {:.3f}s ({})".format(
+            len(items), last_time - start, ", ".join(phases)
+        ))
 
         used_asset_versions = []
-        # Iterate over components and publish
-        for data in instance.data.get("ftrackComponentsList", []):
+        for item in items:
+            assetversion_entity = item["assetversion_entity"]
+            if assetversion_entity not in used_asset_versions:
+                used_asset_versions.append(assetversion_entity)
+
+        asset_versions_key = "ftrackIntegratedAssetVersions"
+        if asset_versions_key not in instance.data:
+            instance.data[asset_versions_key] = []
 
-            # AssetType
-            # Get existing entity.
-            assettype_data = {"short": "upload"}
-            assettype_data.update(data.get("assettype_data", {}))
-            self.log.debug("data: {}".format(data))
+        for asset_version in used_asset_versions:
+            if asset_version not in instance.data[asset_versions_key]:
+                instance.data[asset_versions_key].append(asset_version)
 
-            assettype_entity = session.query(
-                self.query("AssetType", assettype_data)
-            ).first()
+    def prepare_item(self, data, name, parent):
+        """Prepare data of entities for one item of components list.
 
-            # Create a new entity if none exits.
-            if not assettype_entity:
-                assettype_entity = session.create("AssetType", assettype_data)
-                self.log.debug(
-                    "Created new AssetType with data: ".format(assettype_data)
-                )
+        Parent entities in data of Asset, AssetVersion and Component are
+        dictionaries with data of the parent so queries of all entities can
+        be created before any entity is queried or created.
+
+        Metadata are separated because of ftrack_api bug where you can't add
+        metadata on creation.
+        """
+        self.log.debug("data: {}".format(data))
+
+        # AssetType
+        assettype_data = {"short": "upload"}
+        assettype_data.update(data.get("assettype_data", {}))
+
+        # Asset
+        asset_data = {
+            "name": name,
+            "type": assettype_data,
+            "parent": parent,
+        }
+        asset_data.update(data.get("asset_data", {}))
+        asset_metadata = asset_data.pop("metadata", {})
+
+        # AssetVersion
+        assetversion_data = {
+            "version": 0,
+            "asset": asset_data,
+        }
+        _assetversion_data = dict(data.get("assetversion_data", {}))
+        assetversion_cust_attrs = dict(_assetversion_data.pop(
+            "custom_attributes", {}
+        ))
+        asset_version_comment = _assetversion_data.pop(
+            "comment", None
+        )
+        assetversion_data.update(_assetversion_data)
+        assetversion_metadata = assetversion_data.pop("metadata", {})
+
+        # Component
+        component_data = {
+            "name": "main",
+            "version": assetversion_data
+        }
+        component_data.update(data.get("component_data", {}))
+        component_metadata = component_data.pop("metadata", {})
+
+        return {
+            "data": data,
+            "assettype_data": assettype_data,
+            "asset_data": asset_data,
+            "asset_metadata": asset_metadata,
+            "assetversion_data": assetversion_data,
+            "assetversion_metadata": assetversion_metadata,
+            "assetversion_cust_attrs": assetversion_cust_attrs,
+            "assetversion_comment": asset_version_comment,
+            "component_data": component_data,
+            "component_metadata": component_metadata
+        }
+
+    def query_existing_entities(self, session, items):
+        """Query existing entities of all items with one call.
 
-            # Asset
-            # Get existing entity.
-            asset_data = {
-                "name": name,
-                "type": assettype_entity,
-                "parent": parent,
+        Returns:
+            dict: Found entity (or `None`) by query expression.
+        """
+        expressions = []
+        for item in items:
+            item["queries"] = {
+                "AssetType": self.query(
+                    "AssetType", item["assettype_data"]
+                ),
+                "Asset": self.query("Asset", item["asset_data"]),
+                "AssetVersion": self.query(
+                    "AssetVersion", item["assetversion_data"]
+                ),
+                "Component": self.query(
+                    "Component", item["component_data"]
+                )
             }
-            asset_data.update(data.get("asset_data", {}))
+            for expression in item["queries"].values():
+                if expression not in expressions:
+                    expressions.append(expression)
+
+        entities = {}
+        if not expressions:
+            return entities
+
+        queries = [
+            {"action": "query", "expression": expression}
+            for expression in expressions
+        ]
+        if hasattr(session, "call"):
+            results = session.call(queries)
+        else:
+            results = session._call(queries)
 
-            asset_entity = session.query(
-                self.query("Asset", asset_data)
-            ).first()
+        for expression, result in zip(expressions, results):
+            entity = None
+            if result["data"]:
+                entity = session.merge(result["data"][0])
+            entities[expression] = entity
+        return entities
 
-            self.log.info("asset entity: {}".format(asset_entity))
+    def create_entities(self, session, items, entities, task):
+        """Create missing AssetTypes, Assets and AssetVersions.
 
-            # Extracting metadata, and adding after entity creation. This is
-            # due to a ftrack_api bug where you can't add metadata on creation.
-            asset_metadata = asset_data.pop("metadata", {})
+        Version and asset must be committed before components are added to
+        location because location can't determine the final location without.
+        """
+        info_msg = "Created new {entity_type} with data: {data}"
+        info_msg += ", metadata: {metadata}."
+
+        for item in items:
+            queries = item["queries"]
+            assettype_entity = entities[queries["AssetType"]]
+            if not assettype_entity:
+                assettype_entity = session.create(
+                    "AssetType", item["assettype_data"]
+                )
+                entities[queries["AssetType"]] = assettype_entity
+                self.log.debug(
+                    "Created new AssetType with data: {}".format(
+                        item["assettype_data"]
+                    )
+                )
 
-            # Create a new entity if none exits.
+            asset_entity = entities[queries["Asset"]]
+            self.log.info("asset entity: {}".format(asset_entity))
             if not asset_entity:
+                asset_data = dict(item["asset_data"])
+                asset_data["type"] = assettype_entity
                 asset_entity = session.create("Asset", asset_data)
+                entities[queries["Asset"]] = asset_entity
                 self.log.debug(
                     info_msg.format(
                         entity_type="Asset",
                         data=asset_data,
-                        metadata=asset_metadata
+                        metadata=item["asset_metadata"]
                     )
                 )
-                try:
-                    session.commit()
-                except Exception:
-                    tp, value, tb = sys.exc_info()
-                    session.rollback()
-                    six.reraise(tp, value, tb)
-
-            # Adding metadata
-            existing_asset_metadata = asset_entity["metadata"]
-            existing_asset_metadata.update(asset_metadata)
-            asset_entity["metadata"] = existing_asset_metadata
-
-            # AssetVersion
-            # Get existing entity.
-            assetversion_data = {
-                "version": 0,
-                "asset": asset_entity,
-            }
-            _assetversion_data = data.get("assetversion_data", {})
-            assetversion_cust_attrs = _assetversion_data.pop(
-                "custom_attributes", {}
-            )
-            asset_version_comment = _assetversion_data.pop(
-                "comment", None
-            )
-            assetversion_data.update(_assetversion_data)
+            item["asset_entity"] = asset_entity
 
-            assetversion_entity = session.query(
-                self.query("AssetVersion", assetversion_data)
-            ).first()
-
-            # Extracting metadata, and adding after entity creation. This is
-            # due to a ftrack_api bug where you can't add metadata on creation.
-            assetversion_metadata = assetversion_data.pop("metadata", {})
-
-            if task:
-                assetversion_data['task'] = task
-
-            # Create a new entity if none exits.
+            assetversion_entity = entities[queries["AssetVersion"]]
             if not assetversion_entity:
+                assetversion_data = dict(item["assetversion_data"])
+                assetversion_data["asset"] = asset_entity
+                if task:
+                    assetversion_data["task"] = task
+
                 assetversion_entity = session.create(
                     "AssetVersion", assetversion_data
                 )
+                entities[queries["AssetVersion"]] = assetversion_entity
                 self.log.debug(
                     info_msg.format(
                         entity_type="AssetVersion",
                         data=assetversion_data,
-                        metadata=assetversion_metadata
+                        metadata=item["assetversion_metadata"]
                     )
                 )
-                try:
-                    session.commit()
-                except Exception:
-                    tp, value, tb = sys.exc_info()
-                    session.rollback()
-                    six.reraise(tp, value, tb)
-
-            # Adding metadata
-            existing_assetversion_metadata = assetversion_entity["metadata"]
-            existing_assetversion_metadata.update(assetversion_metadata)
-            assetversion_entity["metadata"] = existing_assetversion_metadata
-
-            # Add comment
-            if asset_version_comment:
-                assetversion_entity["comment"] = asset_version_comment
-                try:
-                    session.commit()
-                except Exception:
-                    session.rollback()
-                    self.log.warning((
-                        "Comment was not possible to set for AssetVersion"
-                        "\"{0}\". Can't set it's value to: \"{1}\""
-                    ).format(
-                        assetversion_entity["id"], str(asset_version_comment)
-                    ))
+            item["assetversion_entity"] = assetversion_entity
 
-            # Adding Custom Attributes
-            for attr, val in assetversion_cust_attrs.items():
-                if attr in assetversion_entity["custom_attributes"]:
-                    try:
-                        assetversion_entity["custom_attributes"][attr] = val
-                        session.commit()
-                        continue
-                    except Exception:
-                        session.rollback()
+        self.commit(session)
 
-                self.log.warning((
-                    "Custom Attrubute \"{0}\""
-                    " is not available for AssetVersion <{1}>."
-                    " Can't set it's value to: \"{2}\""
-                ).format(attr, assetversion_entity["id"], str(val)))
+    def integrate_components(self, session, items, entities):
+        """Create new components and overwrite existing if requested.
 
-            # Have to commit the version and asset, because location can't
-            # determine the final location without.
-            try:
-                session.commit()
-            except Exception:
-                tp, value, tb = sys.exc_info()
-                session.rollback()
-                six.reraise(tp, value, tb)
-
-            # Component
-            # Get existing entity.
-            component_data = {
-                "name": "main",
-                "version": assetversion_entity
-            }
-            component_data.update(data.get("component_data", {}))
+        New components of all items are registered to origin location with
+        one call and then added to their locations (one call per location).
+        """
+        origin_location = None
+        default_location = None
 
-            component_entity = session.query(
-                self.query("Component", component_data)
-            ).first()
+        new_components = []
+        origin_sources = []
+        components_by_location = collections.OrderedDict()
+        for item in items:
+            data = item["data"]
+            component_query = item["queries"]["Component"]
+            component_entity = entities[component_query]
 
             component_overwrite = data.get("component_overwrite", False)
-            location = data.get("component_location", session.pick_location())
-
-            # Overwrite existing component data if requested.
-            if component_entity and component_overwrite:
-
-                origin_location = session.query(
-                    "Location where name is \"ftrack.origin\""
-                ).one()
-
-                # Removing existing members from location
-                components = list(component_entity.get("members", []))
-                components += [component_entity]
-                for component in components:
-                    for loc in component["component_locations"]:
-                        if location["id"] == loc["location_id"]:
-                            location.remove_component(
-                                component, recursive=False
-                            )
-
-                # Deleting existing members on component entity
-                for member in component_entity.get("members", []):
-                    session.delete(member)
-                    del(member)
-
-                try:
-                    session.commit()
-                except Exception:
-                    tp, value, tb = sys.exc_info()
-                    session.rollback()
-                    six.reraise(tp, value, tb)
-
-                # Reset members in memory
-                if "members" in component_entity.keys():
-                    component_entity["members"] = []
-
-                # Add components to origin location
-                try:
-                    collection = clique.parse(data["component_path"])
-                except ValueError:
-                    # Assume its a single file
-                    # Changing file type
-                    name, ext = os.path.splitext(data["component_path"])
-                    component_entity["file_type"] = ext
-
-                    origin_location.add_component(
-                        component_entity, data["component_path"]
+            if "component_location" in data:
+                location = data["component_location"]
+            else:
+                if default_location is None:
+                    default_location = session.pick_location()
+                location = default_location
+
+            component_data = dict(item["component_data"])
+            component_data["version"] = item["assetversion_entity"]
+            item["new_component"] = False
+
+            if component_entity:
+                if component_overwrite:
+                    if origin_location is None:
+                        origin_location = self.get_origin_location(session)
+
+                    self.overwrite_component(
+                        session, data, component_entity, component_data,
+                        location, origin_location
                     )
+
                 else:
-                    # Changing file type
-                    component_entity["file_type"] = collection.format("{tail}")
-
-                    # Create member components for sequence.
-                    for member_path in collection:
-
-                        size = 0
-                        try:
-                            size = os.path.getsize(member_path)
-                        except OSError:
-                            pass
-
-                        name = collection.match(member_path).group("index")
-
-                        member_data = {
-                            "name": name,
-                            "container": component_entity,
-                            "size": size,
-                            "file_type": os.path.splitext(member_path)[-1]
-                        }
-
-                        component = session.create(
-                            "FileComponent", member_data
-                        )
-                        origin_location.add_component(
-                            component, member_path, recursive=False
-                        )
-                        component_entity["members"].append(component)
-
-                # Add components to location.
-                location.add_component(
-                    component_entity, origin_location, recursive=True
+                    self.log.info(
+                        "Found existing component, and no request to"
+                        " overwrite. Nothing has been changed."
+                    )
+
+            else:
+                component_entity, origin_items = self.create_component(
+                    session, data["component_path"], component_data
                 )
+                for component, path in origin_items:
+                    new_components.append(component)
+                    origin_sources.append(path)
+
+                if location is not None:
+                    location_id = location["id"]
+                    if location_id not in components_by_location:
+                        components_by_location[location_id] = (location, [])
+                    components_by_location[location_id][1].append(
+                        component_entity
+                    )
 
-                data["component"] = component_entity
-                msg = "Overwriting Component with path: {0}, data: {1}, "
-                msg += "location: {2}"
+                entities[component_query] = component_entity
+                item["new_component"] = True
+                msg = "Created new Component with path: {0}, data: {1}"
+                msg += ", metadata: {2}, location: {3}"
                 self.log.info(
                     msg.format(
                         data["component_path"],
                         component_data,
+                        item["component_metadata"],
                         location
                     )
                 )
 
-            # Extracting metadata, and adding after entity creation. This is
-            # due to a ftrack_api bug where you can't add metadata on creation.
-            component_metadata = component_data.pop("metadata", {})
-
-            # Create new component if none exists.
-            new_component = False
-            if not component_entity:
-                component_entity = assetversion_entity.create_component(
-                    data["component_path"],
-                    data=component_data,
-                    location=location
+            data["component"] = component_entity
+            item["component_entity"] = component_entity
+
+        if not new_components:
+            return
+
+        # Add to special origin location so that it is possible to add to
+        # other locations (new components are committed with it).
+        if origin_location is None:
+            origin_location = self.get_origin_location(session)
+        origin_location.add_components(
+            new_components, origin_sources, recursive=False
+        )
+
+        for location, components in components_by_location.values():
+            location.add_components(
+                components, origin_location, recursive=True
+            )
+
+    def create_component(self, session, path, data):
+        """Create component entities same way as `create_component` does.
+
+        Components are not added to any location.
+
+        Args:
+            session (ftrack_api.Session): Ftrack session.
+            path (str): Path to file or sequence of files in clique format.
+            data (dict): Data of component.
+
+        Returns:
+            tuple: Created component and list of tuples with created
+                components and their paths (including sequence members).
+        """
+        try:
+            collection = clique.parse(path)
+
+        except ValueError:
+            # Assume is a single file.
+            if "size" not in data:
+                data["size"] = self.get_file_size(path)
+            data.setdefault("file_type", os.path.splitext(path)[-1])
+
+            component = session.create("FileComponent", data)
+            return component, [(component, path)]
+
+        member_sizes = {}
+        container_size = data.get("size")
+        if container_size is not None:
+            if len(collection.indexes) > 0:
+                member_size = int(
+                    round(container_size / len(collection.indexes))
                 )
-                data["component"] = component_entity
-                msg = "Created new Component with path: {0}, data: {1}"
-                msg += ", metadata: {2}, location: {3}"
-                self.log.info(
-                    msg.format(
-                        data["component_path"],
-                        component_data,
-                        component_metadata,
-                        location
+                for member_path in collection:
+                    member_sizes[member_path] = member_size
+        else:
+            container_size = 0
+            for member_path in collection:
+                member_sizes[member_path] = self.get_file_size(member_path)
+                container_size += member_sizes[member_path]
+
+        container_path = collection.format("{head}{padding}{tail}")
+        data.setdefault("padding", collection.padding)
+        data.setdefault("file_type", os.path.splitext(container_path)[-1])
+        data.setdefault("size", container_size)
+
+        container = session.create("SequenceComponent", data)
+        output = [(container, container_path)]
+
+        # Create member components for sequence.
+        for member_path in collection:
+            member_data = {
+                "name": collection.match(member_path).group("index"),
+                "container": container,
+                "size": member_sizes[member_path],
+                "file_type": os.path.splitext(member_path)[-1]
+            }
+            component = session.create("FileComponent", member_data)
+            container["members"].append(component)
+            output.append((component, member_path))
+
+        return container, output
+
+    def overwrite_component(
+        self, session, data, component_entity, component_data,
+        location, origin_location
+    ):
+        """Replace content of existing component with new path."""
+        # Removing existing members from location
+        components = list(component_entity.get("members", []))
+        components += [component_entity]
+        for component in components:
+            for loc in component["component_locations"]:
+                if location["id"] == loc["location_id"]:
+                    location.remove_component(
+                        component, recursive=False
                     )
+
+        # Deleting existing members on component entity
+        for member in component_entity.get("members", []):
+            session.delete(member)
+            del(member)
+
+        self.commit(session)
+
+        # Reset members in memory
+        if "members" in component_entity.keys():
+            component_entity["members"] = []
+
+        # Add components to origin location
+        try:
+            collection = clique.parse(data["component_path"])
+        except ValueError:
+            # Assume its a single file
+            # Changing file type
+            name, ext = os.path.splitext(data["component_path"])
+            component_entity["file_type"] = ext
+
+            origin_location.add_component(
+                component_entity, data["component_path"]
+            )
+        else:
+            # Changing file type
+            component_entity["file_type"] = collection.format("{tail}")
+
+            # Create member components for sequence.
+            members = []
+            member_paths = []
+            for member_path in collection:
+                name = collection.match(member_path).group("index")
+
+                member_data = {
+                    "name": name,
+                    "container": component_entity,
+                    "size": self.get_file_size(member_path),
+                    "file_type": os.path.splitext(member_path)[-1]
+                }
+
+                component = session.create(
+                    "FileComponent", member_data
                 )
-                new_component = True
+                component_entity["members"].append(component)
+                members.append(component)
+                member_paths.append(member_path)
 
-            # Adding metadata
-            existing_component_metadata = component_entity["metadata"]
-            existing_component_metadata.update(component_metadata)
-            component_entity["metadata"] = existing_component_metadata
+            origin_location.add_components(
+                members, member_paths, recursive=False
+            )
 
-            # if component_data['name'] = 'ftrackreview-mp4-mp4':
-            #     assetversion_entity["thumbnail_id"]
+        # Add components to location.
+        location.add_component(
+            component_entity, origin_location, recursive=True
+        )
 
-            # Setting assetversion thumbnail
-            if data.get("thumbnail", False):
-                assetversion_entity["thumbnail_id"] = component_entity["id"]
+        msg = "Overwriting Component with path: {0}, data: {1}, "
+        msg += "location: {2}"
+        self.log.info(
+            msg.format(
+                data["component_path"],
+                component_data,
+                location
+            )
+        )
 
-            # Inform user about no changes to the database.
-            if (component_entity and not component_overwrite and
-                    not new_component):
-                data["component"] = component_entity
-                self.log.info(
-                    "Found existing component, and no request to overwrite. "
-                    "Nothing has been changed."
+    def update_entities(self, session, items):
+        """Set metadata, thumbnails, comments and custom attributes.
+
+        All changes are committed at once. When commit fails comments and
+        custom attributes are committed one by one so invalid value does not
+        block the rest.
+        """
+        for item in items:
+            assetversion_entity = item["assetversion_entity"]
+            for attr in tuple(item["assetversion_cust_attrs"].keys()):
+                if attr in assetversion_entity["custom_attributes"]:
+                    continue
+
+                val = item["assetversion_cust_attrs"].pop(attr)
+                self.log.warning((
+                    "Custom Attrubute \"{0}\""
+                    " is not available for AssetVersion <{1}>."
+                    " Can't set it's value to: \"{2}\""
+                ).format(attr, assetversion_entity["id"], str(val)))
+
+        self.set_metadata(items)
+        self.set_version_attributes(session, items)
+        try:
+            session.commit()
+            return
+        except Exception:
+            session.rollback()
+            self.log.warning(
+                "Batched update failed, committing changes one by one.",
+                exc_info=True
+            )
+
+        self.set_metadata(items)
+        self.commit(session)
+        self.set_version_attributes(session, items, commit_each=True)
+
+    def set_metadata(self, items):
+        for item in items:
+            for entity_key, metadata_key in (
+                ("asset_entity", "asset_metadata"),
+                ("assetversion_entity", "assetversion_metadata"),
+                ("component_entity", "component_metadata")
+            ):
+                entity = item[entity_key]
+                existing_metadata = entity["metadata"]
+                existing_metadata.update(item[metadata_key])
+                entity["metadata"] = existing_metadata
+
+            # Setting assetversion thumbnail
+            if item["data"].get("thumbnail", False):
+                item["assetversion_entity"]["thumbnail_id"] = (
+                    item["component_entity"]["id"]
                 )
-            else:
-                # Commit changes.
+
+    def set_version_attributes(self, session, items, commit_each=False):
+        for item in items:
+            assetversion_entity = item["assetversion_entity"]
+
+            # Add comment
+            asset_version_comment = item["assetversion_comment"]
+            if asset_version_comment:
+                assetversion_entity["comment"] = asset_version_comment
+                if commit_each:
+                    try:
+                        session.commit()
+                    except Exception:
+                        session.rollback()
+                        self.log.warning((
+                            "Comment was not possible to set for AssetVersion"
+                            "\"{0}\". Can't set it's value to: \"{1}\""
+                        ).format(
+                            assetversion_entity["id"],
+                            str(asset_version_comment)
+                        ))
+
+            # Adding Custom Attributes
+            for attr, val in item["assetversion_cust_attrs"].items():
+                assetversion_entity["custom_attributes"][attr] = val
+                if not commit_each:
+                    continue
+
                 try:
                     session.commit()
                 except Exception:
-                    tp, value, tb = sys.exc_info()
                     session.rollback()
-                    six.reraise(tp, value, tb)
-
-            if assetversion_entity not in used_asset_versions:
-                used_asset_versions.append(assetversion_entity)
-
-        asset_versions_key = "ftrackIntegratedAssetVersions"
-        if asset_versions_key not in instance.data:
-            instance.data[asset_versions_key] = []
-
-        for asset_version in used_asset_versions:
-            if asset_version not in instance.data[asset_versions_key]:
-                instance.data[asset_versions_key].append(asset_version)
+                    self.log.warning((
+                        "Custom Attrubute \"{0}\" value of AssetVersion <{1}>"
+                        " can't be set to: \"{2}\""
+                    ).format(attr, assetversion_entity["id"], str(val)))
+
+    def get_origin_location(self, session):
+        return session.query(
+            "Location where name is \"ftrack.origin\""
+        ).one()
+
+    def get_file_size(self, path):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    def commit(self, session):
+        try:
+            session.commit()
+        except Exception:
+            tp, value, tb = sys.exc_info()
+            session.rollback()
+            six.reraise(tp, value, tb)
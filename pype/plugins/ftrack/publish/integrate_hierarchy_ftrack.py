@@ -1,4 +1,5 @@
 import sys
+import collections
 
 import six
 import pyblish.api
@@ -34,6 +35,12 @@ class IntegrateHierarchyToFtrack(pyblish.api.ContextPlugin):
     families = ["clip", "shot"]
     optional = False
 
+    # Existing entities are queried for whole hierarchy at once and changes
+    # are committed in batches (`import_to_ftrack` is used when disabled)
+    bulk_mode = True
+    # Maximum number of names or ids in one query expression
+    query_batch_size = 200
+
     def process(self, context):
         self.context = context
         if "hierarchyContext" not in context.data:
@@ -47,7 +54,10 @@ class IntegrateHierarchyToFtrack(pyblish.api.ContextPlugin):
 
         input_data = context.data["hierarchyContext"]
 
-        self.import_to_ftrack(input_data)
+        if self.bulk_mode:
+            self.import_to_ftrack_bulk(input_data)
+        else:
+            self.import_to_ftrack(input_data)
 
     def import_to_ftrack(self, input_data, parent=None):
         for entity_name in input_data:
@@ -150,6 +160,229 @@ class IntegrateHierarchyToFtrack(pyblish.api.ContextPlugin):
                 self.import_to_ftrack(
                     entity_data['childs'], entity)
 
+    def import_to_ftrack_bulk(self, input_data):
+        """Create hierarchy in ftrack with batched queries and commits.
+
+        Result is same as result of `import_to_ftrack`. Existing entities are
+        found by name in project, missing entities are created with one
+        commit and then custom attributes, tasks and links of all entities
+        are set with another commit.
+        """
+        for entity_name, entity_data in input_data.items():
+            if entity_data["entity_type"].lower() != "project":
+                raise AssertionError(
+                    "Collected items are not in right order!"
+                )
+
+            query = 'Project where full_name is "{}"'.format(entity_name)
+            project = self.session.query(query).one()
+            self.ft_project = project
+            self.task_types = self.get_all_task_types(project)
+
+            nodes = self.flatten_hierarchy(entity_name, entity_data)
+            nodes[0]["entity"] = project
+
+            self.create_missing_entities(project, nodes)
+            self.update_entities(nodes)
+
+    def flatten_hierarchy(self, name, entity_data, parent=None, nodes=None):
+        """Entities of hierarchy in order of creation (parents first)."""
+        if nodes is None:
+            nodes = []
+
+        self.log.debug(entity_data)
+        node = {
+            "name": name,
+            "data": entity_data,
+            "parent": parent,
+            "entity": None
+        }
+        nodes.append(node)
+        for child_name, child_data in entity_data.get("childs", {}).items():
+            self.flatten_hierarchy(child_name, child_data, node, nodes)
+        return nodes
+
+    def query_in_batches(self, expression, values):
+        """Query entities with values split to multiple query expressions.
+
+        Args:
+            expression (str): Query with "{}" where joined values are filled.
+            values (iterable): Values (names or ids) to query.
+
+        Returns:
+            list: Queried entities.
+        """
+        values = list(values)
+        entities = []
+        for idx in range(0, len(values), self.query_batch_size):
+            joined = ", ".join(
+                "\"{}\"".format(value)
+                for value in values[idx:idx + self.query_batch_size]
+            )
+            entities.extend(self.session.query(expression.format(joined)))
+        return entities
+
+    def create_missing_entities(self, project, nodes):
+        """Find existing entities by name and create missing.
+
+        Entity is found only when there is exactly one entity with the name
+        in project. Created entities are reused by nodes with the same name.
+        """
+        names = set(node["name"] for node in nodes[1:])
+        entities_by_name = collections.defaultdict(list)
+        for entity in self.query_in_batches(
+            (
+                "select id, name, parent_id, custom_attributes"
+                " from TypedContext where project_id is \"{}\""
+            ).format(project["id"]) + " and name in ({})",
+            names
+        ):
+            entities_by_name[entity["name"]].append(entity)
+
+        entity_by_name = {
+            name: entities[0]
+            for name, entities in entities_by_name.items()
+            if len(entities) == 1
+        }
+
+        created = []
+        for node in nodes[1:]:
+            entity = entity_by_name.get(node["name"])
+            if entity is None:
+                entity = self.session.create(node["data"]["entity_type"], {
+                    "name": node["name"],
+                    "parent": node["parent"]["entity"]
+                })
+                entity_by_name[node["name"]] = entity
+                created.append(entity)
+            node["entity"] = entity
+
+        if not created:
+            return
+
+        self.commit()
+
+        # Query custom attributes of all created entities at once
+        self.query_in_batches(
+            "select id, custom_attributes from TypedContext where id in ({})",
+            [entity["id"] for entity in created]
+        )
+
+    def update_entities(self, nodes):
+        """Set custom attributes, tasks and links of all entities."""
+        entity_ids = set(node["entity"]["id"] for node in nodes)
+        typed_entity_ids = set(node["entity"]["id"] for node in nodes[1:])
+
+        existing_tasks = collections.defaultdict(set)
+        for task in self.query_in_batches(
+            "select name, parent_id from Task where parent_id in ({})",
+            entity_ids
+        ):
+            existing_tasks[task["parent_id"]].add(task["name"].lower())
+
+        incoming_links = collections.defaultdict(list)
+        for link in self.query_in_batches(
+            "select id, to_id from TypedContextLink where to_id in ({})",
+            typed_entity_ids
+        ):
+            incoming_links[link["to_id"]].append(link)
+
+        asset_builds = self.get_input_asset_builds(nodes)
+
+        processed_ids = set()
+        for node in nodes:
+            entity = node["entity"]
+            entity_data = node["data"]
+
+            # CUSTOM ATTRIBUTES
+            custom_attributes = entity_data.get('custom_attributes', [])
+            instances = [
+                i for i in self.context if i.data['asset'] in entity['name']
+            ]
+            for key in custom_attributes:
+                assert (key in entity['custom_attributes']), (
+                    'Missing custom attribute key: `{0}` in attrs: '
+                    '`{1}`'.format(key, entity['custom_attributes'].keys())
+                )
+
+                entity['custom_attributes'][key] = custom_attributes[key]
+
+                for instance in instances:
+                    instance.data['ftrackEntity'] = entity
+
+            # TASKS
+            entity_tasks = existing_tasks[entity["id"]]
+            for task in entity_data.get('tasks', []):
+                if task.lower() in entity_tasks:
+                    self.log.debug("Task {} already exists".format(task))
+                    continue
+
+                self.session.create('Task', {
+                    'name': task,
+                    'parent': entity,
+                    'type': self.task_types[task]
+                })
+                entity_tasks.add(task.lower())
+
+            # Incoming links.
+            if entity["id"] not in typed_entity_ids:
+                continue
+
+            # Existing links are cleared only once for entity
+            if entity["id"] not in processed_ids:
+                processed_ids.add(entity["id"])
+                for link in incoming_links[entity["id"]]:
+                    self.session.delete(link)
+
+            for input in entity_data.get("inputs", []):
+                assetbuild = asset_builds[input]
+                self.log.debug(
+                    "Creating link from {0} to {1}".format(
+                        assetbuild["name"], entity["name"]
+                    )
+                )
+                self.session.create(
+                    "TypedContextLink", {"from": assetbuild, "to": entity}
+                )
+
+        self.commit()
+
+    def get_input_asset_builds(self, nodes):
+        """AssetBuild entities of inputs of all nodes by avalon id of input."""
+        input_ids = set()
+        for node in nodes:
+            input_ids.update(node["data"].get("inputs", []))
+
+        if not input_ids:
+            return {}
+
+        ftrack_ids = {}
+        for asset in io.find(
+            {"_id": {"$in": list(input_ids)}},
+            {"data.ftrackId": True}
+        ):
+            ftrack_ids[asset["_id"]] = asset["data"]["ftrackId"]
+
+        asset_builds_by_id = {
+            asset_build["id"]: asset_build
+            for asset_build in self.query_in_batches(
+                "select id, name from AssetBuild where id in ({})",
+                set(ftrack_ids.values())
+            )
+        }
+        return {
+            input_id: asset_builds_by_id[ftrack_id]
+            for input_id, ftrack_id in ftrack_ids.items()
+        }
+
+    def commit(self):
+        try:
+            self.session.commit()
+        except Exception:
+            tp, value, tb = sys.exc_info()
+            self.session.rollback()
+            six.reraise(tp, value, tb)
+
     def create_links(self, entity_data, entity):
         # Clear existing links.
         for link in entity.get("incoming_links", []):
@@ -1,10 +1,13 @@
 import os
-import re
 import json
 import copy
+import uuid
+import tempfile
+from fractions import Fraction
 
 import pype.api
 import pyblish
+from pype.profiles import get_profiles_matcher
 
 
 class ExtractBurnin(pype.api.Extractor):
@@ -123,7 +126,7 @@ class ExtractBurnin(pype.api.Extractor):
 
             # Filter output definition by representation tags (optional)
             repre_burnin_defs = self.filter_burnins_by_tags(
-                burnin_defs, repre["tags"]
+                profile, instance, repre["tags"]
             )
             if not repre_burnin_defs:
                 self.log.info((
@@ -146,6 +149,11 @@ class ExtractBurnin(pype.api.Extractor):
 
             first_output = True
 
+            # Representation is rendered later in fused filter graph
+            # - only burnin filters are prepared
+            fused_branch_id = repre.get("fusedBranchId")
+            fused_branches = []
+
             files_to_delete = []
             for filename_suffix, burnin_def in repre_burnin_defs.items():
                 new_repre = copy.deepcopy(repre)
@@ -190,6 +198,15 @@ class ExtractBurnin(pype.api.Extractor):
                 # Prepare paths and files for process.
                 self.input_output_paths(new_repre, temp_data, filename_suffix)
 
+                if fused_branch_id:
+                    self.prepare_fused_branch(
+                        instance, new_repre, temp_data,
+                        burnin_data, burnin_options, burnin_values
+                    )
+                    fused_branches.append(fused_branch_id)
+                    instance.data["representations"].append(new_repre)
+                    continue
+
                 # Data for burnin script
                 script_data = {
                     "input": temp_data["full_input_path"],
@@ -226,12 +243,107 @@ class ExtractBurnin(pype.api.Extractor):
             # NOTE we maybe can keep source representation if necessary
             instance.data["representations"].remove(repre)
 
+            # Source of fused representation is not rendered
+            if fused_branches:
+                self.remove_fused_branch(instance, fused_branch_id)
+                continue
+
             # Delete input files
             for filepath in files_to_delete:
                 if os.path.exists(filepath):
                     os.remove(filepath)
                     self.log.debug("Removed: \"{}\"".format(filepath))
 
+    def find_fused_branch(self, instance, branch_id):
+        """Find fused filter graph and it's branch by branch id.
+
+        Returns:
+            tuple: Graph and branch. Both are `None` if branch is not found.
+        """
+        for graph in instance.data.get("reviewFusedGraphs") or []:
+            for branch in graph["branches"]:
+                if branch["id"] == branch_id:
+                    return graph, branch
+        return None, None
+
+    def remove_fused_branch(self, instance, branch_id):
+        graph, branch = self.find_fused_branch(instance, branch_id)
+        if branch is not None:
+            graph["branches"].remove(branch)
+
+    def prepare_fused_branch(
+        self, instance, new_repre, temp_data,
+        burnin_data, burnin_options, burnin_values
+    ):
+        """Add branch with burnins of new representation to fused graph.
+
+        Burnin script only stores drawtext filters to temp json file which
+        are added to copy of source representation's branch. Output is
+        rendered by ExtractReviewFused.
+        """
+        graph, branch = self.find_fused_branch(
+            instance, new_repre["fusedBranchId"]
+        )
+        if branch is None:
+            raise KeyError((
+                "Fused branch of representation \"{}\" was not found."
+            ).format(new_repre["name"]))
+
+        fps = (
+            new_repre.get("fps")
+            or instance.data.get("fps")
+            or instance.context.data.get("fps")
+        )
+        frame_rate = Fraction(fps).limit_denominator(1001)
+        # Output is not rendered yet so it can't be probed
+        streams = [{
+            "codec_type": "video",
+            "width": new_repre["resolutionWidth"],
+            "height": new_repre["resolutionHeight"],
+            "r_frame_rate": "{}/{}".format(
+                frame_rate.numerator, frame_rate.denominator
+            )
+        }]
+
+        fd, filters_path = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+
+        script_data = {
+            "input": graph["source_path"],
+            "output": temp_data["full_output_path"],
+            "filters_output": filters_path,
+            "streams": streams,
+            "burnin_data": burnin_data,
+            "options": burnin_options,
+            "values": burnin_values
+        }
+        self.log.debug(
+            "script_data: {}".format(json.dumps(script_data, indent=4))
+        )
+
+        args = [
+            self.python_executable_path(),
+            self.burnin_script_path(),
+            json.dumps(script_data)
+        ]
+        self.log.debug("Executing: {}".format(args))
+        output = pype.api.subprocess(args)
+        self.log.debug("Output: {}".format(output))
+
+        try:
+            with open(filters_path, "r") as stream:
+                filters = json.load(stream)["filters"]
+        finally:
+            os.remove(filters_path)
+
+        new_branch = copy.deepcopy(branch)
+        new_branch["id"] = str(uuid.uuid4())
+        new_branch["video_filters"].extend(filters)
+        new_branch["output_path"] = temp_data["full_output_path"]
+        graph["branches"].append(new_branch)
+
+        new_repre["fusedBranchId"] = new_branch["id"]
+
     def prepare_basic_data(self, instance):
         """Pick data from instance for processing and for burnin strings.
 
@@ -334,41 +446,25 @@ class ExtractBurnin(pype.api.Extractor):
             return False
         return True
 
-    def filter_burnins_by_tags(self, burnin_defs, tags):
-        """Filter burnin definitions by entered representation tags.
+    def filter_burnins_by_tags(self, profile, instance, tags):
+        """Filter burnin definitions by families and representation tags.
 
         Burnin definitions without tags filter are marked as valid.
 
         Args:
-            outputs (list): Contain list of burnin definitions from presets.
+            profile (dict): Profile from presets matching current context.
+            instance (pyblish.api.Instance): Processed instance.
             tags (list): Tags of processed representation.
 
         Returns:
-            list: Containg all burnin definitions matching entered tags.
+            dict: Containg all burnin definitions matching entered tags.
         """
-        filtered_burnins = {}
-        repre_tags_low = [tag.lower() for tag in tags]
-        for filename_suffix, burnin_def in burnin_defs.items():
-            valid = True
-            output_filters = burnin_def.get("filter")
-            if output_filters:
-                # Check tag filters
-                tag_filters = output_filters.get("tags")
-                if tag_filters:
-                    tag_filters_low = [tag.lower() for tag in tag_filters]
-                    valid = False
-                    for tag in repre_tags_low:
-                        if tag in tag_filters_low:
-                            valid = True
-                            break
-
-                    if not valid:
-                        continue
-
-            if valid:
-                filtered_burnins[filename_suffix] = burnin_def
-
-        return filtered_burnins
+        matcher = get_profiles_matcher(self.profiles)
+        return matcher.filter_definitions(
+            profile, "burnins",
+            families=self.families_from_instance(instance),
+            tags=tags
+        )
 
     def input_output_paths(self, new_repre, temp_data, filename_suffix):
         """Prepare input and output paths for representation.
@@ -505,7 +601,6 @@ class ExtractBurnin(pype.api.Extractor):
         If key is not find or is empty than it's expected to match.
 
         Args:
-            profiles (list): Profiles definition from presets.
             host_name (str): Current running host name.
             task_name (str): Current context task name.
             family (str): Main family of current Instance.
@@ -514,113 +609,11 @@ class ExtractBurnin(pype.api.Extractor):
             dict/None: Return most matching profile or None if none of profiles
                 match at least one criteria.
         """
+        if not self.profiles:
+            return None
 
-        matching_profiles = None
-        highest_points = -1
-        for profile in self.profiles or tuple():
-            profile_points = 0
-            profile_value = []
-
-            # Host filtering
-            host_names = profile.get("hosts")
-            match = self.validate_value_by_regexes(host_name, host_names)
-            if match == -1:
-                continue
-            profile_points += match
-            profile_value.append(bool(match))
-
-            # Task filtering
-            task_names = profile.get("tasks")
-            match = self.validate_value_by_regexes(task_name, task_names)
-            if match == -1:
-                continue
-            profile_points += match
-            profile_value.append(bool(match))
-
-            # Family filtering
-            families = profile.get("families")
-            match = self.validate_value_by_regexes(family, families)
-            if match == -1:
-                continue
-            profile_points += match
-            profile_value.append(bool(match))
-
-            if profile_points > highest_points:
-                matching_profiles = []
-                highest_points = profile_points
-
-            if profile_points == highest_points:
-                profile["__value__"] = profile_value
-                matching_profiles.append(profile)
-
-        if not matching_profiles:
-            return
-
-        if len(matching_profiles) == 1:
-            return matching_profiles[0]
-
-        return self.profile_exclusion(matching_profiles)
-
-    def profile_exclusion(self, matching_profiles):
-        """Find out most matching profile by host, task and family match.
-
-        Profiles are selectivelly filtered. Each profile should have
-        "__value__" key with list of booleans. Each boolean represents
-        existence of filter for specific key (host, taks, family).
-        Profiles are looped in sequence. In each sequence are split into
-        true_list and false_list. For next sequence loop are used profiles in
-        true_list if there are any profiles else false_list is used.
-
-        Filtering ends when only one profile left in true_list. Or when all
-        existence booleans loops passed, in that case first profile from left
-        profiles is returned.
-
-        Args:
-            matching_profiles (list): Profiles with same values.
-
-        Returns:
-            dict: Most matching profile.
-        """
-        self.log.info(
-            "Search for first most matching profile in match order:"
-            " Host name -> Task name -> Family."
-        )
-        # Filter all profiles with highest points value. First filter profiles
-        # with matching host if there are any then filter profiles by task
-        # name if there are any and lastly filter by family. Else use first in
-        # list.
-        idx = 0
-        final_profile = None
-        while True:
-            profiles_true = []
-            profiles_false = []
-            for profile in matching_profiles:
-                value = profile["__value__"]
-                # Just use first profile when idx is greater than values.
-                if not idx < len(value):
-                    final_profile = profile
-                    break
-
-                if value[idx]:
-                    profiles_true.append(profile)
-                else:
-                    profiles_false.append(profile)
-
-            if final_profile is not None:
-                break
-
-            if profiles_true:
-                matching_profiles = profiles_true
-            else:
-                matching_profiles = profiles_false
-
-            if len(matching_profiles) == 1:
-                final_profile = matching_profiles[0]
-                break
-            idx += 1
-
-        final_profile.pop("__value__")
-        return final_profile
+        matcher = get_profiles_matcher(self.profiles)
+        return matcher.match(host_name, task_name, family)
 
     def filter_burnins_by_families(self, profile, instance):
         """Filter outputs that are not supported for instance families.
@@ -629,103 +622,16 @@ class ExtractBurnin(pype.api.Extractor):
 
         Args:
             profile (dict): Profile from presets matching current context.
-            families (list): All families of current instance.
+            instance (pyblish.api.Instance): Processed instance.
 
         Returns:
-            list: Containg all output definitions matching entered families.
+            dict: Containg all output definitions matching entered families.
         """
-        filtered_burnin_defs = {}
-
-        burnin_defs = profile.get("burnins")
-        if not burnin_defs:
-            return filtered_burnin_defs
-
-        # Prepare families
-        families = self.families_from_instance(instance)
-        families = [family.lower() for family in families]
-
-        for filename_suffix, burnin_def in burnin_defs.items():
-            burnin_filter = burnin_def.get("filter")
-            # When filters not set then skip filtering process
-            if burnin_filter:
-                families_filters = burnin_filter.get("families")
-                if not self.families_filter_validation(
-                    families, families_filters
-                ):
-                    continue
-
-            filtered_burnin_defs[filename_suffix] = burnin_def
-        return filtered_burnin_defs
-
-    def families_filter_validation(self, families, output_families_filter):
-        """Determines if entered families intersect with families filters.
-
-        All family values are lowered to avoid unexpected results.
-        """
-        if not output_families_filter:
-            return True
-
-        for family_filter in output_families_filter:
-            if not family_filter:
-                continue
-
-            if not isinstance(family_filter, (list, tuple)):
-                if family_filter.lower() not in families:
-                    continue
-                return True
-
-            valid = True
-            for family in family_filter:
-                if family.lower() not in families:
-                    valid = False
-                    break
-
-            if valid:
-                return True
-        return False
-
-    def compile_list_of_regexes(self, in_list):
-        """Convert strings in entered list to compiled regex objects."""
-        regexes = []
-        if not in_list:
-            return regexes
-
-        for item in in_list:
-            if not item:
-                continue
-
-            try:
-                regexes.append(re.compile(item))
-            except TypeError:
-                self.log.warning((
-                    "Invalid type \"{}\" value \"{}\"."
-                    " Expected string based object. Skipping."
-                ).format(str(type(item)), str(item)))
-
-        return regexes
-
-    def validate_value_by_regexes(self, value, in_list):
-        """Validates in any regexe from list match entered value.
-
-        Args:
-            in_list (list): List with regexes.
-            value (str): String where regexes is checked.
-
-        Returns:
-            int: Returns `0` when list is not set or is empty. Returns `1` when
-                any regex match value and returns `-1` when none of regexes
-                match value entered.
-        """
-        if not in_list:
-            return 0
-
-        output = -1
-        regexes = self.compile_list_of_regexes(in_list)
-        for regex in regexes:
-            if re.match(regex, value):
-                output = 1
-                break
-        return output
+        matcher = get_profiles_matcher(self.profiles)
+        return matcher.filter_definitions(
+            profile, "burnins",
+            families=self.families_from_instance(instance)
+        )
 
     def main_family_from_instance(self, instance):
         """Returns main family of entered instance."""
@@ -1,11 +1,13 @@
 import os
-import re
 import copy
 import json
+import uuid
+import collections
 import pyblish.api
 import clique
 import pype.api
 import pype.lib
+from pype.profiles import get_profiles_matcher
 
 
 class ExtractReview(pyblish.api.InstancePlugin):
@@ -35,6 +37,19 @@ class ExtractReview(pyblish.api.InstancePlugin):
     # Preset attributes
     profiles = None
 
+    # Maximum number of ffmpeg processes running at the same time
+    ffmpeg_max_jobs = 4
+    # Number of CPU threads used by all ffmpeg processes (CPU count if 0)
+    ffmpeg_thread_budget = 0
+
+    # Fused mode - outputs of representation are rendered with one ffmpeg
+    # filter graph (with burnins added by ExtractBurnin) so input is decoded
+    # only once. Rendering happens in ExtractReviewFused.
+    fused_mode = False
+    # Add thumbnail output to fused filter graph if instance does not have
+    # thumbnail representation yet.
+    fused_thumbnail = True
+
     # Legacy attributes
     outputs = {}
     ext_filter = []
@@ -105,6 +120,18 @@ class ExtractReview(pyblish.api.InstancePlugin):
             definition["filename_suffix"] = filename_suffix
             profile_outputs.append(definition)
 
+        # Prepare all ffmpeg jobs before they are processed
+        output_jobs = []
+        # Outputs rendered in fused filter graph
+        # - audio inputs are not supported in fused mode
+        use_fused_mode = bool(
+            self.fused_mode and not instance.data.get("audio")
+        )
+        fused_outputs = []
+
+        # Probe all inputs at once before outputs are processed
+        self.probe_review_inputs(instance)
+
         # Loop through representations
         for repre in tuple(instance.data["representations"]):
             tags = repre.get("tags") or []
@@ -124,7 +151,9 @@ class ExtractReview(pyblish.api.InstancePlugin):
                 continue
 
             # Filter output definition by representation tags (optional)
-            outputs = self.filter_outputs_by_tags(profile_outputs, tags)
+            outputs = self.filter_outputs_by_tags(
+                profile, instance_families, tags
+            )
             if not outputs:
                 self.log.info((
                     "Skipped representation. All output definitions from"
@@ -157,37 +186,203 @@ class ExtractReview(pyblish.api.InstancePlugin):
 
                 temp_data = self.prepare_temp_data(instance, repre, output_def)
 
+                if use_fused_mode:
+                    ffmpeg_parts = self._ffmpeg_argument_parts(
+                        output_def, instance, new_repre, temp_data
+                    )
+                    fused_outputs.append(
+                        (new_repre, output_def, temp_data, ffmpeg_parts)
+                    )
+                    continue
+
                 ffmpeg_args = self._ffmpeg_arguments(
                     output_def, instance, new_repre, temp_data
                 )
-                subprcs_cmd = " ".join(ffmpeg_args)
+                output_jobs.append(
+                    (new_repre, output_def, temp_data, ffmpeg_args)
+                )
 
-                # run subprocess
-                self.log.debug("Executing: {}".format(subprcs_cmd))
-                output = pype.api.subprocess(subprcs_cmd)
-                self.log.debug("Output: {}".format(output))
+        self.run_ffmpeg_jobs(output_jobs)
+        self.prepare_fused_graphs(instance, fused_outputs)
 
-                output_name = output_def["filename_suffix"]
-                if temp_data["without_handles"]:
-                    output_name += "_noHandles"
+        for new_repre, output_def, temp_data, _ in (
+            output_jobs + fused_outputs
+        ):
+            output_name = output_def["filename_suffix"]
+            if temp_data["without_handles"]:
+                output_name += "_noHandles"
+
+            new_repre.update({
+                "name": output_def["filename_suffix"],
+                "outputName": output_name,
+                "outputDef": output_def,
+                "frameStartFtrack": temp_data["output_frame_start"],
+                "frameEndFtrack": temp_data["output_frame_end"]
+            })
+
+            # Force to pop these key if are in new repre
+            new_repre.pop("preview", None)
+            new_repre.pop("thumbnail", None)
+
+            # adding representation
+            self.log.debug(
+                "Adding new representation: {}".format(new_repre)
+            )
+            instance.data["representations"].append(new_repre)
 
-                new_repre.update({
-                    "name": output_def["filename_suffix"],
-                    "outputName": output_name,
-                    "outputDef": output_def,
-                    "frameStartFtrack": temp_data["output_frame_start"],
-                    "frameEndFtrack": temp_data["output_frame_end"]
-                })
+    def probe_review_inputs(self, instance):
+        """Probe first file of review representations in parallel.
 
-                # Force to pop these key if are in new repre
-                new_repre.pop("preview", None)
-                new_repre.pop("thumbnail", None)
+        Results are stored in ffprobe cache (in memory and in staging dir)
+        so following processing and burnin script don't run ffprobe again.
+        """
+        paths_by_staging_dir = collections.defaultdict(list)
+        for repre in instance.data["representations"]:
+            tags = repre.get("tags") or []
+            if "review" not in tags or "thumbnail" in tags:
+                continue
 
-                # adding representation
-                self.log.debug(
-                    "Adding new representation: {}".format(new_repre)
+            filename = repre["files"]
+            if isinstance(filename, (tuple, list)):
+                filename = filename[0]
+            staging_dir = repre["stagingDir"]
+            paths_by_staging_dir[staging_dir].append(
+                os.path.join(staging_dir, filename)
+            )
+
+        for staging_dir, paths in paths_by_staging_dir.items():
+            try:
+                pype.lib.ffprobe_cache.probe_many(paths, staging_dir)
+            except Exception:
+                self.log.warning(
+                    "Probing of review inputs failed.", exc_info=True
+                )
+
+    def run_ffmpeg_jobs(self, output_jobs):
+        """Run prepared ffmpeg commands of output definitions concurrently.
+
+        Each output is independent on others so they can be processed at the
+        same time. Each ffmpeg process is limited to it's part of thread
+        budget.
+
+        Args:
+            output_jobs (list): Tuples with new representation, output
+                definition, temp data and ffmpeg arguments.
+        """
+        if not output_jobs:
+            return
+
+        scheduler = pype.lib.SubprocessScheduler(
+            max_jobs=self.ffmpeg_max_jobs,
+            thread_budget=self.ffmpeg_thread_budget or None,
+            log=self.log
+        )
+        threads = scheduler.threads_per_job(len(output_jobs))
+        for _, _, temp_data, ffmpeg_args in output_jobs:
+            # Limit threads only if ffmpeg processes run concurrently
+            if len(output_jobs) > 1 and not any(
+                arg.startswith("-threads") for arg in ffmpeg_args
+            ):
+                # Output path must stay last argument
+                ffmpeg_args.insert(-1, "-threads {}".format(threads))
+
+            scheduler.add_job(
+                " ".join(ffmpeg_args),
+                name=os.path.basename(temp_data["full_output_path"]),
+                threads=threads
+            )
+
+        jobs = scheduler.run()
+        for job in jobs:
+            self.log.debug("Output \"{}\": {}".format(job.name, job.output))
+            self.log.info(
+                "FFmpeg job \"{}\" finished in {:.2f}s (exit code {})".format(
+                    job.name, job.elapsed, job.returncode
                 )
-                instance.data["representations"].append(new_repre)
+            )
+
+    def prepare_fused_graphs(self, instance, fused_outputs):
+        """Prepare filter graphs of outputs which can share decoded input.
+
+        Outputs with same input arguments are branches of one graph. Graphs
+        are stored to instance data under "reviewFusedGraphs" key and each
+        new representation has id of it's branch under "fusedBranchId" key
+        so ExtractBurnin can add burnins to the branch. Graphs are rendered
+        by ExtractReviewFused.
+
+        Args:
+            instance (Instance): Currently processed instance.
+            fused_outputs (list): Tuples with new representation, output
+                definition, temp data and ffmpeg argument parts.
+        """
+        if not fused_outputs:
+            return
+
+        graphs_by_input = collections.OrderedDict()
+        for new_repre, _, temp_data, ffmpeg_parts in fused_outputs:
+            input_args, video_filters, _, output_args = ffmpeg_parts
+            key = tuple(input_args)
+            if key not in graphs_by_input:
+                graphs_by_input[key] = {
+                    "input_args": input_args,
+                    "source_path": temp_data["full_input_path_single_file"],
+                    "branches": []
+                }
+
+            branch_id = str(uuid.uuid4())
+            graphs_by_input[key]["branches"].append({
+                "id": branch_id,
+                "video_filters": video_filters,
+                # Last argument is output path
+                "output_args": [
+                    arg for arg in output_args[:-1] if arg != "-y"
+                ],
+                "output_path": temp_data["full_output_path"]
+            })
+            new_repre["fusedBranchId"] = branch_id
+
+        graphs = list(graphs_by_input.values())
+        if self.fused_thumbnail:
+            self.add_fused_thumbnail(instance, graphs[0])
+
+        self.log.debug("Prepared {} fused filter graph(s)".format(len(graphs)))
+        instance.data.setdefault("reviewFusedGraphs", []).extend(graphs)
+
+    def add_fused_thumbnail(self, instance, graph):
+        """Add thumbnail branch to fused graph and thumbnail representation.
+
+        Skipped if instance already has thumbnail representation.
+        """
+        for repre in instance.data["representations"]:
+            if (
+                repre["name"] == "thumbnail"
+                or "thumbnail" in (repre.get("tags") or [])
+            ):
+                return
+
+        staging_dir, source_filename = os.path.split(graph["source_path"])
+        jpeg_file = os.path.splitext(source_filename)[0]
+        if not jpeg_file.endswith("."):
+            jpeg_file += "."
+        jpeg_file += "jpg"
+
+        graph["branches"].append({
+            "id": str(uuid.uuid4()),
+            "video_filters": [],
+            "output_args": ["-frames:v 1"],
+            "output_path": os.path.join(staging_dir, jpeg_file)
+        })
+
+        representation = {
+            "name": "thumbnail",
+            "ext": "jpg",
+            "files": jpeg_file,
+            "stagingDir": staging_dir,
+            "thumbnail": True,
+            "tags": ["thumbnail"]
+        }
+        self.log.debug("Adding: {}".format(representation))
+        instance.data["representations"].append(representation)
 
     def input_is_sequence(self, repre):
         """Deduce from representation data if input is sequence."""
@@ -273,6 +468,21 @@ class ExtractReview(pyblish.api.InstancePlugin):
                 process.
             temp_data (dict): Base data for successfull process.
         """
+        return self.ffmpeg_full_args(*self._ffmpeg_argument_parts(
+            output_def, instance, new_repre, temp_data
+        ))
+
+    def _ffmpeg_argument_parts(
+        self, output_def, instance, new_repre, temp_data
+    ):
+        """Prepares ffmpeg arguments for expected extraction in parts.
+
+        Arguments are the same as in `_ffmpeg_arguments`.
+
+        Returns:
+            tuple: Input arguments, video filters, audio filters and output
+                arguments with output filepath.
+        """
 
         # Get FFmpeg arguments from profile presets
         out_def_ffmpeg_args = output_def.get("ffmpeg_args") or {}
@@ -359,7 +569,11 @@ class ExtractReview(pyblish.api.InstancePlugin):
             "\"{}\"".format(temp_data["full_output_path"])
         )
 
-        return self.ffmpeg_full_args(
+        ffmpeg_output_args = self.separate_output_filters(
+            ffmpeg_video_filters, ffmpeg_audio_filters, ffmpeg_output_args
+        )
+
+        return (
             ffmpeg_input_args,
             ffmpeg_video_filters,
             ffmpeg_audio_filters,
@@ -407,6 +621,36 @@ class ExtractReview(pyblish.api.InstancePlugin):
         Returns:
             list: Containing all arguments ready to run in subprocess.
         """
+        output_args = self.separate_output_filters(
+            video_filters, audio_filters, output_args
+        )
+
+        all_args = []
+        all_args.append(self.ffmpeg_path)
+        all_args.extend(input_args)
+        if video_filters:
+            all_args.append("-filter:v {}".format(",".join(video_filters)))
+
+        if audio_filters:
+            all_args.append("-filter:a {}".format(",".join(audio_filters)))
+
+        all_args.extend(output_args)
+
+        return all_args
+
+    def separate_output_filters(
+        self, video_filters, audio_filters, output_args
+    ):
+        """Move video and audio filters from output arguments to filters.
+
+        Args:
+            video_filters (list): Video filters where found filters are added.
+            audio_filters (list): Audio filters where found filters are added.
+            output_args (list): Output arguments.
+
+        Returns:
+            list: Output arguments without filters.
+        """
         output_args = self.split_ffmpeg_args(output_args)
 
         video_args_dentifiers = ["-vf", "-filter:v"]
@@ -424,18 +668,7 @@ class ExtractReview(pyblish.api.InstancePlugin):
                     arg = arg.replace(identifier, "").strip()
                     audio_filters.append(arg)
 
-        all_args = []
-        all_args.append(self.ffmpeg_path)
-        all_args.extend(input_args)
-        if video_filters:
-            all_args.append("-filter:v {}".format(",".join(video_filters)))
-
-        if audio_filters:
-            all_args.append("-filter:a {}".format(",".join(audio_filters)))
-
-        all_args.extend(output_args)
-
-        return all_args
+        return output_args
 
     def input_output_paths(self, new_repre, output_def, temp_data):
         """Deduce input nad output file paths based on entered data.
@@ -609,7 +842,10 @@ class ExtractReview(pyblish.api.InstancePlugin):
 
         # NOTE Skipped using instance's resolution
         full_input_path_single_file = temp_data["full_input_path_single_file"]
-        input_data = pype.lib.ffprobe_streams(full_input_path_single_file)[0]
+        staging_dir = temp_data["origin_repre"]["stagingDir"]
+        input_data = pype.lib.ffprobe_streams(
+            full_input_path_single_file, staging_dir
+        )[0]
         input_width = input_data["width"]
         input_height = input_data["height"]
 
@@ -788,110 +1024,6 @@ class ExtractReview(pyblish.api.InstancePlugin):
                 families.append(family)
         return families
 
-    def compile_list_of_regexes(self, in_list):
-        """Convert strings in entered list to compiled regex objects."""
-        regexes = []
-        if not in_list:
-            return regexes
-
-        for item in in_list:
-            if not item:
-                continue
-
-            try:
-                regexes.append(re.compile(item))
-            except TypeError:
-                self.log.warning((
-                    "Invalid type \"{}\" value \"{}\"."
-                    " Expected string based object. Skipping."
-                ).format(str(type(item)), str(item)))
-
-        return regexes
-
-    def validate_value_by_regexes(self, value, in_list):
-        """Validates in any regexe from list match entered value.
-
-        Args:
-            in_list (list): List with regexes.
-            value (str): String where regexes is checked.
-
-        Returns:
-            int: Returns `0` when list is not set or is empty. Returns `1` when
-                any regex match value and returns `-1` when none of regexes
-                match value entered.
-        """
-        if not in_list:
-            return 0
-
-        output = -1
-        regexes = self.compile_list_of_regexes(in_list)
-        for regex in regexes:
-            if re.match(regex, value):
-                output = 1
-                break
-        return output
-
-    def profile_exclusion(self, matching_profiles):
-        """Find out most matching profile byt host, task and family match.
-
-        Profiles are selectivelly filtered. Each profile should have
-        "__value__" key with list of booleans. Each boolean represents
-        existence of filter for specific key (host, taks, family).
-        Profiles are looped in sequence. In each sequence are split into
-        true_list and false_list. For next sequence loop are used profiles in
-        true_list if there are any profiles else false_list is used.
-
-        Filtering ends when only one profile left in true_list. Or when all
-        existence booleans loops passed, in that case first profile from left
-        profiles is returned.
-
-        Args:
-            matching_profiles (list): Profiles with same values.
-
-        Returns:
-            dict: Most matching profile.
-        """
-        self.log.info(
-            "Search for first most matching profile in match order:"
-            " Host name -> Task name -> Family."
-        )
-        # Filter all profiles with highest points value. First filter profiles
-        # with matching host if there are any then filter profiles by task
-        # name if there are any and lastly filter by family. Else use first in
-        # list.
-        idx = 0
-        final_profile = None
-        while True:
-            profiles_true = []
-            profiles_false = []
-            for profile in matching_profiles:
-                value = profile["__value__"]
-                # Just use first profile when idx is greater than values.
-                if not idx < len(value):
-                    final_profile = profile
-                    break
-
-                if value[idx]:
-                    profiles_true.append(profile)
-                else:
-                    profiles_false.append(profile)
-
-            if final_profile is not None:
-                break
-
-            if profiles_true:
-                matching_profiles = profiles_true
-            else:
-                matching_profiles = profiles_false
-
-            if len(matching_profiles) == 1:
-                final_profile = matching_profiles[0]
-                break
-            idx += 1
-
-        final_profile.pop("__value__")
-        return final_profile
-
     def find_matching_profile(self, host_name, task_name, family):
         """ Filter profiles by Host name, Task name and main Family.
 
@@ -899,7 +1031,6 @@ class ExtractReview(pyblish.api.InstancePlugin):
         If key is not find or is empty than it's expected to match.
 
         Args:
-            profiles (list): Profiles definition from presets.
             host_name (str): Current running host name.
             task_name (str): Current context task name.
             family (str): Main family of current Instance.
@@ -908,118 +1039,17 @@ class ExtractReview(pyblish.api.InstancePlugin):
             dict/None: Return most matching profile or None if none of profiles
                 match at least one criteria.
         """
-
-        matching_profiles = None
         if not self.profiles:
-            return matching_profiles
-
-        highest_profile_points = -1
-        # Each profile get 1 point for each matching filter. Profile with most
-        # points is returnd. For cases when more than one profile will match
-        # are also stored ordered lists of matching values.
-        for profile in self.profiles:
-            profile_points = 0
-            profile_value = []
-
-            # Host filtering
-            host_names = profile.get("hosts")
-            match = self.validate_value_by_regexes(host_name, host_names)
-            if match == -1:
-                self.log.debug(
-                    "\"{}\" not found in {}".format(host_name, host_names)
-                )
-                continue
-            profile_points += match
-            profile_value.append(bool(match))
+            return None
 
-            # Task filtering
-            task_names = profile.get("tasks")
-            match = self.validate_value_by_regexes(task_name, task_names)
-            if match == -1:
-                self.log.debug(
-                    "\"{}\" not found in {}".format(task_name, task_names)
-                )
-                continue
-            profile_points += match
-            profile_value.append(bool(match))
-
-            # Family filtering
-            families = profile.get("families")
-            match = self.validate_value_by_regexes(family, families)
-            if match == -1:
-                self.log.debug(
-                    "\"{}\" not found in {}".format(family, families)
-                )
-                continue
-            profile_points += match
-            profile_value.append(bool(match))
-
-            if profile_points < highest_profile_points:
-                continue
-
-            if profile_points > highest_profile_points:
-                matching_profiles = []
-                highest_profile_points = profile_points
-
-            if profile_points == highest_profile_points:
-                profile["__value__"] = profile_value
-                matching_profiles.append(profile)
-
-        if not matching_profiles:
+        matcher = get_profiles_matcher(self.profiles)
+        profile = matcher.match(host_name, task_name, family)
+        if profile is None:
             self.log.warning((
                 "None of profiles match your setup."
                 " Host \"{}\" | Task: \"{}\" | Family: \"{}\""
             ).format(host_name, task_name, family))
-            return
-
-        if len(matching_profiles) == 1:
-            # Pop temporary key `__value__`
-            matching_profiles[0].pop("__value__")
-            return matching_profiles[0]
-
-        self.log.warning((
-            "More than one profile match your setup."
-            " Host \"{}\" | Task: \"{}\" | Family: \"{}\""
-        ).format(host_name, task_name, family))
-
-        return self.profile_exclusion(matching_profiles)
-
-    def families_filter_validation(self, families, output_families_filter):
-        """Determines if entered families intersect with families filters.
-
-        All family values are lowered to avoid unexpected results.
-        """
-        if not output_families_filter:
-            return True
-
-        single_families = []
-        combination_families = []
-        for family_filter in output_families_filter:
-            if not family_filter:
-                continue
-            if isinstance(family_filter, (list, tuple)):
-                _family_filter = []
-                for family in family_filter:
-                    if family:
-                        _family_filter.append(family.lower())
-                combination_families.append(_family_filter)
-            else:
-                single_families.append(family_filter.lower())
-
-        for family in single_families:
-            if family in families:
-                return True
-
-        for family_combination in combination_families:
-            valid = True
-            for family in family_combination:
-                if family not in families:
-                    valid = False
-                    break
-
-            if valid:
-                return True
-        return False
+        return profile
 
     def filter_outputs_by_families(self, profile, families):
         """Return outputs matching input instance families.
@@ -1031,68 +1061,30 @@ class ExtractReview(pyblish.api.InstancePlugin):
             families (list): All families of current instance.
 
         Returns:
-            list: Containg all output definitions matching entered families.
+            dict: Containg all output definitions matching entered families.
         """
-        outputs = profile.get("outputs") or []
-        if not outputs:
-            return outputs
-
-        # lower values
-        # QUESTION is this valid operation?
-        families = [family.lower() for family in families]
-
-        filtered_outputs = {}
-        for filename_suffix, output_def in outputs.items():
-            output_filters = output_def.get("filter")
-            # If no filter on output preset, skip filtering and add output
-            # profile for farther processing
-            if not output_filters:
-                filtered_outputs[filename_suffix] = output_def
-                continue
-
-            families_filters = output_filters.get("families")
-            if not self.families_filter_validation(families, families_filters):
-                continue
-
-            filtered_outputs[filename_suffix] = output_def
-
-        return filtered_outputs
+        matcher = get_profiles_matcher(self.profiles)
+        return matcher.filter_definitions(
+            profile, "outputs", families=families
+        )
 
-    def filter_outputs_by_tags(self, outputs, tags):
-        """Filter output definitions by entered representation tags.
+    def filter_outputs_by_tags(self, profile, families, tags):
+        """Filter output definitions by families and representation tags.
 
         Output definitions without tags filter are marked as valid.
 
         Args:
-            outputs (list): Contain list of output definitions from presets.
+            profile (dict): Profile from presets matching current context.
+            families (list): All families of current instance.
             tags (list): Tags of processed representation.
 
         Returns:
             list: Containg all output definitions matching entered tags.
         """
-        filtered_outputs = []
-        repre_tags_low = [tag.lower() for tag in tags]
-        for output_def in outputs:
-            valid = True
-            output_filters = output_def.get("filter")
-            if output_filters:
-                # Check tag filters
-                tag_filters = output_filters.get("tags")
-                if tag_filters:
-                    tag_filters_low = [tag.lower() for tag in tag_filters]
-                    valid = False
-                    for tag in repre_tags_low:
-                        if tag in tag_filters_low:
-                            valid = True
-                            break
-
-                    if not valid:
-                        continue
-
-            if valid:
-                filtered_outputs.append(output_def)
-
-        return filtered_outputs
+        matcher = get_profiles_matcher(self.profiles)
+        return list(matcher.filter_definitions(
+            profile, "outputs", families=families, tags=tags
+        ).values())
 
     def legacy_process(self, instance):
         self.log.warning("Legacy review presets are used.")
@@ -0,0 +1,86 @@
+import os
+import pyblish.api
+import pype.lib
+
+
+class ExtractReviewFused(pyblish.api.InstancePlugin):
+    """Render review outputs prepared in fused mode of ExtractReview.
+
+    All outputs of one input (with burnins added by ExtractBurnin) are
+    branches of single ffmpeg filter graph. Input is decoded only once and
+    split to branches where each branch has it's own filters and encoder.
+    """
+
+    label = "Extract Review (Fused)"
+    order = pyblish.api.ExtractorOrder + 0.0305
+    families = ["review"]
+    hosts = ["nuke", "maya", "shell", "nukestudio", "premiere", "harmony"]
+
+    # FFmpeg tools paths
+    ffmpeg_path = pype.lib.get_ffmpeg_tool_path("ffmpeg")
+
+    # Maximum number of ffmpeg processes running at the same time
+    ffmpeg_max_jobs = 2
+
+    def process(self, instance):
+        graphs = instance.data.pop("reviewFusedGraphs", None)
+        if not graphs:
+            return
+
+        scheduler = pype.lib.SubprocessScheduler(
+            max_jobs=self.ffmpeg_max_jobs, log=self.log
+        )
+        for graph in graphs:
+            if not graph["branches"]:
+                continue
+
+            args = self.graph_ffmpeg_args(graph)
+            self.log.debug("Fused ffmpeg args: {}".format(args))
+            scheduler.add_job(
+                " ".join(args),
+                name=os.path.basename(graph["source_path"])
+            )
+
+        jobs = scheduler.run()
+        for job in jobs:
+            self.log.debug("Output \"{}\": {}".format(job.name, job.output))
+            self.log.info(
+                "Fused graph \"{}\" finished in {:.2f}s (exit code {})".format(
+                    job.name, job.elapsed, job.returncode
+                )
+            )
+
+    def graph_ffmpeg_args(self, graph):
+        """Prepare ffmpeg arguments rendering all branches of filter graph.
+
+        Args:
+            graph (dict): Fused graph with "input_args" and "branches".
+
+        Returns:
+            list: Ffmpeg arguments.
+        """
+        branches = graph["branches"]
+        split_labels = [
+            "[f{}]".format(idx) for idx in range(len(branches))
+        ]
+        filter_chains = [
+            "[0:v]split={}{}".format(len(branches), "".join(split_labels))
+        ]
+        output_args = []
+        for idx, branch in enumerate(branches):
+            out_label = "[out{}]".format(idx)
+            filter_chains.append("{}{}{}".format(
+                split_labels[idx],
+                ",".join(branch["video_filters"]) or "null",
+                out_label
+            ))
+
+            output_args.append("-map \"{}\"".format(out_label))
+            output_args.extend(branch["output_args"])
+            output_args.append("\"{}\"".format(branch["output_path"]))
+
+        args = [self.ffmpeg_path, "-y"]
+        args.extend(graph["input_args"])
+        args.append("-filter_complex \"{}\"".format(";".join(filter_chains)))
+        args.extend(output_args)
+        return args
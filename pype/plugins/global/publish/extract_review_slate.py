@@ -299,7 +299,9 @@ class ExtractReviewSlate(pype.api.Extractor):
 
         try:
             # Get information about input file via ffprobe tool
-            streams = pype.lib.ffprobe_streams(full_input_path)
+            streams = pype.lib.ffprobe_streams(
+                full_input_path, repre["stagingDir"]
+            )
         except Exception:
             self.log.warning(
                 "Could not get codec data from input.",
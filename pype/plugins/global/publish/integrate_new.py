@@ -1,22 +1,15 @@
 import os
-from os.path import getsize
 import logging
-import sys
 import copy
 import clique
 import errno
-import six
 
-from pymongo import DeleteOne, InsertOne
 import pyblish.api
 from avalon import api, io
 from avalon.vendor import filelink
-
-# this is needed until speedcopy for linux is fixed
-if sys.platform == "win32":
-    from speedcopy import copyfile
-else:
-    from shutil import copyfile
+from pype.file_transfer import TransferEngine
+from pype.lib import UnitOfWork
+from pype.source_hashes import register_source_hashes
 
 log = logging.getLogger(__name__)
 
@@ -92,20 +85,56 @@ class IntegrateAssetNew(pyblish.api.InstancePlugin):
     default_template_name = "publish"
     template_name_profiles = None
 
+    # File transfer settings
+    # - maximum number of parallel transfers
+    transfer_workers = 8
+    # - checksum stored to representation ("xxhash", "sha1" or None)
+    checksum_algorithm = "xxhash"
+    # - copy-on-write clone files when on same filesystem
+    transfer_reflink = True
+    # - hardlink files when on same filesystem (published files then share
+    #   content with source files!)
+    transfer_hardlink = False
+
     def process(self, instance):
 
         if [ef for ef in self.exclude_families
                 if instance.data["family"] in ef]:
             return
 
-        self.register(instance)
+        # Database writes of all instances are collected and written at once
+        # by `IntegrateAssetNewFlush` when all files were transferred
+        unit_of_work = self.unit_of_work(instance.context)
+        if unit_of_work.rolled_back:
+            raise AssertionError((
+                "Integration of other instance failed."
+                " Skipping \"{}\"."
+            ).format(instance))
+
+        try:
+            self.register(instance, unit_of_work)
 
-        self.log.info("Integrating Asset in to the database ...")
-        self.log.info("instance.data: {}".format(instance.data))
-        if instance.data.get('transfer', True):
-            self.integrate(instance)
+            self.log.info("Integrating Asset in to the database ...")
+            self.log.info("instance.data: {}".format(instance.data))
+            if instance.data.get('transfer', True):
+                self.integrate(instance, unit_of_work)
 
-    def register(self, instance):
+        except Exception:
+            self.log.error(
+                "Integration failed. Database changes are rolled back."
+            )
+            unit_of_work.rollback()
+            raise
+
+    def unit_of_work(self, context):
+        """Unit of work shared by all instances of the context."""
+        unit_of_work = context.data.get("integrateUnitOfWork")
+        if unit_of_work is None:
+            unit_of_work = UnitOfWork()
+            context.data["integrateUnitOfWork"] = unit_of_work
+        return unit_of_work
+
+    def register(self, instance, unit_of_work):
         # Required environment variables
         anatomy_data = instance.data["anatomyData"]
 
@@ -164,7 +193,7 @@ class IntegrateAssetNew(pyblish.api.InstancePlugin):
             )
         )
 
-        subset = self.get_subset(asset_entity, instance)
+        subset = self.get_subset(asset_entity, instance, unit_of_work)
         instance.data["subsetEntity"] = subset
 
         version_number = instance.data["version"]
@@ -188,65 +217,62 @@ class IntegrateAssetNew(pyblish.api.InstancePlugin):
 
         new_repre_names_low = [_repre["name"].lower() for _repre in repres]
 
-        existing_version = io.find_one({
+        # Version may be already created by other instance of the context
+        existing_version = unit_of_work.find_one({
             'type': 'version',
             'parent': subset["_id"],
             'name': version_number
         })
 
+        # Representations replaced by new representations
+        # - new representations reuse their ids
+        existing_repres = []
         if existing_version is None:
-            version_id = io.insert_one(version).inserted_id
+            version_id = unit_of_work.insert_one(version)
         else:
             # Check if instance have set `append` mode which cause that
-            # only replicated representations are set to archive
+            # only replicated representations are replaced
             append_repres = instance.data.get("append", False)
 
             # Update version data
-            # TODO query by _id and
-            io.update_many({
-                'type': 'version',
-                'parent': subset["_id"],
-                'name': version_number
-            }, {
-                '$set': version
-            })
-            version_id = existing_version['_id']
-
-            # Find representations of existing version and archive them
-            current_repres = list(io.find({
-                "type": "representation",
+            version_id = existing_version["_id"]
+            unit_of_work.update_one(
+                {"_id": version_id},
+                {"$set": version}
+            )
+            existing_version.update(version)
+            version = existing_version
+
+            # Find current and archived representations of existing version
+            # (including representations of other instances not written yet)
+            version_repres = list(io.find({
+                "type": {"$in": [
+                    "representation", "archived_representation"
+                ]},
                 "parent": version_id
             }))
-            bulk_writes = []
-            for repre in current_repres:
-                if append_repres:
-                    # archive only duplicated representations
-                    if repre["name"].lower() not in new_repre_names_low:
+            version_repres.extend(
+                unit_of_work.find_pending("representation", version_id)
+            )
+            repres_to_remove = []
+            for repre in version_repres:
+                if repre["type"] == "representation":
+                    # replace only duplicated representations
+                    if (
+                        append_repres
+                        and repre["name"].lower() not in new_repre_names_low
+                    ):
                         continue
-                # Representation must change type,
-                # `_id` must be stored to other key and replaced with new
-                # - that is because new representations should have same ID
-                repre_id = repre["_id"]
-                bulk_writes.append(DeleteOne({"_id": repre_id}))
-
-                repre["orig_id"] = repre_id
-                repre["_id"] = io.ObjectId()
-                repre["type"] = "archived_representation"
-                bulk_writes.append(InsertOne(repre))
-
-            # bulk updates
-            if bulk_writes:
-                io._database[io.Session["AVALON_PROJECT"]].bulk_write(
-                    bulk_writes
-                )
+                    repre["orig_id"] = repre["_id"]
 
-        version = io.find_one({"_id": version_id})
-        instance.data["versionEntity"] = version
+                existing_repres.append(repre)
+                repres_to_remove.append(repre["_id"])
 
-        existing_repres = list(io.find({
-            "parent": version_id,
-            "type": "archived_representation"
-        }))
+            # Remove old representations (before insertion of new)
+            if repres_to_remove:
+                unit_of_work.delete_many({"_id": {"$in": repres_to_remove}})
+
+        instance.data["versionEntity"] = version
 
         instance.data['version'] = version['name']
 
@@ -485,52 +511,100 @@ class IntegrateAssetNew(pyblish.api.InstancePlugin):
             }
             self.log.debug("__ representations: {}".format(representations))
 
-        # Remove old representations if there are any (before insertion of new)
-        if existing_repres:
-            repre_ids_to_remove = []
-            for repre in existing_repres:
-                repre_ids_to_remove.append(repre["_id"])
-            io.delete_many({"_id": {"$in": repre_ids_to_remove}})
-
         self.log.debug("__ representations: {}".format(representations))
         for rep in instance.data["representations"]:
             self.log.debug("__ represNAME: {}".format(rep['name']))
             self.log.debug("__ represPATH: {}".format(rep['published_path']))
-        io.insert_many(representations)
+        unit_of_work.insert_many(representations)
         instance.data["published_representations"] = (
             published_representations
         )
         # self.log.debug("Representation: {}".format(representations))
-        self.log.info("Registered {} items".format(len(representations)))
+        self.log.info("Prepared {} items for registration".format(
+            len(representations)
+        ))
 
-    def integrate(self, instance):
+    def integrate(self, instance, unit_of_work=None):
         """ Move the files.
 
             Through `instance.data["transfers"]`
 
+            Newly created files are registered to unit of work so they are
+            removed when integration of any instance fails. Overwritten
+            files are not restored.
+
             Args:
                 instance: the instance to integrate
+                unit_of_work (UnitOfWork): Unit of work of the context.
         """
+        engine = self.transfer_engine()
         transfers = instance.data.get("transfers", list())
-
         for src, dest in transfers:
             if os.path.normpath(src) != os.path.normpath(dest):
-                self.copy_file(src, dest)
+                engine.add(src, dest)
 
-        transfers = instance.data.get("transfers", list())
-        for src, dest in transfers:
-            self.copy_file(src, dest)
+        hardlinks = instance.data.get("hardlinks", list())
+        if unit_of_work is not None:
+            new_files = [transfer.dst for transfer in engine.transfers]
+            new_files.extend(os.path.normpath(dest) for _, dest in hardlinks)
+            for path in new_files:
+                if not os.path.exists(path):
+                    unit_of_work.add_file(path)
+
+        engine.process()
+        self.log.info("File transfers:\n{}".format(engine.report()))
+
+        self.store_checksums(instance, engine.transfers)
 
         # Produce hardlinked copies
         # Note: hardlink can only be produced between two files on the same
         # server/disk and editing one of the two will edit both files at once.
         # As such it is recommended to only make hardlinks between static files
         # to ensure publishes remain safe and non-edited.
-        hardlinks = instance.data.get("hardlinks", list())
         for src, dest in hardlinks:
             self.log.debug("Hardlinking file .. {} -> {}".format(src, dest))
             self.hardlink_file(src, dest)
 
+    def transfer_engine(self, workers=None):
+        """Create file transfer engine with settings of this plugin."""
+        return TransferEngine(
+            workers=workers or self.transfer_workers,
+            checksum=self.checksum_algorithm,
+            allow_reflink=self.transfer_reflink,
+            allow_hardlink=self.transfer_hardlink,
+            log=self.log
+        )
+
+    def store_checksums(self, instance, transfers):
+        """Store checksums of transferred files to representations.
+
+        Checksums are stored under `data.checksums` of representation
+        document mapped by published file name. Representation documents
+        are not written to database yet so only documents are modified.
+        """
+        checksum_by_dst = {
+            transfer.dst: transfer.checksum
+            for transfer in transfers
+            if transfer.checksum
+        }
+        if not checksum_by_dst:
+            return
+
+        published_representations = (
+            instance.data.get("published_representations") or {}
+        )
+        for repre_id, repre_info in published_representations.items():
+            checksums = {}
+            for path in repre_info["published_files"]:
+                checksum = checksum_by_dst.get(os.path.normpath(path))
+                if checksum:
+                    checksums[os.path.basename(path)] = checksum
+
+            if not checksums:
+                continue
+
+            repre_info["representation"]["data"]["checksums"] = checksums
+
     def copy_file(self, src, dst):
         """ Copy given source to destination
 
@@ -540,29 +614,9 @@ class IntegrateAssetNew(pyblish.api.InstancePlugin):
         Returns:
             None
         """
-        src = os.path.normpath(src)
-        dst = os.path.normpath(dst)
-        self.log.debug("Copying file .. {} -> {}".format(src, dst))
-        dirname = os.path.dirname(dst)
-        try:
-            os.makedirs(dirname)
-        except OSError as e:
-            if e.errno == errno.EEXIST:
-                pass
-            else:
-                self.log.critical("An unexpected error occurred.")
-                raise
-
-        # copy file with speedcopy and check if size of files are simetrical
-        while True:
-            try:
-                copyfile(src, dst)
-            except OSError as e:
-                self.log.critical("Cannot copy {} to {}".format(src, dst))
-                self.log.critical(e)
-                six.reraise(*sys.exc_info())
-            if str(getsize(src)) in str(getsize(dst)):
-                break
+        engine = self.transfer_engine(workers=1)
+        engine.add(src, dst)
+        engine.process()
 
     def hardlink_file(self, src, dst):
         dirname = os.path.dirname(dst)
@@ -578,21 +632,24 @@ class IntegrateAssetNew(pyblish.api.InstancePlugin):
 
         filelink.create(src, dst, filelink.HARDLINK)
 
-    def get_subset(self, asset, instance):
+    def get_subset(self, asset, instance, unit_of_work):
         subset_name = instance.data["subset"]
-        subset = io.find_one({
+        # Subset may be already created by other instance of the context
+        subset = unit_of_work.find_one({
             "type": "subset",
             "parent": asset["_id"],
             "name": subset_name
         })
 
+        subset_group = instance.data.get("subsetGroup")
         if subset is None:
             self.log.info("Subset '%s' not found, creating.." % subset_name)
             self.log.debug("families.  %s" % instance.data.get('families'))
             self.log.debug(
                 "families.  %s" % type(instance.data.get('families')))
 
-            _id = io.insert_one({
+            subset = {
+                "_id": io.ObjectId(),
                 "schema": "pype:subset-3.0",
                 "type": "subset",
                 "name": subset_name,
@@ -600,17 +657,18 @@ class IntegrateAssetNew(pyblish.api.InstancePlugin):
                     "families": instance.data.get('families')
                 },
                 "parent": asset["_id"]
-            }).inserted_id
+            }
+            if subset_group:
+                subset["data"]["subsetGroup"] = subset_group
 
-            subset = io.find_one({"_id": _id})
+            unit_of_work.insert_one(subset)
 
         # add group if available
-        if instance.data.get("subsetGroup"):
-            io.update_many({
-                'type': 'subset',
-                '_id': io.ObjectId(subset["_id"])
-            }, {'$set': {'data.subsetGroup':
-                instance.data.get('subsetGroup')}}
+        elif subset_group:
+            subset["data"]["subsetGroup"] = subset_group
+            unit_of_work.update_one(
+                {"_id": subset["_id"]},
+                {"$set": {"data.subsetGroup": subset_group}}
             )
 
         return subset
@@ -765,3 +823,65 @@ class IntegrateAssetNew(pyblish.api.InstancePlugin):
             ).format(family, task_name, template_name))
 
         return template_name
+
+
+class IntegrateAssetNewFlush(pyblish.api.ContextPlugin):
+    """Write database changes collected by `IntegrateAssetNew`.
+
+    All subsets, versions and representations of the context are written
+    with one ordered bulk write after all files were transferred. Nothing
+    is written when integration of any instance failed.
+    """
+
+    label = "Integrate Asset New (Database)"
+    # Must happen after IntegrateAssetNew and before plugins using
+    # integrated documents from database
+    order = pyblish.api.IntegratorOrder + 0.005
+
+    def process(self, context):
+        unit_of_work = context.data.get("integrateUnitOfWork")
+        if unit_of_work is None:
+            self.log.debug("There are no database changes to write.")
+            return
+
+        if unit_of_work.rolled_back:
+            raise AssertionError(
+                "Integration failed. Database changes were rolled back."
+            )
+
+        io.install()
+        operations_count = len(unit_of_work)
+        try:
+            unit_of_work.flush()
+        except Exception:
+            # Remove published files of not registered versions. Ordered
+            # bulk write stops on first error so operations before it stay.
+            unit_of_work.rollback()
+            raise
+        self.log.info(
+            "Written {} database operations.".format(operations_count)
+        )
+
+        self.register_source_hashes(context)
+
+    def register_source_hashes(self, context):
+        """Store source hashes of published versions to registry.
+
+        Hashes are also stored in version data so registry can be filled
+        again with `backfill_source_hashes` when this fails.
+        """
+        for instance in context:
+            source_hashes = instance.data.get("sourceHashes")
+            version = instance.data.get("versionEntity")
+            if not source_hashes or not version:
+                continue
+
+            try:
+                register_source_hashes(source_hashes, version["_id"])
+            except Exception:
+                self.log.warning(
+                    "Source hashes of \"{}\" were not registered.".format(
+                        instance
+                    ),
+                    exc_info=True
+                )
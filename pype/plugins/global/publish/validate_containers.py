@@ -24,5 +24,16 @@ class ValidateContainers(pyblish.api.ContextPlugin):
     actions = [ShowInventory]
 
     def process(self, context):
-        if pype.lib.any_outdated():
-            raise ValueError("There are outdated containers in the scene.")
+        containers_status = pype.lib.get_containers_status()
+        if not pype.lib.any_outdated(containers_status):
+            return
+
+        outdated = sorted(
+            object_name
+            for object_name, status in containers_status.items()
+            if status["valid"] and not status["latest"]
+        )
+        self.log.warning("Outdated containers: {}".format(
+            ", ".join(outdated)
+        ))
+        raise ValueError("There are outdated containers in the scene.")
@@ -1,97 +1,37 @@
 import os
-import sys
 import json
 import copy
 import tempfile
 import contextlib
-import subprocess
 from collections import OrderedDict
 
 from maya import cmds
 
 import pyblish.api
 import avalon.maya
-from avalon import io, api
+from avalon import api
 
 import pype.api
 import pype.maya.lib as lib
+from pype.source_hashes import find_paths_by_hashes
+from pype.texture_conversion import (
+    source_hash,
+    can_hardlink,
+    TextureConverter,
+    TextureConversion
+)
 
 # Modes for transfer
 COPY = 1
 HARDLINK = 2
 
 
-def source_hash(filepath, *args):
-    """Generate simple identifier for a source file.
-    This is used to identify whether a source file has previously been
-    processe into the pipeline, e.g. a texture.
-    The hash is based on source filepath, modification time and file size.
-    This is only used to identify whether a specific source file was already
-    published before from the same location with the same modification date.
-    We opt to do it this way as opposed to Avalanch C4 hash as this is much
-    faster and predictable enough for all our production use cases.
-    Args:
-        filepath (str): The source file path.
-    You can specify additional arguments in the function
-    to allow for specific 'processing' values to be included.
-    """
-    # We replace dots with comma because . cannot be a key in a pymongo dict.
-    file_name = os.path.basename(filepath)
-    time = str(os.path.getmtime(filepath))
-    size = str(os.path.getsize(filepath))
-    return "|".join([file_name, time, size] + list(args)).replace(".", ",")
-
-
 def find_paths_by_hash(texture_hash):
-    # Find the texture hash key in the dictionary and all paths that
-    # originate from it.
-    key = "data.sourceHashes.{0}".format(texture_hash)
-    return io.distinct(key, {"type": "version"})
-
-
-def maketx(source, destination, *args):
-    """Make .tx using maketx with some default settings.
-    The settings are based on default as used in Arnold's
-    txManager in the scene.
-    This function requires the `maketx` executable to be
-    on the `PATH`.
-    Args:
-        source (str): Path to source file.
-        destination (str): Writing destination path.
-    """
-
-    cmd = [
-        "maketx",
-        "-v",  # verbose
-        "-u",  # update mode
-        # unpremultiply before conversion (recommended when alpha present)
-        "--unpremult",
-        "--checknan",
-        # use oiio-optimized settings for tile-size, planarconfig, metadata
-        "--oiio",
-        "--filter lanczos3",
-    ]
-
-    cmd.extend(args)
-    cmd.extend(["-o", destination, source])
-
-    cmd = " ".join(cmd)
-
-    CREATE_NO_WINDOW = 0x08000000
-    kwargs = dict(args=cmd, stderr=subprocess.STDOUT)
+    """Find all published paths that originate from the texture hash.
 
-    if sys.platform == "win32":
-        kwargs["creationflags"] = CREATE_NO_WINDOW
-    try:
-        out = subprocess.check_output(**kwargs)
-    except subprocess.CalledProcessError as exc:
-        print(exc)
-        import traceback
-
-        traceback.print_exc()
-        raise
-
-    return out
+    Use `find_paths_by_hashes` to resolve multiple hashes at once.
+    """
+    return find_paths_by_hashes([texture_hash]).get(texture_hash) or []
 
 
 @contextlib.contextmanager
@@ -140,6 +80,9 @@ class ExtractLook(pype.api.Extractor):
     families = ["look"]
     order = pyblish.api.ExtractorOrder + 0.2
 
+    # Maximum number of concurrent maketx processes (count of CPUs if not set)
+    maketx_max_jobs = None
+
     def process(self, instance):
 
         # Define extract output file path
@@ -188,6 +131,22 @@ class ExtractLook(pype.api.Extractor):
         hashes = dict()
         forceCopy = instance.data.get("forceCopy", False)
 
+        # Find already published textures of all files with single query
+        texture_hashes = {
+            filepath: self._texture_hash(filepath, do_maketx)
+            for filepath in files_metadata
+        }
+        existing_paths = {}
+        if not forceCopy:
+            existing_paths = find_paths_by_hashes(texture_hashes.values())
+
+        # Conversions to .tx are processed concurrently after all textures
+        # were processed
+        converter = TextureConverter(
+            max_jobs=self.maketx_max_jobs, log=self.log
+        )
+        processed = []
+
         self.log.info(files)
         for filepath in files_metadata:
 
@@ -198,16 +157,35 @@ class ExtractLook(pype.api.Extractor):
                 # set its file node to 'raw' as tx will be linearized
                 files_metadata[filepath]["color_space"] = "raw"
 
-            source, mode, hash = self._process_texture(
+            texture_hash = texture_hashes[filepath]
+            processed.append(self._process_texture(
                 filepath,
                 do_maketx,
                 staging=dir_path,
                 linearise=linearise,
-                force=forceCopy
-            )
-            destination = self.resource_destination(instance,
-                                                    source,
-                                                    do_maketx)
+                force=forceCopy,
+                texture_hash=texture_hash,
+                existing=existing_paths.get(texture_hash, []),
+                converter=converter
+            ))
+
+        converter.process()
+
+        for source, mode, hash in processed:
+            if isinstance(source, TextureConversion):
+                conversion = source
+                source = conversion.output
+                # Name of file in .tx cache is not based on source name
+                destination = self.resource_destination(
+                    instance, conversion.source, do_maketx
+                )
+                # Files in .tx cache are never modified so can be hardlinked
+                if conversion.cached and can_hardlink(source, destination):
+                    mode = HARDLINK
+            else:
+                destination = self.resource_destination(instance,
+                                                        source,
+                                                        do_maketx)
 
             # Force copy is specified.
             if forceCopy:
@@ -346,7 +324,16 @@ class ExtractLook(pype.api.Extractor):
             resources_dir, basename + ext
         )
 
-    def _process_texture(self, filepath, do_maketx, staging, linearise, force):
+    def _texture_hash(self, filepath, do_maketx):
+        args = []
+        if do_maketx:
+            args.append("maketx")
+        return source_hash(filepath, *args)
+
+    def _process_texture(
+        self, filepath, do_maketx, staging, linearise, force,
+        texture_hash=None, existing=None, converter=None
+    ):
         """Process a single texture file on disk for publishing.
         This will:
             1. Check whether it's already published, if so it will do hardlink
@@ -355,23 +342,30 @@ class ExtractLook(pype.api.Extractor):
         Args:
             filepath (str): The source file path to process.
             do_maketx (bool): Whether to produce a .tx file
+            texture_hash (str): Source hash of file (calculated if not set).
+            existing (list): Published paths of the texture hash. Queried
+                from database if not set.
+            converter (TextureConverter): Converter where conversion to .tx
+                is added. Returned source is `TextureConversion` which
+                output is available after converter is processed. Texture is
+                converted immediately if not set.
         Returns:
         """
 
         fname, ext = os.path.splitext(os.path.basename(filepath))
 
-        args = []
-        if do_maketx:
-            args.append("maketx")
-        texture_hash = source_hash(filepath, *args)
+        if texture_hash is None:
+            texture_hash = self._texture_hash(filepath, do_maketx)
 
         # If source has been published before with the same settings,
         # then don't reprocess but hardlink from the original
-        existing = find_paths_by_hash(texture_hash)
+        if existing is None and not force:
+            existing = find_paths_by_hash(texture_hash)
+
         if existing and not force:
             self.log.info("Found hash in database, preparing hardlink..")
             source = next((p for p in existing if os.path.exists(p)), None)
-            if filepath:
+            if source:
                 return source, HARDLINK, texture_hash
             else:
                 self.log.warning(
@@ -380,30 +374,27 @@ class ExtractLook(pype.api.Extractor):
                 )
 
         if do_maketx and ext != ".tx":
-            # Produce .tx file in staging if source file is not .tx
+            # Produce .tx file in staging (or .tx cache) if source file is
+            # not .tx, file is converted with all other textures
             converted = os.path.join(staging, "resources", fname + ".tx")
 
+            # Include `source-hash` as string metadata
+            args = ["-sattrib", "sourceHash", texture_hash]
             if linearise:
                 self.log.info("tx: converting sRGB -> linear")
-                colorconvert = "--colorconvert sRGB linear"
-            else:
-                colorconvert = ""
-
-            # Ensure folder exists
-            if not os.path.exists(os.path.dirname(converted)):
-                os.makedirs(os.path.dirname(converted))
+                args.extend(["--colorconvert", "sRGB", "linear"])
+
+            if converter is None:
+                # Convert directly to staging, name of file in .tx cache
+                # is not based on source name
+                converter = TextureConverter(cache_dir="", log=self.log)
+                conversion = converter.add(
+                    filepath, converted, texture_hash, args
+                )
+                converter.process()
+                return conversion.output, COPY, texture_hash
 
-            self.log.info("Generating .tx file for %s .." % filepath)
-            maketx(
-                filepath,
-                converted,
-                # Include `source-hash` as string metadata
-                "-sattrib",
-                "sourceHash",
-                texture_hash,
-                colorconvert,
-            )
-
-            return converted, COPY, texture_hash
+            conversion = converter.add(filepath, converted, texture_hash, args)
+            return conversion, COPY, texture_hash
 
         return filepath, COPY, texture_hash
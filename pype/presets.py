@@ -0,0 +1,209 @@
+"""Presets loaded once per process.
+
+`pypeapp.config.get_presets` reads and merges all preset json files on each
+call. `get_presets` of this module keeps loaded presets in memory and loads
+them again only when any preset file was modified, added or removed. Files
+are checked at most once per `PresetsService.check_interval` seconds.
+
+Returned presets are read-only so they can be shared by all callers without
+copying. Use `copy.deepcopy` (or `thaw`) to get modifiable copy.
+"""
+import os
+import time
+import threading
+import logging
+
+from pypeapp import config
+
+log = logging.getLogger(__name__)
+
+
+def _read_only(self, *args, **kwargs):
+    raise TypeError(
+        "Presets are read-only. Use `copy.deepcopy` to get modifiable copy."
+    )
+
+
+class ReadOnlyDict(dict):
+    """Dictionary which can't be modified."""
+
+    __setitem__ = _read_only
+    __delitem__ = _read_only
+    clear = _read_only
+    pop = _read_only
+    popitem = _read_only
+    setdefault = _read_only
+    update = _read_only
+
+    def copy(self):
+        return dict(self)
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+    def __reduce__(self):
+        return (dict, (thaw(self), ))
+
+
+class ReadOnlyList(list):
+    """List which can't be modified."""
+
+    __setitem__ = _read_only
+    __delitem__ = _read_only
+    __iadd__ = _read_only
+    __imul__ = _read_only
+    append = _read_only
+    extend = _read_only
+    insert = _read_only
+    pop = _read_only
+    remove = _read_only
+    reverse = _read_only
+    sort = _read_only
+
+    def __copy__(self):
+        return list(self)
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+    def __reduce__(self):
+        return (list, (thaw(self), ))
+
+
+def freeze(value):
+    """Convert dictionaries and lists in value to read-only variants."""
+    if isinstance(value, dict):
+        return ReadOnlyDict(
+            (key, freeze(item)) for key, item in value.items()
+        )
+
+    if isinstance(value, (list, tuple)):
+        return ReadOnlyList(freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    """Convert read-only dictionaries and lists in value to modifiable."""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+
+    if isinstance(value, list):
+        return [thaw(item) for item in value]
+    return value
+
+
+class PresetsService(object):
+    """Cache of presets per project invalidated by modification of files.
+
+    Args:
+        loader (callable): Function loading presets, accepts `project`
+            keyword argument. `pypeapp.config.get_presets` is used by default.
+    """
+
+    # Minimum time in seconds between checks of preset files
+    check_interval = 2.0
+
+    def __init__(self, loader=None):
+        self.loader = loader or config.get_presets
+        self.hits = 0
+        self.reloads = 0
+
+        self._lock = threading.Lock()
+        # Project name -> (signature, last check time, presets)
+        self._cache = {}
+
+    def get_presets(self, project=None):
+        """Read-only presets of project.
+
+        Project from `AVALON_PROJECT` environment is used if not entered (as
+        `pypeapp.config.get_presets` does), global presets are returned when
+        it is not set either.
+        """
+        project = project or os.environ.get("AVALON_PROJECT") or None
+        now = time.time()
+        with self._lock:
+            cached = self._cache.get(project)
+            if cached is not None:
+                signature, checked, presets = cached
+                if now - checked < self.check_interval:
+                    self.hits += 1
+                    return presets
+
+                new_signature = self.files_signature(project)
+                if new_signature == signature:
+                    self._cache[project] = (signature, now, presets)
+                    self.hits += 1
+                    return presets
+                log.debug("Preset files changed, reloading presets.")
+
+            signature = self.files_signature(project)
+            presets = freeze(self.loader(project=project))
+            self._cache[project] = (signature, now, presets)
+            self.reloads += 1
+            return presets
+
+    def invalidate(self, project=None):
+        """Force reload of presets on next request.
+
+        Args:
+            project (str): Invalidate only presets of project. All cached
+                presets are invalidated if not entered.
+        """
+        with self._lock:
+            if project is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(project, None)
+
+    def stats(self):
+        """Counters of cache hits and reloads."""
+        return {
+            "hits": self.hits,
+            "reloads": self.reloads,
+            "projects": len(self._cache)
+        }
+
+    def preset_roots(self, project=None):
+        """Directories with preset files."""
+        roots = []
+        pype_config = os.environ.get("PYPE_CONFIG")
+        if pype_config:
+            roots.append(os.path.join(pype_config, "presets"))
+
+        project_configs = os.environ.get("PYPE_PROJECT_CONFIGS")
+        if project and project_configs:
+            roots.append(os.path.join(project_configs, project))
+        return roots
+
+    def files_signature(self, project=None):
+        """Modification times of all preset files and their directories."""
+        signature = []
+        for root in self.preset_roots(project):
+            for dirpath, dirnames, filenames in os.walk(root):
+                dirnames.sort()
+                try:
+                    signature.append((dirpath, os.stat(dirpath).st_mtime))
+                except OSError:
+                    continue
+
+                for filename in sorted(filenames):
+                    if not filename.endswith(".json"):
+                        continue
+                    path = os.path.join(dirpath, filename)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    signature.append((path, stat.st_mtime, stat.st_size))
+        return tuple(signature)
+
+
+presets_service = PresetsService()
+
+
+def get_presets(project=None):
+    """Read-only presets loaded by shared `PresetsService`."""
+    return presets_service.get_presets(project=project)
@@ -0,0 +1,309 @@
+"""Matching of preset profiles filtered by host, task and family.
+
+Profiles are used by publish plugins (e.g. ExtractReview, ExtractBurnin)
+to define output definitions for specific context. Each profile may have
+"hosts", "tasks" and "families" filters with regexes. Profile with most
+matching filters is used, when more profiles have same count of matching
+filters then they're compared by matching host, then task and then family.
+
+`ProfilesMatcher` compiles regexes of all profiles once. Match results of
+each filter value (e.g. host name) against all profiles are stored so each
+distinct value is validated only once and result of whole lookup is
+cached per (host, task, family). Filtering of profile's output definitions
+by families and tags is cached too.
+
+Cost of lookups on studio sized profiles can be measured with
+`pype/scripts/benchmark_profiles.py`.
+"""
+import re
+import logging
+import collections
+
+log = logging.getLogger(__name__)
+
+# Keys of profile filters in order of their priority
+PROFILE_FILTER_KEYS = ("hosts", "tasks", "families")
+
+# Maximum number of cached matchers in `get_profiles_matcher`
+MAX_CACHED_MATCHERS = 32
+
+
+def compile_list_of_regexes(in_list):
+    """Convert strings in entered list to compiled regex objects."""
+    regexes = []
+    if not in_list:
+        return regexes
+
+    for item in in_list:
+        if not item:
+            continue
+
+        try:
+            regexes.append(re.compile(item))
+        except TypeError:
+            log.warning((
+                "Invalid type \"{}\" value \"{}\"."
+                " Expected string based object. Skipping."
+            ).format(str(type(item)), str(item)))
+
+    return regexes
+
+
+def validate_value_by_regexes(value, regexes):
+    """Validates if any of compiled regexes match entered value.
+
+    Args:
+        value (str): String where regexes is checked.
+        regexes (list): Compiled regexes or `None` when filter is not set.
+
+    Returns:
+        int: Returns `0` when filter is not set. Returns `1` when any regex
+            match value and returns `-1` when none of regexes match value.
+    """
+    if regexes is None:
+        return 0
+
+    if value is None:
+        value = ""
+
+    for regex in regexes:
+        if regex.match(value):
+            return 1
+    return -1
+
+
+class _DefinitionFilter(object):
+    """Prepared "filter" of output definition."""
+
+    def __init__(self, definition):
+        filters = definition.get("filter") or {}
+
+        self.single_families = set()
+        self.combination_families = []
+        for family_filter in filters.get("families") or []:
+            if not family_filter:
+                continue
+
+            if isinstance(family_filter, (list, tuple)):
+                self.combination_families.append(set(
+                    family.lower() for family in family_filter if family
+                ))
+            else:
+                self.single_families.add(family_filter.lower())
+
+        self.has_families = bool(
+            self.single_families or self.combination_families
+        )
+        self.tags = set(tag.lower() for tag in filters.get("tags") or [])
+
+    def families_valid(self, families):
+        """Entered families (lowered set) intersect with families filters."""
+        if not self.has_families:
+            return True
+
+        if self.single_families & families:
+            return True
+
+        for family_combination in self.combination_families:
+            if family_combination.issubset(families):
+                return True
+        return False
+
+    def tags_valid(self, tags):
+        """Entered tags (lowered set) intersect with tags filters."""
+        if not self.tags:
+            return True
+        return bool(self.tags & tags)
+
+
+class ProfilesMatcher(object):
+    """Find most matching profile for host, task and family.
+
+    Profiles are not modified by matching.
+
+    Args:
+        profiles (list): Profiles definition from presets. `None` is
+            handled as empty list.
+    """
+
+    def __init__(self, profiles):
+        # Stored as entered so `get_profiles_matcher` can compare identity
+        self.profiles = profiles
+
+        # Compiled regexes of each filter key per profile (`None` when
+        # filter is not set)
+        self._regexes = []
+        for profile in profiles or []:
+            regexes = []
+            for key in PROFILE_FILTER_KEYS:
+                values = profile.get(key)
+                if values:
+                    regexes.append(compile_list_of_regexes(values))
+                else:
+                    regexes.append(None)
+            self._regexes.append(regexes)
+
+        # Match results of all profiles for single value of each filter key
+        self._value_matches = [{} for _ in PROFILE_FILTER_KEYS]
+        self._profile_indexes = {}
+        self._definition_filters = {}
+        self._definitions_cache = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def _matches_for_value(self, key_idx, value):
+        matches = self._value_matches[key_idx].get(value)
+        if matches is None:
+            matches = tuple(
+                validate_value_by_regexes(value, regexes[key_idx])
+                for regexes in self._regexes
+            )
+            self._value_matches[key_idx][value] = matches
+        return matches
+
+    def match_index(self, host_name, task_name, family):
+        """Index of most matching profile or `None` if none match."""
+        key = (host_name, task_name, family)
+        if key in self._profile_indexes:
+            self.hits += 1
+            return self._profile_indexes[key]
+
+        self.misses += 1
+        values = (host_name, task_name, family)
+        all_matches = [
+            self._matches_for_value(key_idx, value)
+            for key_idx, value in enumerate(values)
+        ]
+
+        best_idx = None
+        best_sort_key = None
+        best_count = 0
+        for profile_idx in range(len(self._regexes)):
+            profile_matches = [matches[profile_idx] for matches in all_matches]
+            if -1 in profile_matches:
+                continue
+
+            # Most matching filters first, then compared by matching host,
+            # task and family. First profile is used if all are same.
+            sort_key = (
+                -sum(profile_matches),
+                tuple(-match for match in profile_matches)
+            )
+            if best_sort_key is None or sort_key[0] < best_sort_key[0]:
+                best_count = 1
+            elif sort_key[0] == best_sort_key[0]:
+                best_count += 1
+
+            if best_sort_key is None or sort_key < best_sort_key:
+                best_idx = profile_idx
+                best_sort_key = sort_key
+
+        if best_count > 1:
+            log.warning((
+                "More than one profile match your setup."
+                " Host \"{}\" | Task: \"{}\" | Family: \"{}\""
+            ).format(host_name, task_name, family))
+
+        self._profile_indexes[key] = best_idx
+        return best_idx
+
+    def match(self, host_name, task_name, family):
+        """Return most matching profile or `None` if none match.
+
+        Filtering keys are "hosts" (list), "tasks" (list), "families" (list).
+        If key is not find or is empty than it's expected to match.
+
+        Args:
+            host_name (str): Current running host name.
+            task_name (str): Current context task name.
+            family (str): Main family of current Instance.
+
+        Returns:
+            dict/None: Most matching profile.
+        """
+        profile_idx = self.match_index(host_name, task_name, family)
+        if profile_idx is None:
+            return None
+        return self.profiles[profile_idx]
+
+    def filter_definitions(
+        self, profile, key, families=None, tags=None
+    ):
+        """Filter output definitions of profile by families and tags.
+
+        Definitions without families or tags filter are marked as valid.
+
+        Args:
+            profile (dict): Profile returned by `match`.
+            key (str): Key of definitions in profile (e.g. "outputs").
+            families (list): Families of instance. Filtering by families is
+                skipped when not entered.
+            tags (list): Tags of representation. Filtering by tags is skipped
+                when not entered.
+
+        Returns:
+            dict: Definitions matching families and tags by their name.
+        """
+        definitions = profile.get(key) or {}
+        if not definitions:
+            return {}
+
+        if families is not None:
+            families = frozenset(family.lower() for family in families)
+        if tags is not None:
+            tags = frozenset(tag.lower() for tag in tags)
+
+        cache_key = (id(profile), key, families, tags)
+        names = self._definitions_cache.get(cache_key)
+        if names is None:
+            names = []
+            for name, definition in definitions.items():
+                def_filter = self._get_definition_filter(
+                    profile, key, name, definition
+                )
+                if families is not None and not def_filter.families_valid(
+                    families
+                ):
+                    continue
+
+                if tags is not None and not def_filter.tags_valid(tags):
+                    continue
+                names.append(name)
+            self._definitions_cache[cache_key] = names
+
+        return collections.OrderedDict(
+            (name, definitions[name]) for name in names
+        )
+
+    def _get_definition_filter(self, profile, key, name, definition):
+        filter_key = (id(profile), key, name)
+        def_filter = self._definition_filters.get(filter_key)
+        if def_filter is None:
+            def_filter = _DefinitionFilter(definition)
+            self._definition_filters[filter_key] = def_filter
+        return def_filter
+
+
+_matchers = collections.OrderedDict()
+
+
+def get_profiles_matcher(profiles):
+    """Return shared matcher of entered profiles.
+
+    Matchers are cached by identity of profiles object, so plugins using
+    profiles from presets (class attribute) share one matcher across all
+    instances.
+    """
+    key = id(profiles)
+    matcher = _matchers.get(key)
+    # Make sure the id was not reused by another object
+    if matcher is not None and matcher.profiles is profiles:
+        return matcher
+
+    matcher = ProfilesMatcher(profiles)
+    _matchers[key] = matcher
+    while len(_matchers) > MAX_CACHED_MATCHERS:
+        _matchers.popitem(last=False)
+    return matcher
+
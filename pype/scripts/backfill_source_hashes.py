@@ -0,0 +1,38 @@
+"""Fill registry of source hashes from versions of existing projects.
+
+Example:
+    python backfill_source_hashes.py --projects MyProject OtherProject
+"""
+
+import argparse
+import logging
+
+from avalon import io
+
+from pype.source_hashes import backfill_source_hashes
+
+handler = logging.basicConfig()
+log = logging.getLogger("Backfill source hashes")
+log.setLevel(logging.INFO)
+
+
+def __main__():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--projects",
+                        nargs="*",
+                        default=[],
+                        help="Names of projects to process. All projects "
+                             "are processed if not entered.")
+    kwargs, args = parser.parse_known_args()
+
+    io.install()
+    project_names = kwargs.projects or [
+        project["name"] for project in io.projects()
+    ]
+    for project_name in project_names:
+        count = backfill_source_hashes(project_name)
+        log.info("{}: {} source hashes".format(project_name, count))
+
+
+if __name__ == '__main__':
+    __main__()
@@ -0,0 +1,143 @@
+"""Measure cost of profile lookups of ExtractReview and ExtractBurnin.
+
+Lookups are done on generated studio sized profiles or on profiles loaded
+from presets file. Each lookup finds profile for host, task and family and
+filters it's output definitions by families and tags (as done for each
+instance and representation by the plugins).
+
+Example:
+    python benchmark_profiles.py --profiles-count 300 --lookups 2000
+    python benchmark_profiles.py --preset-file publish.json
+"""
+
+import json
+import time
+import random
+import logging
+import argparse
+
+from pype.profiles import ProfilesMatcher, log as profiles_log
+
+
+def generate_profiles(profiles_count, outputs_count=10):
+    """Profiles with random filters and output definitions."""
+    hosts = ["maya", "nuke", "houdini", "nukestudio", "standalonepublisher"]
+    tasks = ["compositing", "lighting", "animation", "layout", "fx", "lookdev"]
+    families = ["render", "review", "plate", "prerender", "model", "look"]
+    tags = ["review", "burnin", "ftrackreview", "delete", "slate-frame"]
+    profiles = []
+    for _ in range(profiles_count):
+        outputs = {}
+        for output_idx in range(outputs_count):
+            outputs["out{}".format(output_idx)] = {
+                "filter": {
+                    "families": [
+                        random.choice(families),
+                        [random.choice(families), random.choice(families)]
+                    ],
+                    "tags": [random.choice(tags)]
+                }
+            }
+        profiles.append({
+            "hosts": random.sample(hosts, random.randint(0, 2)),
+            "tasks": [
+                "{}.*".format(task)
+                for task in random.sample(tasks, random.randint(0, 2))
+            ],
+            "families": random.sample(families, random.randint(0, 2)),
+            "outputs": outputs
+        })
+    return profiles
+
+
+def load_profiles(filepath, plugin_name="ExtractReview"):
+    """Profiles of plugin from publish presets file.
+
+    File may also contain only list of profiles.
+    """
+    with open(filepath, "r") as stream:
+        data = json.load(stream)
+
+    if isinstance(data, list):
+        return data
+    return data[plugin_name]["profiles"]
+
+
+def benchmark(profiles, lookups_count=2000, definitions_key="outputs"):
+    """Print cost of profile lookups without and with shared matcher."""
+    queries = [
+        (
+            random.choice(["maya", "nuke", "houdini"]),
+            random.choice(["compositing", "lighting", "fx_sim", "layout"]),
+            random.choice(["render", "review", "plate"]),
+            ["review", random.choice(["burnin", "delete", "slate-frame"])]
+        )
+        for _ in range(lookups_count)
+    ]
+
+    def lookup(matcher, query):
+        host_name, task_name, family, tags = query
+        profile = matcher.match(host_name, task_name, family)
+        if profile is not None:
+            matcher.filter_definitions(
+                profile, definitions_key, families=[family], tags=tags
+            )
+
+    # Uncached lookup as was done by plugins (new matcher for each lookup)
+    start = time.time()
+    for query in queries:
+        lookup(ProfilesMatcher(profiles), query)
+    uncached = (time.time() - start) / lookups_count
+
+    matcher = ProfilesMatcher(profiles)
+    start = time.time()
+    for query in queries:
+        lookup(matcher, query)
+    cached = (time.time() - start) / lookups_count
+
+    print((
+        "{} profiles, {} lookups:\n"
+        "  uncached: {:.3f} ms per lookup\n"
+        "  shared matcher: {:.4f} ms per lookup ({} hits / {} misses)"
+    ).format(
+        len(profiles), lookups_count,
+        uncached * 1000, cached * 1000, matcher.hits, matcher.misses
+    ))
+
+
+def __main__():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profiles-count",
+                        type=int,
+                        default=300,
+                        help="Count of generated profiles.")
+    parser.add_argument("--lookups",
+                        type=int,
+                        default=2000,
+                        help="Count of looked up contexts.")
+    parser.add_argument("--preset-file",
+                        help="Publish presets file (or json list of"
+                             " profiles) used instead of generated"
+                             " profiles.")
+    parser.add_argument("--plugin",
+                        default="ExtractReview",
+                        help="Plugin of profiles in presets file"
+                             " (ExtractReview or ExtractBurnin).")
+    kwargs, args = parser.parse_known_args()
+
+    # Generated profiles often match more than one profile
+    profiles_log.setLevel(logging.ERROR)
+    random.seed(0)
+    definitions_key = "outputs"
+    if kwargs.plugin == "ExtractBurnin":
+        definitions_key = "burnins"
+
+    if kwargs.preset_file:
+        profiles = load_profiles(kwargs.preset_file, kwargs.plugin)
+    else:
+        profiles = generate_profiles(kwargs.profiles_count)
+    benchmark(profiles, kwargs.lookups, definitions_key)
+
+
+if __name__ == '__main__':
+    __main__()
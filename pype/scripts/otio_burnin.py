@@ -4,7 +4,7 @@ import re
 import subprocess
 import json
 import opentimelineio_contrib.adapters.ffmpeg_burnins as ffmpeg_burnins
-from pypeapp.lib import config
+from pype.presets import get_presets
 from pypeapp import Logger
 import pype.lib
 
@@ -12,17 +12,12 @@ log = Logger().get_logger("BurninWrapper", "burninwrap")
 
 
 ffmpeg_path = pype.lib.get_ffmpeg_tool_path("ffmpeg")
-ffprobe_path = pype.lib.get_ffmpeg_tool_path("ffprobe")
 
 
 FFMPEG = (
     '{} -loglevel panic -i %(input)s %(filters)s %(args)s%(output)s'
 ).format(ffmpeg_path)
 
-FFPROBE = (
-    '{} -v quiet -print_format json -show_format -show_streams "%(source)s"'
-).format(ffprobe_path)
-
 DRAWTEXT = (
     "drawtext=text=\\'%(text)s\\':x=%(x)s:y=%(y)s:fontcolor="
     "%(color)s@%(opacity).1f:fontsize=%(size)d:fontfile='%(font)s'"
@@ -42,15 +37,13 @@ SOURCE_TIMECODE_KEY = "{source_timecode}"
 
 def _streams(source):
     """Reimplemented from otio burnins to be able use full path to ffprobe
+
+    Results are shared with publish process through ffprobe cache stored
+    in source's directory.
     :param str source: source media file
     :rtype: [{}, ...]
     """
-    command = FFPROBE % {'source': source}
-    proc = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE)
-    out = proc.communicate()[0]
-    if proc.returncode != 0:
-        raise RuntimeError("Failed to run: %s" % command)
-    return json.loads(out)['streams']
+    return pype.lib.ffprobe_streams(source, os.path.dirname(source))
 
 
 def get_fps(str_value):
@@ -334,73 +327,32 @@ def example(input_path, output_path):
     burnin.render(output_path, overwrite=True)
 
 
-def burnins_from_data(
-    input_path, output_path, data,
-    codec_data=None, options=None, burnin_values=None, overwrite=True
+def prepare_burnins(
+    input_path, data, options=None, burnin_values=None, streams=None
 ):
-    """This method adds burnins to video/image file based on presets setting.
-
-    Extension of output MUST be same as input. (mov -> mov, avi -> avi,...)
+    """Prepare burnins object with filters based on presets setting.
 
     Args:
         input_path (str): Full path to input file where burnins should be add.
-        output_path (str): Full path to output file where output will be
-            rendered.
-        data (dict): Data required for burnin settings (more info below).
-        codec_data (list): All codec related arguments in list.
+        data (dict): Data required for burnin settings.
         options (dict): Options for burnins.
         burnin_values (dict): Contain positioned values.
-        overwrite (bool): Output will be overriden if already exists,
-            True by default.
-
-    Presets must be set separately. Should be dict with 2 keys:
-    - "options" - sets look of burnins - colors, opacity,...(more info: ModifiedBurnins doc)
-                - *OPTIONAL* default values are used when not included
-    - "burnins" - contains dictionary with burnins settings
-                - *OPTIONAL* burnins won't be added (easier is not to use this)
-        - each key of "burnins" represents Alignment, there are 6 possibilities:
-            TOP_LEFT        TOP_CENTERED        TOP_RIGHT
-            BOTTOM_LEFT     BOTTOM_CENTERED     BOTTOM_RIGHT
-        - value must be string with text you want to burn-in
-        - text may contain specific formatting keys (exmplained below)
-
-    Requirement of *data* keys is based on presets.
-    - "frame_start" - is required when "timecode" or "current_frame" ins keys
-    - "frame_start_tc" - when "timecode" should start with different frame
-    - *keys for static text*
-
-    EXAMPLE:
-    preset = {
-        "options": {*OPTIONS FOR LOOK*},
-        "burnins": {
-            "TOP_LEFT": "static_text",
-            "TOP_RIGHT": "{shot}",
-            "BOTTOM_LEFT": "TC: {timecode}",
-            "BOTTOM_RIGHT": "{frame_start}{current_frame}"
-        }
-    }
+        streams (list): Streams of input. Input is probed with ffprobe when
+            not entered.
 
-    For this preset we'll need at least this data:
-    data = {
-        "frame_start": 1001,
-        "shot": "sh0010"
-    }
+    Returns:
+        ModifiedBurnins: Object with prepared drawtext filters.
 
-    When Timecode should start from 1 then data need:
-    data = {
-        "frame_start": 1001,
-        "frame_start_tc": 1,
-        "shot": "sh0010"
-    }
+    More information about arguments is in `burnins_from_data`.
     """
 
     # Use legacy processing when options are not set
     if options is None or burnin_values is None:
-        presets = config.get_presets().get("tools", {}).get("burnins", {})
+        presets = get_presets().get("tools", {}).get("burnins", {})
         options = presets.get("options")
         burnin_values = presets.get("burnins") or {}
 
-    burnin = ModifiedBurnins(input_path, options_init=options)
+    burnin = ModifiedBurnins(input_path, streams, options_init=options)
 
     frame_start = data.get("frame_start")
     frame_end = data.get("frame_end")
@@ -509,6 +461,71 @@ def burnins_from_data(
         text = value.format(**data)
         burnin.add_text(text, align, frame_start, frame_end)
 
+    return burnin
+
+
+def burnins_from_data(
+    input_path, output_path, data,
+    codec_data=None, options=None, burnin_values=None, overwrite=True
+):
+    """This method adds burnins to video/image file based on presets setting.
+
+    Extension of output MUST be same as input. (mov -> mov, avi -> avi,...)
+
+    Args:
+        input_path (str): Full path to input file where burnins should be add.
+        output_path (str): Full path to output file where output will be
+            rendered.
+        data (dict): Data required for burnin settings (more info below).
+        codec_data (list): All codec related arguments in list.
+        options (dict): Options for burnins.
+        burnin_values (dict): Contain positioned values.
+        overwrite (bool): Output will be overriden if already exists,
+            True by default.
+
+    Presets must be set separately. Should be dict with 2 keys:
+    - "options" - sets look of burnins - colors, opacity,...(more info: ModifiedBurnins doc)
+                - *OPTIONAL* default values are used when not included
+    - "burnins" - contains dictionary with burnins settings
+                - *OPTIONAL* burnins won't be added (easier is not to use this)
+        - each key of "burnins" represents Alignment, there are 6 possibilities:
+            TOP_LEFT        TOP_CENTERED        TOP_RIGHT
+            BOTTOM_LEFT     BOTTOM_CENTERED     BOTTOM_RIGHT
+        - value must be string with text you want to burn-in
+        - text may contain specific formatting keys (exmplained below)
+
+    Requirement of *data* keys is based on presets.
+    - "frame_start" - is required when "timecode" or "current_frame" ins keys
+    - "frame_start_tc" - when "timecode" should start with different frame
+    - *keys for static text*
+
+    EXAMPLE:
+    preset = {
+        "options": {*OPTIONS FOR LOOK*},
+        "burnins": {
+            "TOP_LEFT": "static_text",
+            "TOP_RIGHT": "{shot}",
+            "BOTTOM_LEFT": "TC: {timecode}",
+            "BOTTOM_RIGHT": "{frame_start}{current_frame}"
+        }
+    }
+
+    For this preset we'll need at least this data:
+    data = {
+        "frame_start": 1001,
+        "shot": "sh0010"
+    }
+
+    When Timecode should start from 1 then data need:
+    data = {
+        "frame_start": 1001,
+        "frame_start_tc": 1,
+        "shot": "sh0010"
+    }
+    """
+
+    burnin = prepare_burnins(input_path, data, options, burnin_values)
+
     ffmpeg_args = []
     if codec_data:
         # Use codec definition from method arguments
@@ -535,8 +552,44 @@ def burnins_from_data(
     )
 
 
+def burnin_filters_to_file(
+    input_path, output_path, data, streams, options=None, burnin_values=None
+):
+    """Store drawtext filters of burnins to json file instead of rendering.
+
+    Filters can be added to ffmpeg filter graph of other process so input
+    does not have to be decoded again only to add burnins.
+
+    Args:
+        input_path (str): Path to input file (e.g. first frame of sequence).
+        output_path (str): Path to json file where filters are stored.
+        data (dict): Data required for burnin settings.
+        streams (list): Streams of output where burnins will be added.
+            Must contain video stream with "width", "height" and
+            "r_frame_rate" keys.
+        options (dict): Options for burnins.
+        burnin_values (dict): Contain positioned values.
+    """
+    burnin = prepare_burnins(
+        input_path, data, options, burnin_values, streams
+    )
+    with open(output_path, "w") as stream:
+        json.dump({"filters": burnin.filters["drawtext"]}, stream)
+
+
 if __name__ == "__main__":
     in_data = json.loads(sys.argv[-1])
+    if in_data.get("filters_output"):
+        burnin_filters_to_file(
+            in_data["input"],
+            in_data["filters_output"],
+            in_data["burnin_data"],
+            in_data["streams"],
+            options=in_data.get("options"),
+            burnin_values=in_data.get("values")
+        )
+        sys.exit(0)
+
     burnins_from_data(
         in_data["input"],
         in_data["output"],
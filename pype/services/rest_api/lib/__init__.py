@@ -1,7 +1,9 @@
 from .exceptions import ObjAlreadyExist, AbortException
 from .lib import RestMethods, CallbackResult, RequestInfo, Splitter
+from .encoder import RestApiJSONEncoder
 from .factory import _RestApiFactory
 
 RestApiFactory = _RestApiFactory()
 
 from .handler import Handler
+from .async_server import AsyncRestApiServer
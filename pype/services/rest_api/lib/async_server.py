@@ -0,0 +1,390 @@
+import asyncio
+import email.utils
+import http.client
+from http import HTTPStatus
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+
+from .lib import RestMethods, RequestInfo
+from .encoder import JSONStream
+from .exceptions import AbortException
+from .statics import (
+    StaticResponse,
+    static_files_cache,
+    resolve_static_path
+)
+from .handler import (
+    prepare_url_data,
+    load_request_data,
+    trigger_callback,
+    invalid_path_message,
+    abort_response,
+    exception_response,
+    callback_result_response
+)
+from . import RestApiFactory
+
+from pypeapp import Logger
+
+log = Logger().get_logger("AsyncRestApiServer")
+
+
+class AsyncRequest:
+    """Request received by `AsyncRestApiServer`.
+
+    Object is passed to callbacks as `handler` of `RequestInfo` and has
+    same basic attributes as request handler of threading server.
+    """
+
+    def __init__(self, command, path, request_version, headers, address):
+        self.command = command
+        self.path = path
+        self.request_version = request_version
+        self.headers = headers
+        self.client_address = address
+
+    @property
+    def keep_alive(self):
+        connection = (self.headers.get("Connection") or "").lower()
+        if self.request_version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+
+class AsyncRestApiServer:
+    """Rest api server processing requests in asyncio event loop.
+
+    Connections are kept alive between requests (HTTP/1.1). Routes are
+    found with route trie of `RestApiFactory` in event loop and callbacks,
+    which may block, are triggered in bounded pool of worker threads.
+
+    :param address: Host and port where server listens.
+    :type address: tuple
+    :param workers: Maximum number of callbacks processed at the same time.
+    :type workers: int
+    :param keep_alive_timeout: Seconds after which idle connection is closed.
+    :type keep_alive_timeout: float
+    """
+    server_version = "PypeRestApi/1.0"
+    chunk_size = 1024 * 1024
+    max_header_lines = 100
+
+    def __init__(self, address, workers=8, keep_alive_timeout=15):
+        self.address = address
+        self.workers = max(1, int(workers))
+        self.keep_alive_timeout = keep_alive_timeout
+
+        self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        self._server = None
+        self._semaphore = None
+        # Open connections (task and stream writer)
+        self._connections = {}
+
+    async def start(self):
+        self._semaphore = asyncio.Semaphore(self.workers)
+        host, port = self.address
+        self._server = await asyncio.start_server(
+            self._on_connection, host or None, port
+        )
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+        # Close idle keep-alive connections
+        for writer in self._connections.values():
+            writer.close()
+
+        if self._connections:
+            await asyncio.wait(
+                list(self._connections.keys()),
+                timeout=self.keep_alive_timeout
+            )
+        self.executor.shutdown(wait=False)
+
+    def _on_connection(self, reader, writer):
+        task = asyncio.ensure_future(self.handle_connection(reader, writer))
+        self._connections[task] = writer
+        task.add_done_callback(self._connections.pop)
+
+    async def run_until(self, is_running, check_interval=0.5):
+        """Serve requests until `is_running` callable returns False."""
+        await self.start()
+        try:
+            while is_running():
+                await asyncio.sleep(check_interval)
+        finally:
+            await self.stop()
+
+    async def handle_connection(self, reader, writer):
+        address = writer.get_extra_info("peername")
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(
+                        self.read_request_head(reader, address),
+                        self.keep_alive_timeout
+                    )
+                except asyncio.TimeoutError:
+                    break
+
+                if request is None:
+                    break
+
+                body = b""
+                content_length = request.headers.get("Content-Length")
+                if content_length:
+                    body = await reader.readexactly(int(content_length))
+
+                keep_alive = await self.process_request(
+                    request, body, writer, request.keep_alive
+                )
+                if not keep_alive:
+                    break
+
+        except (
+            ConnectionError,
+            asyncio.IncompleteReadError,
+            asyncio.LimitOverrunError,
+            ValueError
+        ):
+            log.debug("Connection {} was interrupted.".format(address))
+
+        except Exception:
+            log.warning(
+                "Unexpected error of connection {}".format(address),
+                exc_info=True
+            )
+
+        finally:
+            writer.close()
+
+    async def read_request_head(self, reader, address):
+        """Read request line and headers.
+
+        :return: Request or `None` when connection was closed.
+        :rtype: AsyncRequest, None
+        """
+        request_line = await reader.readline()
+        if not request_line.strip():
+            return None
+
+        parts = request_line.decode("iso-8859-1").split()
+        if len(parts) == 2:
+            parts.append("HTTP/1.0")
+
+        if len(parts) != 3:
+            raise ValueError("Bad request line {}".format(request_line))
+
+        header_lines = []
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            header_lines.append(line)
+            if len(header_lines) > self.max_header_lines:
+                raise ValueError("Too many headers")
+
+        headers = http.client.parse_headers(
+            _BytesLines(header_lines + [b"\r\n"])
+        )
+        command, path, version = parts
+        return AsyncRequest(command, path, version, headers, address)
+
+    async def process_request(self, request, body, writer, keep_alive):
+        """Send response to request.
+
+        :return: Connection can be used for next request.
+        :rtype: bool
+        """
+        parsed_url = urlparse(request.path)
+        path = parsed_url.path
+        rest_method = RestMethods.get(request.command)
+        if rest_method is None:
+            message = "Unsupported method \"{}\"".format(request.command)
+            await self.send(
+                writer, HTTPStatus.NOT_IMPLEMENTED, message, keep_alive
+            )
+            return keep_alive
+
+        if rest_method is RestMethods.GET:
+            dirpath, _path = RestApiFactory.find_statics(path)
+            if dirpath is not None:
+                await self.send_static(
+                    writer, request, dirpath, _path, keep_alive
+                )
+                return keep_alive
+
+        item, url_data = RestApiFactory.find_route(rest_method, path)
+        if not item:
+            message = invalid_path_message(rest_method, path, request.path)
+            log.debug(message)
+            await self.send(
+                writer, HTTPStatus.BAD_REQUEST, message, keep_alive
+            )
+            return keep_alive
+
+        loop = asyncio.get_event_loop()
+        async with self._semaphore:
+            status, body, content_type = await loop.run_in_executor(
+                self.executor, self.run_callback,
+                item, url_data, parsed_url, rest_method, body, request
+            )
+        if isinstance(body, JSONStream):
+            return await self.send_stream(
+                writer, request, status, body, keep_alive
+            )
+
+        await self.send(writer, status, body, keep_alive, content_type)
+        return keep_alive
+
+    def run_callback(
+        self, item, url_data, parsed_url, rest_method, body, request
+    ):
+        """Trigger callback in worker thread and prepare response."""
+        try:
+            log.debug("Triggering callback for path \"{}\"".format(
+                parsed_url.path
+            ))
+            request_info = RequestInfo(
+                url_data=prepare_url_data(item, url_data),
+                request_data=load_request_data(body),
+                query=parsed_url.query,
+                fragment=parsed_url.fragment,
+                params=parsed_url.params,
+                method=rest_method,
+                handler=request
+            )
+            result = trigger_callback(item, request_info)
+            status, body = callback_result_response(
+                result, rest_method, request.path
+            )
+            return status, body, "application/json"
+
+        except AbortException as exc:
+            status, message = abort_response(exc)
+
+        except Exception as exc:
+            status, message = exception_response(exc)
+
+        return status, message, "text/html"
+
+    def response_head(self, status, headers, keep_alive):
+        status = HTTPStatus(status)
+        lines = ["HTTP/1.1 {} {}".format(status.value, status.phrase)]
+        lines.append("Server: {}".format(self.server_version))
+        lines.append("Date: {}".format(email.utils.formatdate(usegmt=True)))
+        for key, value in headers:
+            lines.append("{}: {}".format(key, value))
+        if keep_alive:
+            lines.append("Connection: keep-alive")
+        else:
+            lines.append("Connection: close")
+        lines.append("")
+        lines.append("")
+        return "\r\n".join(lines).encode("iso-8859-1")
+
+    async def send(
+        self, writer, status, body, keep_alive, content_type="text/html"
+    ):
+        headers = []
+        data = b""
+        if body is not None:
+            data = body.encode()
+            headers.append(("Content-type", content_type))
+        headers.append(("Content-Length", len(data)))
+
+        writer.write(self.response_head(status, headers, keep_alive) + data)
+        await writer.drain()
+
+    async def send_stream(self, writer, request, status, body, keep_alive):
+        """Send body encoded in worker threads while is sent.
+
+        Chunked transfer encoding is used for HTTP/1.1 requests, connection
+        is closed after response for older clients.
+
+        :return: Connection can be used for next request.
+        :rtype: bool
+        """
+        chunked = request.request_version != "HTTP/1.0"
+        keep_alive = keep_alive and chunked
+        headers = [("Content-type", "application/json")]
+        if chunked:
+            headers.append(("Transfer-Encoding", "chunked"))
+        writer.write(self.response_head(status, headers, keep_alive))
+
+        loop = asyncio.get_event_loop()
+        chunks = iter(body)
+        while True:
+            try:
+                chunk = await loop.run_in_executor(
+                    self.executor, next, chunks, None
+                )
+            except Exception:
+                # Headers were already sent so only end of stream can be
+                # marked by closing connection
+                log.error("Response stream was interrupted.", exc_info=True)
+                return False
+
+            if chunk is None:
+                break
+
+            if chunked:
+                chunk = b"%x\r\n%s\r\n" % (len(chunk), chunk)
+            writer.write(chunk)
+            await writer.drain()
+
+        if chunked:
+            writer.write(b"0\r\n\r\n")
+        await writer.drain()
+        return keep_alive
+
+    async def send_static(self, writer, request, dirpath, path, keep_alive):
+        """Stream static file in chunks read in worker threads."""
+        loop = asyncio.get_event_loop()
+        path = resolve_static_path(dirpath, path)
+        try:
+            if path is None:
+                raise OSError("Path is not in statics directory")
+            static_file = await loop.run_in_executor(
+                self.executor, static_files_cache.acquire, path
+            )
+        except OSError:
+            await self.send(
+                writer, HTTPStatus.NOT_FOUND, "File not found", keep_alive
+            )
+            return
+
+        try:
+            response = StaticResponse(static_file, request.headers)
+            writer.write(self.response_head(
+                response.status, response.headers, keep_alive
+            ))
+            if not response.send_content or request.command == "HEAD":
+                await writer.drain()
+                return
+
+            chunks = response.iter_chunks(self.chunk_size)
+            while True:
+                chunk = await loop.run_in_executor(
+                    self.executor, next, chunks, None
+                )
+                if chunk is None:
+                    break
+                writer.write(chunk)
+                await writer.drain()
+
+        finally:
+            static_files_cache.release(static_file)
+
+
+class _BytesLines:
+    """File-like object over header lines for `http.client.parse_headers`."""
+
+    def __init__(self, lines):
+        self._lines = iter(lines)
+
+    def readline(self, *args):
+        return next(self._lines, b"")
@@ -0,0 +1,93 @@
+import json
+import datetime
+
+try:
+    from bson.objectid import ObjectId
+except ImportError:
+    ObjectId = None
+
+
+class RestApiJSONEncoder(json.JSONEncoder):
+    """Json encoder of callback results.
+
+    Encodes values of database documents which are not json serializable
+    (ObjectId as string, datetime in iso format) so results of MongoDB
+    queries can be returned directly without conversion.
+    """
+
+    def default(self, obj):
+        if ObjectId is not None and isinstance(obj, ObjectId):
+            return str(obj)
+
+        if isinstance(obj, (datetime.datetime, datetime.date)):
+            return obj.isoformat()
+
+        if isinstance(obj, (set, frozenset, tuple)) or is_streamed(obj):
+            return list(obj)
+
+        return super().default(obj)
+
+
+def is_streamed(value):
+    """Value is iterator (e.g. generator or MongoDB cursor).
+
+    Items of iterators in response body are encoded one by one while
+    response is sent so they don't have to be loaded all at once.
+    """
+    if isinstance(value, (str, bytes, dict, list)):
+        return False
+    return hasattr(value, "__next__")
+
+
+class JSONStream:
+    """Iterable of encoded json data in chunks.
+
+    Iterators in first level of data (e.g. cursor as "data" of response) are
+    encoded item by item, all other values are encoded at once.
+
+    :param data: Data which should be encoded.
+    :type data: dict
+    :param chunk_size: Minimum size of chunks in bytes (last may be smaller).
+    :type chunk_size: int
+    """
+    chunk_size = 64 * 1024
+
+    def __init__(self, data, chunk_size=None):
+        self.data = data
+        if chunk_size is not None:
+            self.chunk_size = chunk_size
+        self.encoder = RestApiJSONEncoder()
+
+    def __iter__(self):
+        parts = []
+        size = 0
+        for part in self.iter_parts():
+            parts.append(part)
+            size += len(part)
+            if size >= self.chunk_size:
+                yield "".join(parts).encode()
+                parts = []
+                size = 0
+
+        if parts:
+            yield "".join(parts).encode()
+
+    def iter_parts(self):
+        encode = self.encoder.encode
+        yield "{"
+        for idx, (key, value) in enumerate(self.data.items()):
+            if idx:
+                yield ", "
+            yield encode(key) + ": "
+
+            if not is_streamed(value):
+                yield encode(value)
+                continue
+
+            yield "["
+            for item_idx, item in enumerate(value):
+                if item_idx:
+                    yield ", "
+                yield encode(item)
+            yield "]"
+        yield "}"
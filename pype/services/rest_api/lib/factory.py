@@ -67,7 +67,7 @@ def prepare_regex_from_path(full_path, strict_match):
     regex_path = full_path
     keys = []
     for key in all_founded_keys:
-        replacement = "(?P{}\w+)".format(key)
+        replacement = r"(?P{}\w+)".format(key)
         keys.append(key.replace("<", "").replace(">", ""))
         if not strict_match:
             if full_path.endswith(key):
@@ -201,6 +201,175 @@ def prepare_callback_info(callback):
     }
 
 
+class _RouteNode:
+    """Node of `RouteTrie` for single segment of url path."""
+
+    __slots__ = ("static", "params", "patterns", "items")
+
+    def __init__(self):
+        # Child nodes by exact segment
+        self.static = {}
+        # Child nodes of segments which are dynamic key ("<key>")
+        self.params = {}
+        # Child nodes of segments combining text and dynamic keys
+        self.patterns = []
+        # Registered items ending at this node with their order
+        self.items = []
+
+
+class RouteTrie:
+    """Routes of single request method compiled to tree of path segments.
+
+    Path is split by "/" to segments and each segment is looked up in child
+    nodes so requested path is not matched against each registered route.
+    Routes are matched with same rules as regexes created with
+    `prepare_regex_from_path` (dynamic key match word characters and last
+    dynamic key is optional when `strict_match` is not set). When more routes
+    match path then the route which would be found first by iterating routes
+    by prefixes is used.
+    """
+
+    param_regex = re.compile(r"\w+$")
+    key_regex = re.compile("<[^< >]+>")
+
+    def __init__(self):
+        self.root = _RouteNode()
+
+    @staticmethod
+    def split_path(path):
+        segments = path.split("/")
+        if segments and not segments[0]:
+            segments.pop(0)
+        return segments
+
+    def add(self, fullpath, item, strict_match, order):
+        """Add route to tree.
+
+        :param fullpath: Prepared full path of route (prefix + path).
+        :type fullpath: str
+        :param item: Prepared route item returned on match.
+        :type item: dict
+        :param strict_match: Last dynamic key of path is required.
+        :type strict_match: bool
+        :param order: Order in which routes are compared, lower is first.
+        :type order: tuple
+        """
+        segments = self.split_path(fullpath)
+        node = self.root
+        parent = None
+        for idx, segment in enumerate(segments):
+            is_last = idx == len(segments) - 1
+            keys = self.key_regex.findall(segment)
+            if not keys:
+                parent = node
+                node = node.static.setdefault(segment, _RouteNode())
+                continue
+
+            if len(keys) == 1 and keys[0] == segment:
+                key = segment[1:-1]
+                if is_last and not strict_match:
+                    # Path without last dynamic key is also valid
+                    node.items.append((order, item, key))
+                    node.static.setdefault("", _RouteNode()).items.append(
+                        (order, item, key)
+                    )
+                    # Slash before optional key is optional in regex too
+                    #   so key may follow previous static segment directly
+                    prev_segment = segments[idx - 1] if idx else ""
+                    if (
+                        parent is not None
+                        and prev_segment
+                        and not self.key_regex.search(prev_segment)
+                    ):
+                        self._add_pattern(
+                            parent,
+                            r"^{}(?P<{}>\w+)$".format(
+                                re.escape(prev_segment), key
+                            ),
+                            (order, item, None)
+                        )
+                parent = node
+                node = node.params.setdefault(key, _RouteNode())
+                continue
+
+            regex_segment = segment
+            for key in keys:
+                replacement = r"(?P{}\w+)".format(key)
+                if is_last and not strict_match and segment.endswith(key):
+                    replacement = "?{}?".format(replacement)
+                regex_segment = regex_segment.replace(key, replacement)
+            parent = node
+            node = self._add_pattern(node, "^{}$".format(regex_segment))
+
+        node.items.append((order, item, None))
+
+    @staticmethod
+    def _add_pattern(node, pattern, item=None):
+        """Child node of segment matching regex pattern."""
+        child = None
+        for _regex, _child in node.patterns:
+            if _regex.pattern == pattern:
+                child = _child
+                break
+
+        if child is None:
+            child = _RouteNode()
+            node.patterns.append((re.compile(pattern), child))
+
+        if item is not None:
+            child.items.append(item)
+        return child
+
+    def match(self, path):
+        """Find route matching path.
+
+        :param path: Requested url path.
+        :type path: str
+        :return: Matching item and values of dynamic keys.
+        :rtype: tuple(dict, dict), tuple(None, None)
+        """
+        best = None
+        stack = [(self.root, 0, None)]
+        segments = self.split_path(path)
+        segments_len = len(segments)
+        while stack:
+            node, idx, url_data = stack.pop()
+            if idx == segments_len:
+                for order, item, optional_key in node.items:
+                    if best is not None and best[0] <= order:
+                        continue
+
+                    _url_data = url_data
+                    if item["regex_keys"]:
+                        _url_data = dict(url_data or {})
+                        if optional_key:
+                            _url_data[optional_key] = None
+                    best = (order, item, _url_data)
+                continue
+
+            segment = segments[idx]
+            child = node.static.get(segment)
+            if child is not None:
+                stack.append((child, idx + 1, url_data))
+
+            if node.params and self.param_regex.match(segment):
+                for key, child in node.params.items():
+                    _url_data = dict(url_data or {})
+                    _url_data[key] = segment
+                    stack.append((child, idx + 1, _url_data))
+
+            for regex, child in node.patterns:
+                found = regex.match(segment)
+                if found:
+                    _url_data = dict(url_data or {})
+                    _url_data.update(found.groupdict())
+                    stack.append((child, idx + 1, _url_data))
+
+        if best is None:
+            return None, None
+        return best[1], best[2]
+
+
 class _RestApiFactory:
     """Factory is used to store and prepare callbacks for requests.
 
@@ -215,6 +384,7 @@ class _RestApiFactory:
         method: collections.defaultdict(list) for method in RestMethods
     }
     prepared_statics = {}
+    route_tries = {method: RouteTrie() for method in RestMethods}
 
     has_routes = False
 
@@ -268,15 +438,57 @@ class _RestApiFactory:
         )
         callback_info = prepare_callback_info(callback)
 
+        item = {
+            "regex": regex,
+            "regex_keys": regex_keys,
+            "fullpath": fullpath,
+            "callback": callback,
+            "callback_info": callback_info
+        }
         for method in methods:
             self.has_routes = True
-            self.prepared_routes[method][url_prefix].append({
-                "regex": regex,
-                "regex_keys": regex_keys,
-                "fullpath": fullpath,
-                "callback": callback,
-                "callback_info": callback_info
-            })
+            routes_by_prefix = self.prepared_routes[method]
+            prefix_items = routes_by_prefix[url_prefix]
+            # Keep order of matching same as when iterating through routes
+            order = (
+                list(routes_by_prefix.keys()).index(url_prefix),
+                len(prefix_items)
+            )
+            prefix_items.append(item)
+            self.route_tries[method].add(
+                fullpath, item, route["strict_match"], order
+            )
+
+    def find_route(self, rest_method, path):
+        """Find registered route item matching path of request.
+
+        :param rest_method: Method of request.
+        :type rest_method: RestMethods
+        :param path: Requested url path.
+        :type path: str
+        :return: Route item and values of dynamic keys from path.
+        :rtype: tuple(dict, dict), tuple(None, None)
+        """
+        return self.route_tries[rest_method].match(path)
+
+    def find_statics(self, path):
+        """Find statics directory and path relative to it's url prefix.
+
+        :return: Directory path and rest of url path.
+        :rtype: tuple(str, str), tuple(None, None)
+        """
+        for prefix, dirpath in self.prepared_statics.items():
+            if path.startswith(prefix):
+                return dirpath, path[len(prefix):]
+        return None, None
+
+    def find_prefix(self, rest_method, path):
+        """Last registered url prefix of method which path starts with."""
+        found_prefix = None
+        for url_prefix in self.prepared_routes[rest_method].keys():
+            if url_prefix is not None and path.startswith(url_prefix):
+                found_prefix = url_prefix
+        return found_prefix
 
     def prepare_registered(self):
         """Iter through all registered callbacks and statics to prepare them.
@@ -1,13 +1,17 @@
 import os
-import re
 import json
-import datetime
 import traceback
 import http.server
 from http import HTTPStatus
 from urllib.parse import urlparse
 
 from .lib import RestMethods, CallbackResult, RequestInfo
+from .statics import (
+    StaticResponse,
+    static_files_cache,
+    resolve_static_path
+)
+from .encoder import RestApiJSONEncoder, JSONStream, is_streamed
 from .exceptions import AbortException
 from . import RestApiFactory, Splitter
 
@@ -16,6 +20,166 @@ from pypeapp import Logger
 log = Logger().get_logger("RestApiHandler")
 
 
+def prepare_url_data(item, url_data):
+    """Values of all dynamic keys of route (missing keys are `None`)."""
+    regex_keys = item["regex_keys"]
+    if not regex_keys:
+        return None
+
+    _url_data = {key: None for key in regex_keys}
+    if url_data:
+        for key, value in url_data.items():
+            _url_data[key] = value
+    return _url_data
+
+
+def load_request_data(in_data_str):
+    """Convert body of request to json data."""
+    if not in_data_str:
+        return None
+
+    try:
+        return json.loads(in_data_str)
+    except Exception as e:
+        log.error("Invalid JSON recieved: \"{}\"".format(str(in_data_str)))
+        raise Exception("Invalid JSON recieved") from e
+
+
+def trigger_callback(item, request_info):
+    """Trigger callback of route item with arguments it expects."""
+    callback = item["callback"]
+    callback_info = item["callback_info"]
+
+    _args_len = callback_info["args_len"]
+    _has_args = callback_info["hasargs"]
+    _has_kwargs = callback_info["haskwargs"]
+
+    args = []
+    kwargs = {}
+    if _args_len == 0:
+        if _has_args:
+            args.append(request_info)
+        elif _has_kwargs:
+            kwargs["request_info"] = request_info
+    else:
+        args.append(request_info)
+
+    return callback(*args, **kwargs)
+
+
+def invalid_path_message(rest_method, path, request_path):
+    """Message for response when any route does not match path."""
+    found_prefix = RestApiFactory.find_prefix(rest_method, path)
+    if found_prefix is None:
+        return "Invalid path request \"{}\"".format(request_path)
+
+    _path = path.replace(found_prefix, "")
+    if _path:
+        request_str = " \"{}\"".format(_path)
+    else:
+        request_str = ""
+
+    return "Invalid path request{} for prefix \"{}\"".format(
+        request_str, found_prefix
+    )
+
+
+def abort_response(exc):
+    """Status code and message for `AbortException`."""
+    status_code, message = str(exc).split(Splitter)
+    status_code = int(status_code)
+    if not message:
+        message = Handler.default_messages.get(
+            status_code, "UnexpectedError"
+        )
+    return status_code, message
+
+
+def exception_response(exc):
+    """Status code and message for unexpected exception of callback."""
+    log_message = "Unexpected Exception was raised (this is bug!)"
+    log.error(log_message, exc_info=True)
+    items = [log_message]
+    items += traceback.extract_tb(exc.__traceback__).format()
+    return HTTPStatus.INTERNAL_SERVER_ERROR, "\n".join(items)
+
+
+def callback_result_response(result, rest_method, request_path):
+    """Prepare response to request based on result of callback.
+    :param result: Result returned by callback.
+    :type result: None, bool, dict, list, CallbackResult
+    :param rest_method: Rest api method (GET, POST, etc.).
+    :type rest_method: RestMethods
+    :param request_path: Requested path.
+    :type request_path: str
+    :return: Status and json body (`None` for status 204). Body is
+        `JSONStream` when data contain iterator (e.g. MongoDB cursor).
+    :rtype: tuple(int, str), tuple(int, JSONStream)
+
+    Response is based on result type:
+    - None, True - It is expected everything was OK, status 200.
+    - False - It is expected callback was not successful, status 400
+    - dict, list - Result is send under "data" key of body, status 200
+    - CallbackResult - object specify status and data
+
+    Values which are not json serializable are encoded with
+    `RestApiJSONEncoder` (e.g. ObjectId of database documents).
+    """
+    status = HTTPStatus.OK
+    success = True
+    message = None
+    data = None
+
+    body = None
+    # TODO better handling of results
+    if isinstance(result, CallbackResult):
+        status = result.status_code
+        body_dict = {}
+        for key, value in result.items():
+            if value is not None:
+                body_dict[key] = value
+        body = encode_body(body_dict)
+
+    elif result in [None, True]:
+        status = HTTPStatus.OK
+        success = True
+        message = "{} request for \"{}\" passed".format(
+            rest_method, request_path
+        )
+
+    elif result is False:
+        status = HTTPStatus.BAD_REQUEST
+        success = False
+
+    elif isinstance(result, (dict, list)):
+        status = HTTPStatus.OK
+        data = result
+
+    if status == HTTPStatus.NO_CONTENT:
+        return status, None
+
+    if not body:
+        body_dict = {"success": success}
+        if message:
+            body_dict["message"] = message
+
+        if not data:
+            data = {}
+
+        body_dict["data"] = data
+        body = encode_body(body_dict)
+
+    return status, body
+
+
+def encode_body(body_dict):
+    """Encode body of response or prepare stream if contain iterators."""
+    for value in body_dict.values():
+        if is_streamed(value):
+            return JSONStream(body_dict)
+    return json.dumps(body_dict, cls=RestApiJSONEncoder)
+
+
 class Handler(http.server.SimpleHTTPRequestHandler):
     # TODO fill will necessary statuses
     default_messages = {
@@ -23,6 +187,9 @@ class Handler(http.server.SimpleHTTPRequestHandler):
         HTTPStatus.NOT_FOUND: "Not found"
     }
 
+    # Size of chunks when file can't be sent with `os.sendfile`
+    static_chunk_size = 1024 * 1024
+
     statuses = {
         "POST": {
             "OK": 200,
@@ -64,54 +231,13 @@ class Handler(http.server.SimpleHTTPRequestHandler):
         path = parsed_url.path
 
         if rest_method is RestMethods.GET:
-            for prefix, dirpath in RestApiFactory.prepared_statics.items():
-                if not path.startswith(prefix):
-                    continue
-                _path = path[len(prefix):]
+            dirpath, _path = RestApiFactory.find_statics(path)
+            if dirpath is not None:
                 return self._handle_statics(dirpath, _path)
 
-        matching_item = None
-        found_prefix = None
-        url_prefixes = RestApiFactory.prepared_routes[rest_method]
-        for url_prefix, items in url_prefixes.items():
-            if matching_item is not None:
-                break
-
-            if url_prefix is not None:
-                if not path.startswith(url_prefix):
-                    continue
-
-                found_prefix = url_prefix
-
-            for item in items:
-                regex = item["regex"]
-                item_full_path = item["fullpath"]
-                if regex is None:
-                    if path == item_full_path:
-                        item["url_data"] = None
-                        matching_item = item
-                        break
-
-                else:
-                    found = re.match(regex, path)
-                    if found:
-                        item["url_data"] = found.groupdict()
-                        matching_item = item
-                        break
-
+        matching_item, url_data = RestApiFactory.find_route(rest_method, path)
         if not matching_item:
-            if found_prefix is not None:
-                _path = path.replace(found_prefix, "")
-                if _path:
-                    request_str = " \"{}\"".format(_path)
-                else:
-                    request_str = ""
-
-                message = "Invalid path request{} for prefix \"{}\"".format(
-                    request_str, found_prefix
-                )
-            else:
-                message = "Invalid path request \"{}\"".format(self.path)
+            message = invalid_path_message(rest_method, path, self.path)
             log.debug(message)
             self.send_error(HTTPStatus.BAD_REQUEST, message)
 
@@ -121,147 +247,94 @@ class Handler(http.server.SimpleHTTPRequestHandler):
             log.debug("Triggering callback for path \"{}\"".format(path))
 
             result = self._handle_callback(
-                matching_item, parsed_url, rest_method
+                matching_item, url_data, parsed_url, rest_method
             )
 
             return self._handle_callback_result(result, rest_method)
 
         except AbortException as exc:
-            status_code, message = str(exc).split(Splitter)
-            status_code = int(status_code)
-            if not message:
-                message = self.default_messages.get(
-                    status_code, "UnexpectedError"
-                )
-
-            self.send_response(status_code)
-            self.send_header("Content-type", "text/html")
-            self.send_header("Content-Length", len(message))
-            self.end_headers()
-
-            self.wfile.write(message.encode())
-            return message
+            status_code, message = abort_response(exc)
+            return self._send_message(status_code, message)
 
         except Exception as exc:
-            log_message = "Unexpected Exception was raised (this is bug!)"
-            log.error(log_message, exc_info=True)
-            items = [log_message]
-            items += traceback.extract_tb(exc.__traceback__).format()
-            message = "\n".join(items)
-
-            self.send_response(HTTPStatus.INTERNAL_SERVER_ERROR)
-            self.send_header("Content-type", "text/html")
-            self.send_header("Content-Length", len(message))
-            self.end_headers()
+            status_code, message = exception_response(exc)
+            return self._send_message(status_code, message)
+
+    def _send_message(self, status_code, message):
+        self.send_response(status_code)
+        self.send_header("Content-type", "text/html")
+        self.send_header("Content-Length", len(message))
+        self.end_headers()
 
-            self.wfile.write(message.encode())
-            return message
+        self.wfile.write(message.encode())
+        return message
 
     def _handle_callback_result(self, result, rest_method):
         """Send response to request based on result of callback.
-        :param result: Result returned by callback.
-        :type result: None, bool, dict, list, CallbackResult
-        :param rest_method: Rest api method (GET, POST, etc.).
-        :type rest_method: RestMethods
 
-        Response is based on result type:
-        - None, True - It is expected everything was OK, status 200.
-        - False - It is expected callback was not successful, status 400
-        - dict, list - Result is send under "data" key of body, status 200
-        - CallbackResult - object specify status and data
+        Response is prepared with `callback_result_response`.
         """
-        content_type = "application/json"
-        status = HTTPStatus.OK
-        success = True
-        message = None
-        data = None
-
-        body = None
-        # TODO better handling of results
-        if isinstance(result, CallbackResult):
-            status = result.status_code
-            body_dict = {}
-            for key, value in result.items():
-                if value is not None:
-                    body_dict[key] = value
-            body = json.dumps(body_dict)
-
-        elif result in [None, True]:
-            status = HTTPStatus.OK
-            success = True
-            message = "{} request for \"{}\" passed".format(
-                rest_method, self.path
-            )
-
-        elif result is False:
-            status = HTTPStatus.BAD_REQUEST
-            success = False
-
-        elif isinstance(result, (dict, list)):
-            status = HTTPStatus.OK
-            data = result
-
-        if status == HTTPStatus.NO_CONTENT:
+        status, body = callback_result_response(
+            result, rest_method, self.path
+        )
+        if body is None:
             self.send_response(status)
             self.end_headers()
             return
 
-        if not body:
-            body_dict = {"success": success}
-            if message:
-                body_dict["message"] = message
-
-            if not data:
-                data = {}
-
-            body_dict["data"] = data
-            body = json.dumps(body_dict)
+        if isinstance(body, JSONStream):
+            return self._send_stream(status, body)
 
         self.send_response(status)
-        self.send_header("Content-type", content_type)
+        self.send_header("Content-type", "application/json")
         self.send_header("Content-Length", len(body))
         self.end_headers()
 
         self.wfile.write(body.encode())
         return body
 
-    def _handle_callback(self, item, parsed_url, rest_method):
+    def _send_stream(self, status, body):
+        """Send body encoded while is sent.
+
+        Length of content is not known so connection is closed at the end
+        of response.
+        """
+        self.send_response(status)
+        self.send_header("Content-type", "application/json")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        try:
+            for chunk in body:
+                self.wfile.write(chunk)
+        except Exception:
+            # Headers were already sent so only end of stream can be marked
+            log.error("Response stream was interrupted.", exc_info=True)
+        return body
+
+    def _handle_callback(self, item, url_data, parsed_url, rest_method):
         """Prepare data from request and trigger callback.
 
         Data are loaded from body of request if there are any.
 
         :param item: Item stored during callback registration with all info.
         :type item: dict
+        :param url_data: Values of dynamic keys from path.
+        :type url_data: dict, None
         :param parsed_url: Url parsed with urllib (separated path, query, etc).
         :type parsed_url: ParseResult
         :param rest_method: Rest api method (GET, POST, etc.).
         :type rest_method: RestMethods
         """
-        regex_keys = item["regex_keys"]
-
-        url_data = None
-        if regex_keys:
-            url_data = {key: None for key in regex_keys}
-            if item["url_data"]:
-                for key, value in item["url_data"].items():
-                    url_data[key] = value
-
         in_data = None
         cont_len = self.headers.get("Content-Length")
         if cont_len:
             content_length = int(cont_len)
-            in_data_str = self.rfile.read(content_length)
-            if in_data_str:
-                try:
-                    in_data = json.loads(in_data_str)
-                except Exception as e:
-                    log.error("Invalid JSON recieved: \"{}\"".format(
-                        str(in_data_str)
-                    ))
-                    raise Exception("Invalid JSON recieved") from e
+            in_data = load_request_data(self.rfile.read(content_length))
 
         request_info = RequestInfo(
-            url_data=url_data,
+            url_data=prepare_url_data(item, url_data),
             request_data=in_data,
             query=parsed_url.query,
             fragment=parsed_url.fragment,
@@ -270,80 +343,62 @@ class Handler(http.server.SimpleHTTPRequestHandler):
             handler=self
         )
 
-        callback = item["callback"]
-        callback_info = item["callback_info"]
-
-        _args_len = callback_info["args_len"]
-        _has_args = callback_info["hasargs"]
-        _has_kwargs = callback_info["haskwargs"]
-
-        args = []
-        kwargs = {}
-        if _args_len == 0:
-            if _has_args:
-                args.append(request_info)
-            elif _has_kwargs:
-                kwargs["request_info"] = request_info
-        else:
-            args.append(request_info)
-
-        return callback(*args, **kwargs)
+        return trigger_callback(item, request_info)
 
     def _handle_statics(self, dirpath, path):
-        """Return static file in response when file exist in destination."""
-        path = os.path.normpath(dirpath + path)
+        """Stream static file in response when file exist in destination.
 
-        ctype = self.guess_type(path)
+        Responses have ETag and support single byte range requests. Content
+        is sent with `os.sendfile` when available or in chunks.
+        """
+        path = resolve_static_path(dirpath, path)
         try:
-            file_obj = open(path, "rb")
+            if path is None:
+                raise OSError("Path is not in statics directory")
+            static_file = static_files_cache.acquire(path)
         except OSError:
             self.send_error(HTTPStatus.NOT_FOUND, "File not found")
             return None
 
         try:
-            file_stat = os.fstat(file_obj.fileno())
-            # Use browser cache if possible
-            if ("If-Modified-Since" in self.headers
-                    and "If-None-Match" not in self.headers):
-                # compare If-Modified-Since and time of last file modification
-                try:
-                    ims = http.server.email.utils.parsedate_to_datetime(
-                        self.headers["If-Modified-Since"])
-                except (TypeError, IndexError, OverflowError, ValueError):
-                    # ignore ill-formed values
-                    pass
-                else:
-                    if ims.tzinfo is None:
-                        # obsolete format with no timezone, cf.
-                        # https://tools.ietf.org/html/rfc7231#section-7.1.1.1
-                        ims = ims.replace(tzinfo=datetime.timezone.utc)
-                    if ims.tzinfo is datetime.timezone.utc:
-                        # compare to UTC datetime of last modification
-                        last_modif = datetime.datetime.fromtimestamp(
-                            file_stat.st_mtime, datetime.timezone.utc)
-                        # remove microseconds, like in If-Modified-Since
-                        last_modif = last_modif.replace(microsecond=0)
-
-                        if last_modif <= ims:
-                            self.send_response(HTTPStatus.NOT_MODIFIED)
-                            self.end_headers()
-                            file_obj.close()
-                            return None
-
-            self.send_response(HTTPStatus.OK)
-            self.send_header("Content-type", ctype)
-            self.send_header("Content-Length", str(file_stat[6]))
-            self.send_header(
-                "Last-Modified",
-                self.date_time_string(file_stat.st_mtime)
-            )
+            response = StaticResponse(static_file, self.headers)
+            self.send_response(response.status)
+            for key, value in response.headers:
+                self.send_header(key, value)
             self.end_headers()
-            self.wfile.write(file_obj.read())
-            return file_obj
+
+            if response.send_content and self.command != "HEAD":
+                self._send_static_content(response)
+
+        except (ConnectionError, OSError):
+            log.debug(
+                "Sending of file \"{}\" was interrupted".format(path),
+                exc_info=True
+            )
+
         except Exception:
             log.error(
                 "Failed to read data from file \"{}\"".format(path),
                 exc_info=True
             )
+
         finally:
-            file_obj.close()
+            static_files_cache.release(static_file)
+
+    def _send_static_content(self, response):
+        self.wfile.flush()
+        if hasattr(os, "sendfile"):
+            offset = response.offset
+            remaining = response.length
+            socket_fd = self.connection.fileno()
+            file_fd = response.static_file.fileno()
+            while remaining > 0:
+                sent = os.sendfile(socket_fd, file_fd, offset, remaining)
+                if sent == 0:
+                    break
+                offset += sent
+                remaining -= sent
+            return
+
+        for chunk in response.iter_chunks(self.static_chunk_size):
+            self.wfile.write(chunk)
@@ -0,0 +1,260 @@
+import os
+import re
+import datetime
+import threading
+import mimetypes
+import collections
+import email.utils
+from http import HTTPStatus
+
+
+class StaticFile:
+    """Opened static file shared by requests.
+
+    Content is read with explicit offsets so one file descriptor can be used
+    by multiple requests at the same time.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file_obj = open(path, "rb")
+        file_stat = os.fstat(self.file_obj.fileno())
+        self.size = file_stat.st_size
+        self.mtime = file_stat.st_mtime
+        self.signature = self.stat_signature(file_stat)
+        self.etag = "\"{:x}-{:x}-{:x}\"".format(
+            file_stat.st_ino, file_stat.st_size,
+            int(file_stat.st_mtime * 1000000)
+        )
+        self.content_type = (
+            mimetypes.guess_type(path)[0] or "application/octet-stream"
+        )
+
+        self.users = 0
+        self.evicted = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def stat_signature(file_stat):
+        return (file_stat.st_ino, file_stat.st_size, file_stat.st_mtime)
+
+    def fileno(self):
+        return self.file_obj.fileno()
+
+    def read(self, offset, size):
+        """Read `size` bytes from `offset` without moving shared position."""
+        if hasattr(os, "pread"):
+            return os.pread(self.fileno(), size, offset)
+
+        with self._lock:
+            self.file_obj.seek(offset)
+            return self.file_obj.read(size)
+
+    def close(self):
+        self.file_obj.close()
+
+
+class StaticFilesCache:
+    """Least recently used cache of opened static files.
+
+    File is reopened when it was modified since it was opened. Files are
+    closed when they're removed from cache and are not used by any request.
+
+    :param max_files: Maximum number of opened files kept in cache.
+    :type max_files: int
+    """
+
+    def __init__(self, max_files=32):
+        self.max_files = max_files
+        self._files = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, path):
+        """Return opened file for path, must be released with `release`.
+
+        :raises OSError: When file can't be opened.
+        """
+        file_stat = os.stat(path)
+        signature = StaticFile.stat_signature(file_stat)
+        with self._lock:
+            static_file = self._files.get(path)
+            if static_file is not None:
+                if static_file.signature == signature:
+                    self._files.move_to_end(path)
+                    static_file.users += 1
+                    return static_file
+                self._evict(path)
+
+        static_file = StaticFile(path)
+        with self._lock:
+            static_file.users += 1
+            if path not in self._files:
+                self._files[path] = static_file
+            else:
+                # Other request opened file meanwhile
+                static_file.evicted = True
+
+            while len(self._files) > self.max_files:
+                self._evict(next(iter(self._files)))
+        return static_file
+
+    def release(self, static_file):
+        with self._lock:
+            static_file.users -= 1
+            if static_file.evicted and static_file.users <= 0:
+                static_file.close()
+
+    def clear(self):
+        with self._lock:
+            for path in tuple(self._files.keys()):
+                self._evict(path)
+
+    def _evict(self, path):
+        static_file = self._files.pop(path)
+        static_file.evicted = True
+        if static_file.users <= 0:
+            static_file.close()
+
+
+static_files_cache = StaticFilesCache()
+
+
+class StaticResponse:
+    """Response to request of static file.
+
+    Status, headers and range of content which should be sent are resolved
+    from request headers. Content is sent only when `send_content` is set.
+    """
+
+    range_regex = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+    def __init__(self, static_file, request_headers):
+        self.static_file = static_file
+        self.status = HTTPStatus.OK
+        self.offset = 0
+        self.length = static_file.size
+        self.send_content = True
+
+        last_modified = email.utils.formatdate(
+            static_file.mtime, usegmt=True
+        )
+        self.headers = [
+            ("ETag", static_file.etag),
+            ("Last-Modified", last_modified),
+            ("Accept-Ranges", "bytes")
+        ]
+
+        if self.not_modified(request_headers):
+            self.status = HTTPStatus.NOT_MODIFIED
+            self.send_content = False
+            return
+
+        self.headers.append(("Content-type", static_file.content_type))
+        self.apply_range(request_headers)
+        self.headers.append(("Content-Length", str(self.length)))
+
+    def not_modified(self, request_headers):
+        """Browser cache of file can be used."""
+        if_none_match = request_headers.get("If-None-Match")
+        if if_none_match:
+            etags = [etag.strip() for etag in if_none_match.split(",")]
+            return "*" in etags or self.static_file.etag in etags
+
+        if_modified_since = request_headers.get("If-Modified-Since")
+        if not if_modified_since:
+            return False
+
+        # compare If-Modified-Since and time of last file modification
+        try:
+            ims = email.utils.parsedate_to_datetime(if_modified_since)
+        except (TypeError, IndexError, OverflowError, ValueError):
+            # ignore ill-formed values
+            return False
+
+        if ims.tzinfo is None:
+            # obsolete format with no timezone, cf.
+            # https://tools.ietf.org/html/rfc7231#section-7.1.1.1
+            ims = ims.replace(tzinfo=datetime.timezone.utc)
+
+        if ims.tzinfo is not datetime.timezone.utc:
+            return False
+
+        # compare to UTC datetime of last modification
+        last_modif = datetime.datetime.fromtimestamp(
+            self.static_file.mtime, datetime.timezone.utc
+        )
+        # remove microseconds, like in If-Modified-Since
+        last_modif = last_modif.replace(microsecond=0)
+        return last_modif <= ims
+
+    def apply_range(self, request_headers):
+        """Set partial content when single byte range is requested.
+
+        Multiple ranges and invalid values are ignored and whole content is
+        sent.
+        """
+        range_header = request_headers.get("Range")
+        if not range_header:
+            return
+
+        # Range is valid only for same version of file
+        if_range = request_headers.get("If-Range")
+        if if_range and if_range.strip() != self.static_file.etag:
+            return
+
+        found = self.range_regex.match(range_header.strip())
+        if not found:
+            return
+
+        size = self.static_file.size
+        start, end = found.groups()
+        if not start and not end:
+            return
+
+        if not start:
+            # Suffix range ("bytes=-500" is last 500 bytes)
+            start = max(size - int(end), 0)
+            end = size - 1
+        else:
+            start = int(start)
+            end = min(int(end), size - 1) if end else size - 1
+
+        if start >= size or start > end:
+            self.status = HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE
+            self.length = 0
+            self.send_content = False
+            self.headers.append(("Content-Range", "bytes */{}".format(size)))
+            return
+
+        self.status = HTTPStatus.PARTIAL_CONTENT
+        self.offset = start
+        self.length = end - start + 1
+        self.headers.append((
+            "Content-Range", "bytes {}-{}/{}".format(start, end, size)
+        ))
+
+    def iter_chunks(self, chunk_size):
+        """Read content of response in chunks."""
+        offset = self.offset
+        end = self.offset + self.length
+        while offset < end:
+            chunk = self.static_file.read(
+                offset, min(chunk_size, end - offset)
+            )
+            if not chunk:
+                break
+            offset += len(chunk)
+            yield chunk
+
+
+def resolve_static_path(dirpath, path):
+    """Full path of requested file or `None` when points out of directory."""
+    full_path = os.path.normpath(dirpath + path)
+    dirpath = os.path.normpath(dirpath)
+    try:
+        if os.path.commonpath([dirpath, full_path]) != dirpath:
+            return None
+    except ValueError:
+        # Paths are on different drives
+        return None
+    return full_path
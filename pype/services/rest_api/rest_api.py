@@ -1,10 +1,11 @@
 import os
 import socket
+import asyncio
 from Qt import QtCore
 
 from socketserver import ThreadingMixIn
 from http.server import HTTPServer
-from .lib import RestApiFactory, Handler
+from .lib import RestApiFactory, Handler, AsyncRestApiServer
 from .base_class import route, register_statics
 from pypeapp import config, Logger
 
@@ -83,7 +84,11 @@ class RestApiServer:
     True when should handle only single entity.
 
     Callback may return many types. For more information read docstring of
-    `_handle_callback_result` defined in handler.
+    `callback_result_response` defined in handler.
+
+    Server runs in asyncio mode when "async_server" is set to True in presets.
+    Connections are kept alive and callbacks are triggered in pool of
+    "async_workers" threads (8 by default).
     """
     def __init__(self):
         self.qaction = None
@@ -99,6 +104,9 @@ class RestApiServer:
                 " Using defaults \"{}\""
             ).format(str(self.presets)))
 
+        self.async_server = self.presets.get("async_server", False)
+        self.async_workers = self.presets.get("async_workers", 8)
+
         port = self.find_port()
         self.rest_api_thread = RestApiThread(self, port)
 
@@ -186,9 +194,12 @@ class RestApiThread(QtCore.QThread):
                 " \"http://localhost:{}\"".format(self.port)
             )
 
-            with ThreadingSimpleServer(("", self.port), Handler) as httpd:
-                while self.is_running:
-                    httpd.handle_request()
+            if self.module.async_server:
+                self.run_async()
+            else:
+                with ThreadingSimpleServer(("", self.port), Handler) as httpd:
+                    while self.is_running:
+                        httpd.handle_request()
         except Exception:
             log.warning(
                 "Rest Api Server service has failed", exc_info=True
@@ -196,3 +207,16 @@ class RestApiThread(QtCore.QThread):
 
         self.is_running = False
         self.module.thread_stopped()
+
+    def run_async(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        server = AsyncRestApiServer(
+            ("", self.port), workers=self.module.async_workers
+        )
+        try:
+            loop.run_until_complete(
+                server.run_until(lambda: self.is_running)
+            )
+        finally:
+            loop.close()
@@ -0,0 +1,172 @@
+"""Registry of published files by hash of their source file.
+
+Publishing of look stores hashes of source textures (see `source_hash` in
+maya's `ExtractLook`) so texture which was already published can be
+hardlinked instead of processed again. Hashes were looked up only in
+`data.sourceHashes` of version documents which can't be indexed because hash
+is part of key. The registry stores each hash with published path as single
+document in indexed collection so hashes of all textures of an instance are
+resolved with one query.
+
+Registry documents:
+    {
+        "project": "<project name>",
+        "hash": "<source hash>",
+        "path": "<published path>",
+        "version_id": ObjectId("<id of version>")
+    }
+
+Registry of existing projects is filled from `data.sourceHashes` of versions
+with `backfill_source_hashes` (`pype/scripts/backfill_source_hashes.py`).
+"""
+import os
+import logging
+
+import pymongo
+from pymongo import UpdateOne
+from avalon import io
+
+log = logging.getLogger(__name__)
+
+# Maximum number of operations sent in one bulk write
+BULK_SIZE = 1000
+
+_indexed_collections = set()
+
+
+def get_registry_collection():
+    """Collection of registry with ensured indexes.
+
+    Registry is stored in database from `PYPE_SOURCE_HASHES_DB` environment
+    ("pype" by default) so it's collection is not listed as project in
+    avalon database.
+    """
+    if io._database is None:
+        io.install()
+
+    database_name = os.environ.get("PYPE_SOURCE_HASHES_DB") or "pype"
+    collection = io._mongo_client[database_name]["source_hashes"]
+
+    key = (database_name, collection.name)
+    if key not in _indexed_collections:
+        try:
+            collection.create_index(
+                [
+                    ("project", pymongo.ASCENDING),
+                    ("hash", pymongo.ASCENDING),
+                    ("path", pymongo.ASCENDING)
+                ],
+                name="project_hash_path",
+                unique=True
+            )
+            collection.create_index(
+                [("version_id", pymongo.ASCENDING)],
+                name="version_id"
+            )
+            _indexed_collections.add(key)
+
+        except pymongo.errors.PyMongoError:
+            log.warning(
+                "Indexes of source hashes registry can't be created.",
+                exc_info=True
+            )
+    return collection
+
+
+def find_paths_by_hashes(hashes, project_name=None):
+    """Published paths of source hashes queried with single query.
+
+    Args:
+        hashes (list): Source hashes.
+        project_name (str): Name of project. Project from `io.Session` is used
+            if not entered.
+
+    Returns:
+        dict: Published paths (list) by source hash, most recently registered
+            first. Hashes which were not published are not in the output.
+    """
+    hashes = list(set(hashes))
+    if not hashes:
+        return {}
+
+    project_name = project_name or io.Session["AVALON_PROJECT"]
+    cursor = get_registry_collection().find(
+        {"project": project_name, "hash": {"$in": hashes}},
+        {"hash": True, "path": True}
+    ).sort("_id", pymongo.DESCENDING)
+
+    output = {}
+    for doc in cursor:
+        output.setdefault(doc["hash"], []).append(doc["path"])
+    return output
+
+
+def register_source_hashes(paths_by_hash, version_id, project_name=None):
+    """Store published paths of source hashes to registry.
+
+    Args:
+        paths_by_hash (dict): Published path by source hash (as stored to
+            `data.sourceHashes` of version).
+        version_id (ObjectId): Id of version where files were published.
+        project_name (str): Name of project. Project from `io.Session` is used
+            if not entered.
+
+    Returns:
+        int: Number of written registry documents.
+    """
+    project_name = project_name or io.Session["AVALON_PROJECT"]
+    operations = []
+    for texture_hash, path in paths_by_hash.items():
+        operations.append(UpdateOne(
+            {"project": project_name, "hash": texture_hash, "path": path},
+            {"$set": {"version_id": version_id}},
+            upsert=True
+        ))
+    return _bulk_write(operations)
+
+
+def backfill_source_hashes(project_name=None):
+    """Fill registry from `data.sourceHashes` of existing versions.
+
+    Migration can be run repeatedly, already registered hashes are only
+    updated.
+
+    Args:
+        project_name (str): Name of project. Project from `io.Session` is used
+            if not entered.
+
+    Returns:
+        int: Number of processed source hashes.
+    """
+    project_name = project_name or io.Session["AVALON_PROJECT"]
+    cursor = io._database[project_name].find(
+        {"type": "version", "data.sourceHashes": {"$exists": True}},
+        {"data.sourceHashes": True}
+    )
+
+    count = 0
+    operations = []
+    for version in cursor:
+        source_hashes = version["data"].get("sourceHashes") or {}
+        for texture_hash, path in source_hashes.items():
+            operations.append(UpdateOne(
+                {"project": project_name, "hash": texture_hash, "path": path},
+                {"$set": {"version_id": version["_id"]}},
+                upsert=True
+            ))
+        if len(operations) >= BULK_SIZE:
+            count += _bulk_write(operations)
+            operations = []
+
+    count += _bulk_write(operations)
+    log.info("Registered {} source hashes of project \"{}\".".format(
+        count, project_name
+    ))
+    return count
+
+
+def _bulk_write(operations):
+    if not operations:
+        return 0
+    get_registry_collection().bulk_write(operations, ordered=False)
+    return len(operations)
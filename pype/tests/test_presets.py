@@ -0,0 +1,80 @@
+import os
+import json
+
+from pype.presets import PresetsService
+
+
+def _write_json(path, data):
+    dirpath = os.path.dirname(path)
+    if not os.path.exists(dirpath):
+        os.makedirs(dirpath)
+    with open(path, "w") as stream:
+        json.dump(data, stream)
+
+
+def _loader(loaded):
+    """Fake `pypeapp.config.get_presets` resolving project from environment.
+    """
+    def get_presets(project=None):
+        project = project or os.environ.get("AVALON_PROJECT")
+        loaded.append(project)
+        path = os.path.join(
+            os.environ["PYPE_PROJECT_CONFIGS"], project, "init.json"
+        )
+        with open(path, "r") as stream:
+            return {"init": json.load(stream)}
+    return get_presets
+
+
+def test_presets_follow_avalon_project(tmpdir, monkeypatch):
+    """Presets without entered project are cached per `AVALON_PROJECT`."""
+    studio_dir = str(tmpdir.mkdir("studio"))
+    project_configs = str(tmpdir.mkdir("projects"))
+    _write_json(
+        os.path.join(studio_dir, "presets", "plugins", "config.json"), {}
+    )
+    _write_json(
+        os.path.join(project_configs, "ProjectA", "init.json"), {"name": "A"}
+    )
+    _write_json(
+        os.path.join(project_configs, "ProjectB", "init.json"), {"name": "B"}
+    )
+    monkeypatch.setitem(os.environ, "PYPE_CONFIG", studio_dir)
+    monkeypatch.setitem(os.environ, "PYPE_PROJECT_CONFIGS", project_configs)
+
+    loaded = []
+    service = PresetsService(loader=_loader(loaded))
+    service.check_interval = 0
+
+    monkeypatch.setitem(os.environ, "AVALON_PROJECT", "ProjectA")
+    assert service.get_presets()["init"]["name"] == "A"
+    assert service.get_presets()["init"]["name"] == "A"
+    assert loaded == ["ProjectA"]
+
+    monkeypatch.setitem(os.environ, "AVALON_PROJECT", "ProjectB")
+    assert service.get_presets()["init"]["name"] == "B"
+    assert loaded == ["ProjectA", "ProjectB"]
+
+
+def test_presets_reload_on_project_override_change(tmpdir, monkeypatch):
+    """Modified project override file is noticed without entered project."""
+    project_configs = str(tmpdir.mkdir("projects"))
+    init_path = os.path.join(project_configs, "ProjectA", "init.json")
+    _write_json(init_path, {"name": "A"})
+    monkeypatch.delitem(os.environ, "PYPE_CONFIG", raising=False)
+    monkeypatch.setitem(os.environ, "PYPE_PROJECT_CONFIGS", project_configs)
+    monkeypatch.setitem(os.environ, "AVALON_PROJECT", "ProjectA")
+
+    loaded = []
+    service = PresetsService(loader=_loader(loaded))
+    service.check_interval = 0
+
+    assert service.get_presets()["init"]["name"] == "A"
+
+    _write_json(init_path, {"name": "A changed"})
+    # Make sure modification time changes on filesystems with low precision
+    stat = os.stat(init_path)
+    os.utime(init_path, (stat.st_atime, stat.st_mtime + 10))
+
+    assert service.get_presets()["init"]["name"] == "A changed"
+    assert len(loaded) == 2
@@ -0,0 +1,295 @@
+import re
+import copy
+import random
+
+import pytest
+
+from pype.profiles import ProfilesMatcher, get_profiles_matcher
+from pype.scripts.benchmark_profiles import generate_profiles
+
+
+def _legacy_validate_value_by_regexes(value, in_list):
+    if not in_list:
+        return 0
+
+    for item in in_list:
+        if item and re.match(item, value):
+            return 1
+    return -1
+
+
+def _legacy_profile_exclusion(matching_profiles):
+    idx = 0
+    final_profile = None
+    while True:
+        profiles_true = []
+        profiles_false = []
+        for profile in matching_profiles:
+            value = profile["__value__"]
+            if not idx < len(value):
+                final_profile = profile
+                break
+
+            if value[idx]:
+                profiles_true.append(profile)
+            else:
+                profiles_false.append(profile)
+
+        if final_profile is not None:
+            break
+
+        if profiles_true:
+            matching_profiles = profiles_true
+        else:
+            matching_profiles = profiles_false
+
+        if len(matching_profiles) == 1:
+            final_profile = matching_profiles[0]
+            break
+        idx += 1
+
+    final_profile.pop("__value__")
+    return final_profile
+
+
+def _legacy_find_matching_profile(profiles, host_name, task_name, family):
+    """Profile lookup of ExtractReview and ExtractBurnin before
+    `ProfilesMatcher` was used.
+    """
+    matching_profiles = None
+    if not profiles:
+        return matching_profiles
+
+    highest_profile_points = -1
+    for profile in profiles:
+        profile_points = 0
+        profile_value = []
+        valid = True
+        for key, value in (
+            ("hosts", host_name), ("tasks", task_name), ("families", family)
+        ):
+            match = _legacy_validate_value_by_regexes(value, profile.get(key))
+            if match == -1:
+                valid = False
+                break
+            profile_points += match
+            profile_value.append(bool(match))
+
+        if not valid or profile_points < highest_profile_points:
+            continue
+
+        if profile_points > highest_profile_points:
+            matching_profiles = []
+            highest_profile_points = profile_points
+
+        profile["__value__"] = profile_value
+        matching_profiles.append(profile)
+
+    if not matching_profiles:
+        return None
+
+    if len(matching_profiles) == 1:
+        matching_profiles[0].pop("__value__")
+        return matching_profiles[0]
+
+    return _legacy_profile_exclusion(matching_profiles)
+
+
+def _legacy_families_filter_validation(families, output_families_filter):
+    if not output_families_filter:
+        return True
+
+    for family_filter in output_families_filter:
+        if not family_filter:
+            continue
+        if isinstance(family_filter, (list, tuple)):
+            if all(
+                family.lower() in families
+                for family in family_filter
+                if family
+            ):
+                return True
+        elif family_filter.lower() in families:
+            return True
+    return False
+
+
+def _legacy_filter_outputs_by_families(profile, families):
+    outputs = profile.get("outputs") or {}
+    families = [family.lower() for family in families]
+    filtered_outputs = {}
+    for filename_suffix, output_def in outputs.items():
+        output_filters = output_def.get("filter")
+        if output_filters and not _legacy_families_filter_validation(
+            families, output_filters.get("families")
+        ):
+            continue
+        filtered_outputs[filename_suffix] = output_def
+    return filtered_outputs
+
+
+def _legacy_filter_outputs_by_tags(outputs, tags):
+    filtered_outputs = []
+    repre_tags_low = [tag.lower() for tag in tags]
+    for output_def in outputs:
+        tag_filters = (output_def.get("filter") or {}).get("tags")
+        if tag_filters:
+            tag_filters_low = [tag.lower() for tag in tag_filters]
+            if not any(tag in tag_filters_low for tag in repre_tags_low):
+                continue
+        filtered_outputs.append(output_def)
+    return filtered_outputs
+
+
+PROFILES = [
+    # 0: host and family
+    {"hosts": ["maya"], "families": ["review"], "name": "maya review"},
+    # 1: task and family, same points as 0 but host is compared first
+    {"tasks": ["anim.*"], "families": ["review"], "name": "anim review"},
+    # 2: host and task
+    {"hosts": ["nuke"], "tasks": ["comp.*"], "name": "nuke comp"},
+    # 3: task and family, tie with 1 for task "animation"
+    {"tasks": ["animation"], "families": ["review"], "name": "animation"},
+    # 4: family only
+    {"families": ["render", "prerender"], "name": "render"},
+    # 5: empty filters are same as not set filters
+    {"hosts": [], "tasks": [], "families": [], "name": "fallback"},
+    # 6: all filters
+    {
+        "hosts": ["nuke"], "tasks": ["comp.*"], "families": ["render"],
+        "name": "nuke comp render"
+    },
+]
+
+QUERIES = [
+    ("maya", "animation", "review"),
+    ("maya", "modeling", "review"),
+    ("nuke", "animation", "review"),
+    ("nuke", "compositing", "render"),
+    ("nuke", "compositing", "review"),
+    ("nuke", "lighting", "plate"),
+    ("houdini", "fx", "render"),
+    ("houdini", "fx", "prerender"),
+    ("houdini", "fx", "model"),
+]
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_match_same_as_legacy(query):
+    expected = _legacy_find_matching_profile(
+        copy.deepcopy(PROFILES), *query
+    )
+    profile = ProfilesMatcher(PROFILES).match(*query)
+    assert profile == expected
+
+
+def test_match_ties():
+    matcher = ProfilesMatcher(PROFILES)
+    # Host match has priority over task match with same points
+    assert matcher.match("maya", "animation", "review")["name"] == (
+        "maya review"
+    )
+    # First profile is used when profiles have same matching filters
+    assert matcher.match("nuke", "animation", "review")["name"] == (
+        "anim review"
+    )
+    # Profile with most matching filters wins over host priority
+    assert matcher.match("nuke", "compositing", "render")["name"] == (
+        "nuke comp render"
+    )
+    assert matcher.match("houdini", "fx", "model")["name"] == "fallback"
+
+
+def test_match_none():
+    profiles = [{"hosts": ["maya"]}, {"families": ["render"]}]
+    assert ProfilesMatcher(profiles).match("nuke", "comp", "review") is None
+    assert _legacy_find_matching_profile(
+        profiles, "nuke", "comp", "review"
+    ) is None
+    assert ProfilesMatcher([]).match("nuke", "comp", "review") is None
+
+
+def test_match_does_not_modify_profiles():
+    profiles = copy.deepcopy(PROFILES)
+    matcher = ProfilesMatcher(profiles)
+    for query in QUERIES:
+        matcher.match(*query)
+    assert profiles == PROFILES
+
+
+def test_match_generated_profiles():
+    random.seed(0)
+    profiles = generate_profiles(100, outputs_count=1)
+    matcher = ProfilesMatcher(profiles)
+    for _ in range(300):
+        query = (
+            random.choice(["maya", "nuke", "houdini", "blender"]),
+            random.choice(["compositing", "lighting", "fx_sim", "layout"]),
+            random.choice(["render", "review", "plate", "look"])
+        )
+        expected = _legacy_find_matching_profile(profiles, *query)
+        # Cached and uncached lookup
+        assert matcher.match(*query) is expected
+        assert ProfilesMatcher(profiles).match(*query) is expected
+
+
+OUTPUTS_PROFILE = {
+    "outputs": {
+        "h264": {"filter": {"families": ["review"], "tags": ["burnin"]}},
+        "prores": {"filter": {"families": [["Render", "review"]]}},
+        "png": {"filter": {"tags": ["Slate-Frame", "delete"]}},
+        "any": {},
+        "empty": {"filter": {"families": [], "tags": []}},
+        "plate": {"filter": {"families": ["plate"], "tags": ["review"]}},
+    }
+}
+
+
+@pytest.mark.parametrize("families", (
+    ["review"],
+    ["render", "Review"],
+    ["render"],
+    ["plate", "ftrack"],
+))
+@pytest.mark.parametrize("tags", (
+    [],
+    ["review"],
+    ["review", "burnin"],
+    ["slate-frame"],
+    ["DELETE", "review"],
+))
+def test_filter_outputs_same_as_legacy(families, tags):
+    matcher = ProfilesMatcher([OUTPUTS_PROFILE])
+    profile = matcher.match("maya", "anim", "review")
+
+    expected = _legacy_filter_outputs_by_families(profile, families)
+    by_families = matcher.filter_definitions(
+        profile, "outputs", families=families
+    )
+    assert list(by_families.keys()) == list(expected.keys())
+
+    expected = _legacy_filter_outputs_by_tags(expected.values(), tags)
+    # Twice to check cached result
+    for _ in range(2):
+        outputs = matcher.filter_definitions(
+            profile, "outputs", families=families, tags=tags
+        )
+        assert list(outputs.values()) == expected
+
+
+def test_shared_matcher():
+    profiles = copy.deepcopy(PROFILES)
+    matcher = get_profiles_matcher(profiles)
+    assert get_profiles_matcher(profiles) is matcher
+    assert get_profiles_matcher(copy.deepcopy(PROFILES)) is not matcher
+
+
+def test_shared_matcher_of_empty_profiles():
+    profiles = []
+    matcher = get_profiles_matcher(profiles)
+    assert matcher.profiles is profiles
+    assert get_profiles_matcher(profiles) is matcher
+    assert matcher.match("maya", "anim", "review") is None
+
+    assert get_profiles_matcher(None).match("maya", "anim", "review") is None
+    assert get_profiles_matcher(None) is get_profiles_matcher(None)
@@ -0,0 +1,94 @@
+import json
+import datetime
+
+import pytest
+
+from pype.services.rest_api.lib.encoder import JSONStream, is_streamed
+
+
+class _Cursor:
+    """Iterator of documents similar to `pymongo.cursor.Cursor`."""
+
+    def __init__(self, docs):
+        self._docs = list(docs)
+        self._idx = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._idx >= len(self._docs):
+            raise StopIteration
+        doc = self._docs[self._idx]
+        self._idx += 1
+        return doc
+
+
+def _docs(count):
+    return [
+        {
+            "_id": "id_{}".format(idx),
+            "name": "asset_{}".format(idx),
+            "data": {"frames": (1001, 1100), "label": "\"quoted\" ěšč"},
+            "created": datetime.datetime(2020, 1, 1, 12, idx % 60)
+        }
+        for idx in range(count)
+    ]
+
+
+def _decode(stream):
+    chunks = list(stream)
+    assert all(isinstance(chunk, bytes) for chunk in chunks)
+    return json.loads(b"".join(chunks).decode())
+
+
+def _expected(docs):
+    return json.loads(json.dumps(docs, default=lambda obj: (
+        obj.isoformat() if isinstance(obj, datetime.datetime) else list(obj)
+    )))
+
+
+@pytest.mark.parametrize("count", (0, 1, 50))
+@pytest.mark.parametrize("chunk_size", (1, 100, None))
+def test_stream_generator(count, chunk_size):
+    docs = _docs(count)
+    data = {
+        "success": True,
+        "data": (doc for doc in docs),
+        "message": None
+    }
+    assert is_streamed(data["data"])
+
+    output = _decode(JSONStream(data, chunk_size=chunk_size))
+    assert output == {
+        "success": True,
+        "data": _expected(docs),
+        "message": None
+    }
+
+
+@pytest.mark.parametrize("count", (0, 1, 50))
+def test_stream_cursor(count):
+    docs = _docs(count)
+    output = _decode(JSONStream({"data": _Cursor(docs)}, chunk_size=256))
+    assert output == {"data": _expected(docs)}
+
+
+def test_stream_not_streamed_values():
+    data = {
+        "list": [1, 2],
+        "tuple": (3, 4),
+        "set": {5},
+        "string": "value",
+        "nested": {"data": [{"name": "a"}]}
+    }
+    assert not any(is_streamed(value) for value in data.values())
+
+    output = _decode(JSONStream(data, chunk_size=1))
+    assert output == {
+        "list": [1, 2],
+        "tuple": [3, 4],
+        "set": [5],
+        "string": "value",
+        "nested": {"data": [{"name": "a"}]}
+    }
@@ -0,0 +1,189 @@
+import re
+import collections
+
+import pytest
+
+from pype.services.rest_api.lib import RestMethods
+from pype.services.rest_api.lib.factory import _RestApiFactory, RouteTrie
+
+
+# (path, url_prefix, strict_match) in order of registration
+ROUTES = (
+    ("/projects/<project_name>", "/avalon", False),
+    ("/projects/<project_name>/assets/<asset>", "/avalon", False),
+    # Registered after dynamic route which matches the same paths
+    ("/projects/settings", "/avalon", False),
+    ("/ping", None, False),
+    # Static route registered before dynamic route of the same prefix
+    ("/items/latest", "/api", False),
+    ("/items/<item_id>", "/api", False),
+    ("/items/<item_id>/<field>", "/api", True),
+    ("/files/<name>.json", "/api", False),
+    ("/trail/", "/api", False),
+    ("", "/empty", False),
+    ("/<first>/<second>", "/multi", False),
+)
+
+PATHS = (
+    "/avalon",
+    "/avalon/",
+    "/avalon/projects",
+    "/avalon/projects/",
+    "/avalon/projectsMyProject",
+    "/avalon/projects/MyProject",
+    "/avalon/projects/MyProject/",
+    "/avalon/projects/my-project",
+    "/avalon/projects/settings",
+    "/avalon/projects/MyProject/assets",
+    "/avalon/projects/MyProject/assets/",
+    "/avalon/projects/MyProject/assets/sh010",
+    "/avalon/projects/MyProject/assets/sh010/",
+    "/ping",
+    "/ping/",
+    "/api/items/latest",
+    "/api/items/",
+    "/api/items/10",
+    "/api/items/10/",
+    "/api/items/10/name",
+    "/api/items/10name",
+    "/api/itemslatest",
+    "/api/files/scene.json",
+    "/api/files/.json",
+    "/api/files/scene.txt",
+    "/api/trail",
+    "/api/trail/",
+    "/empty",
+    "/empty/",
+    "/multi/a/b",
+    "/multi/a/",
+    "/multi/a",
+    "/unknown",
+    "/",
+)
+
+
+def _callback(request):
+    return request
+
+
+def _legacy_find_route(factory, rest_method, path):
+    """Route matching of request handler before routes were in `RouteTrie`.
+    """
+    url_prefixes = factory.prepared_routes[rest_method]
+    for url_prefix, items in url_prefixes.items():
+        if url_prefix is not None and not path.startswith(url_prefix):
+            continue
+
+        for item in items:
+            regex = item["regex"]
+            if regex is None:
+                if path == item["fullpath"]:
+                    return item, None
+                continue
+
+            found = re.match(regex, path)
+            if found:
+                return item, found.groupdict()
+    return None, None
+
+
+def _request_url_data(item, url_data):
+    """Url data passed to callback (all dynamic keys are set)."""
+    if not item["regex_keys"]:
+        return None
+
+    output = {key: None for key in item["regex_keys"]}
+    output.update(url_data or {})
+    return output
+
+
+@pytest.fixture
+def factory():
+    factory = _RestApiFactory()
+    # Do not share registered routes with the global factory
+    factory.prepared_routes = {
+        method: collections.defaultdict(list) for method in RestMethods
+    }
+    factory.route_tries = {method: RouteTrie() for method in RestMethods}
+    factory.unprocessed_routes = []
+
+    for path, url_prefix, strict_match in ROUTES:
+        factory._prepare_route({
+            "path": path,
+            "callback": _callback,
+            "url_prefix": url_prefix,
+            "methods": "GET",
+            "strict_match": strict_match
+        })
+    return factory
+
+
+@pytest.mark.parametrize("path", PATHS)
+def test_route_trie_matches_regexes(factory, path):
+    """Route trie finds the same route and url data as regexes."""
+    expected_item, expected_data = _legacy_find_route(
+        factory, RestMethods.GET, path
+    )
+    item, url_data = factory.find_route(RestMethods.GET, path)
+
+    if expected_item is None:
+        assert item is None
+        return
+
+    assert item is not None, path
+    assert item["fullpath"] == expected_item["fullpath"]
+    assert (
+        _request_url_data(item, url_data)
+        == _request_url_data(expected_item, expected_data)
+    )
+
+
+def test_first_registered_route_wins(factory):
+    """Dynamic key has no precedence over static segment or vice versa."""
+    item, url_data = factory.find_route(
+        RestMethods.GET, "/avalon/projects/settings"
+    )
+    assert item["fullpath"] == "/avalon/projects/<project_name>"
+    assert url_data == {"project_name": "settings"}
+
+    item, url_data = factory.find_route(RestMethods.GET, "/api/items/latest")
+    assert item["fullpath"] == "/api/items/latest"
+
+
+def test_empty_last_dynamic_key(factory):
+    """Not strict route matches path without last dynamic key."""
+    for path in ("/avalon/projects", "/avalon/projects/"):
+        item, url_data = factory.find_route(RestMethods.GET, path)
+        assert item["fullpath"] == "/avalon/projects/<project_name>"
+        # `AvalonRestApi.get_project` returns all projects in that case
+        assert not _request_url_data(item, url_data)["project_name"]
+
+    # Strict route requires last dynamic key
+    assert factory.find_route(RestMethods.GET, "/api/items/10/") == (
+        None, None
+    )
+
+
+def test_url_prefix(factory):
+    item, _ = factory.find_route(RestMethods.GET, "/empty")
+    assert item["fullpath"] == "/empty"
+
+    item, _ = factory.find_route(RestMethods.GET, "/ping")
+    assert item["fullpath"] == "/ping"
+
+    assert factory.find_route(RestMethods.GET, "/avalon/ping") == (
+        None, None
+    )
+    assert factory.find_prefix(RestMethods.GET, "/avalon/unknown") == (
+        "/avalon"
+    )
+    assert factory.find_route(RestMethods.POST, "/ping") == (None, None)
+
+
+def test_last_dynamic_key_without_slash(factory):
+    """Slash before optional last dynamic key is optional as in regex."""
+    item, url_data = factory.find_route(
+        RestMethods.GET, "/avalon/projectsMyProject"
+    )
+    assert item["fullpath"] == "/avalon/projects/<project_name>"
+    assert url_data == {"project_name": "MyProject"}
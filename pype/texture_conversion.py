@@ -0,0 +1,302 @@
+"""Conversion of textures to .tx files with `maketx`.
+
+Conversions are processed concurrently as subprocesses (see
+`pype.lib.SubprocessScheduler`), each `maketx` is limited to it's part of
+machine's threads.
+
+Converted files can be stored to content addressed cache shared by whole
+studio. Cached file is identified by source hash of texture (see
+`source_hash`) and conversion arguments so texture used by multiple looks is
+converted only once. Cache is used when `PYPE_TX_CACHE_DIR` environment is
+set. Cached files are never modified so they can be hardlinked.
+"""
+import os
+import sys
+import uuid
+import errno
+import hashlib
+import logging
+
+import pype.lib
+
+log = logging.getLogger(__name__)
+
+
+def source_hash(filepath, *args):
+    """Generate simple identifier for a source file.
+    This is used to identify whether a source file has previously been
+    processe into the pipeline, e.g. a texture.
+    The hash is based on source filepath, modification time and file size.
+    This is only used to identify whether a specific source file was already
+    published before from the same location with the same modification date.
+    We opt to do it this way as opposed to Avalanch C4 hash as this is much
+    faster and predictable enough for all our production use cases.
+    Args:
+        filepath (str): The source file path.
+    You can specify additional arguments in the function
+    to allow for specific 'processing' values to be included.
+    """
+    # We replace dots with comma because . cannot be a key in a pymongo dict.
+    file_name = os.path.basename(filepath)
+    time = str(os.path.getmtime(filepath))
+    size = str(os.path.getsize(filepath))
+    return "|".join([file_name, time, size] + list(args)).replace(".", ",")
+
+
+def maketx_args(source, destination, args=None, threads=None):
+    """Arguments of `maketx` command with some default settings.
+
+    The settings are based on default as used in Arnold's txManager in the
+    scene. `maketx` executable must be on the `PATH`.
+
+    Args:
+        source (str): Path to source file.
+        destination (str): Writing destination path.
+        args (list): Additional arguments.
+        threads (int): Maximum number of threads used by `maketx`.
+    """
+    cmd = [
+        "maketx",
+        "-v",  # verbose
+        "-u",  # update mode
+        # unpremultiply before conversion (recommended when alpha present)
+        "--unpremult",
+        "--checknan",
+        # use oiio-optimized settings for tile-size, planarconfig, metadata
+        "--oiio",
+        "--filter", "lanczos3",
+    ]
+    if threads:
+        cmd.extend(["--threads", str(threads)])
+
+    cmd.extend(args or [])
+    cmd.extend(["-o", destination, source])
+    return cmd
+
+
+def _creation_kwargs():
+    if sys.platform == "win32":
+        # CREATE_NO_WINDOW
+        return {"creationflags": 0x08000000}
+    return {}
+
+
+def _makedirs(dirpath):
+    try:
+        os.makedirs(dirpath)
+    except OSError as exc:
+        if exc.errno != errno.EEXIST:
+            raise
+
+
+def can_hardlink(src, dst):
+    """Source file can be hardlinked to destination path.
+
+    Destination folder does not have to exist, it's nearest existing parent
+    is checked.
+    """
+    src_drive = os.path.splitdrive(os.path.abspath(src))[0]
+    dst_drive = os.path.splitdrive(os.path.abspath(dst))[0]
+    if src_drive.lower() != dst_drive.lower():
+        return False
+
+    dst_dir = os.path.dirname(os.path.abspath(dst))
+    while not os.path.exists(dst_dir):
+        parent = os.path.dirname(dst_dir)
+        if parent == dst_dir:
+            return False
+        dst_dir = parent
+
+    try:
+        return os.stat(src).st_dev == os.stat(dst_dir).st_dev
+    except OSError:
+        return False
+
+
+class TextureConversion(object):
+    """Conversion of single texture registered in `TextureConverter`.
+
+    Attributes:
+        output (str): Path to converted file. Path in cache when cache is
+            used otherwise requested destination.
+        cached (bool): Output is stored in cache.
+        job (pype.lib.SubprocessJob): Conversion job, `None` when output was
+            already in cache.
+    """
+
+    def __init__(self, source, texture_hash, args, output, cached=False):
+        self.source = source
+        self.texture_hash = texture_hash
+        self.args = args
+        self.output = output
+        self.cached = cached
+        self.job = None
+        self._tmp_output = None
+
+    def __repr__(self):
+        return "<TextureConversion {} -> {}>".format(self.source, self.output)
+
+
+class TextureConverter(object):
+    """Convert textures to .tx in parallel with optional shared cache.
+
+    Example:
+        >>> converter = TextureConverter()
+        >>> conversion = converter.add(
+        ...     "/textures/wood.png", "/staging/wood.tx",
+        ...     source_hash("/textures/wood.png", "maketx")
+        ... )
+        >>> converter.process()
+        >>> conversion.output
+        '/tx_cache/3f/3f2a...tx'
+
+    Args:
+        cache_dir (str): Root of .tx cache. Value of `PYPE_TX_CACHE_DIR`
+            environment variable is used if not entered. Cache is not used
+            if it is not set.
+        max_jobs (int): Maximum number of concurrent `maketx` processes.
+            Count of CPUs is used when not set.
+        log (logging.Logger): Logger used for messages.
+    """
+
+    def __init__(self, cache_dir=None, max_jobs=None, log=None):
+        if cache_dir is None:
+            cache_dir = os.environ.get("PYPE_TX_CACHE_DIR")
+
+        self.cache_dir = os.path.normpath(cache_dir) if cache_dir else None
+        self.max_jobs = max_jobs
+        self.log = log or logging.getLogger(__name__)
+        self.conversions = []
+        self._conversions_by_output = {}
+
+    def cache_path(self, texture_hash, args):
+        """Path of converted texture in cache."""
+        key = "|".join([texture_hash] + list(args))
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], digest + ".tx")
+
+    def add(self, source, destination, texture_hash, args=None):
+        """Register conversion of texture.
+
+        Args:
+            source (str): Path to source texture.
+            destination (str): Output path used when cache is not used.
+            texture_hash (str): Source hash of texture.
+            args (list): Additional `maketx` arguments.
+
+        Returns:
+            TextureConversion: Conversion where output path is stored.
+        """
+        args = list(args or [])
+        cached = False
+        output = os.path.normpath(destination)
+        if self.cache_dir:
+            output = self.cache_path(texture_hash, args)
+            cached = True
+
+        conversion = self._conversions_by_output.get(output)
+        if conversion is not None:
+            return conversion
+
+        conversion = TextureConversion(
+            source, texture_hash, args, output, cached
+        )
+        self._conversions_by_output[output] = conversion
+        self.conversions.append(conversion)
+        return conversion
+
+    def process(self):
+        """Run conversions of textures which are not in cache.
+
+        Raises:
+            ValueError: When any of conversions failed.
+        """
+        to_convert = []
+        for conversion in self.conversions:
+            if conversion.job is not None:
+                continue
+
+            if conversion.cached and os.path.exists(conversion.output):
+                self.log.info("Using cached .tx for {}".format(
+                    conversion.source
+                ))
+                continue
+
+            to_convert.append(conversion)
+
+        if not to_convert:
+            return list(self.conversions)
+
+        scheduler = pype.lib.SubprocessScheduler(
+            max_jobs=self.max_jobs, log=self.log
+        )
+        threads = scheduler.threads_per_job(len(to_convert))
+        for conversion in to_convert:
+            output = conversion.output
+            if conversion.cached:
+                # Converted to unique file which is moved to cache when done
+                # so other processes never use partially written file
+                base, ext = os.path.splitext(output)
+                output = "{}.{}{}".format(base, uuid.uuid4().hex, ext)
+                conversion._tmp_output = output
+            _makedirs(os.path.dirname(output))
+
+            self.log.info("Generating .tx file for {} ..".format(
+                conversion.source
+            ))
+            conversion.job = scheduler.add_job(
+                maketx_args(
+                    conversion.source, output, conversion.args, threads
+                ),
+                name=os.path.basename(conversion.source),
+                threads=threads,
+                **_creation_kwargs()
+            )
+
+        try:
+            scheduler.run()
+        finally:
+            for conversion in to_convert:
+                self._finalize(conversion)
+
+        return list(self.conversions)
+
+    def _finalize(self, conversion):
+        tmp_output = conversion._tmp_output
+        if not tmp_output or not os.path.exists(tmp_output):
+            return
+
+        if not conversion.job.succeeded:
+            os.remove(tmp_output)
+            return
+
+        if os.path.exists(conversion.output):
+            # Converted by other process meanwhile
+            os.remove(tmp_output)
+            return
+
+        try:
+            os.rename(tmp_output, conversion.output)
+        except OSError:
+            if not os.path.exists(conversion.output):
+                raise
+            os.remove(tmp_output)
+
+
+def maketx(source, destination, *args):
+    """Make .tx using maketx with some default settings.
+
+    Use `TextureConverter` to convert multiple textures.
+
+    Args:
+        source (str): Path to source file.
+        destination (str): Writing destination path.
+    """
+    scheduler = pype.lib.SubprocessScheduler(max_jobs=1, log=log)
+    job = scheduler.add_job(
+        maketx_args(source, destination, args),
+        name=os.path.basename(source),
+        **_creation_kwargs()
+    )
+    scheduler.run()
+    return job.output